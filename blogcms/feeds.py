@@ -0,0 +1,189 @@
+"""
+Atom, RSS and JSON Feed generation for the blog.
+
+Feeds are rendered after publishing changes and stored in SyndicationFeed,
+so serving them is a single row lookup rather than a query-and-render per
+poll. Changes are debounced into one background re-render, like the sitemaps.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import feedgenerator, timezone
+from django.utils.html import strip_tags
+from wagtail.rich_text import expand_db_html
+
+from portfolio.jobs import DebouncedJob
+from portfolio.models import BlogPost
+from .models import BlogPage, SyndicationFeed
+
+FEED_TITLE = "Dr. Paul Mwambu - Blog & Updates"
+FEED_DESCRIPTION = (
+    "Insights, updates, and thoughts from Dr. Paul Mwambu on agriculture, "
+    "rural development, and sustainable farming practices in Uganda."
+)
+FEED_LENGTH = 20
+
+CONTENT_TYPES = {
+    SyndicationFeed.ATOM: "application/atom+xml; charset=utf-8",
+    SyndicationFeed.RSS: "application/rss+xml; charset=utf-8",
+    SyndicationFeed.JSON: "application/feed+json; charset=utf-8",
+}
+
+
+def _absolute(path):
+    return settings.BASE_URL.rstrip("/") + path
+
+
+def _legacy_post_url(post):
+    try:
+        return _absolute(post.get_absolute_url())
+    except NoReverseMatch:
+        # Legacy routes are retired; migrated posts keep their slug under /blog/
+        return _absolute(f"/blog/{post.slug}/")
+
+
+def feed_items():
+    """Newest live blog pages and published legacy posts, as plain dicts"""
+    items = []
+    pages = (
+        BlogPage.objects.live().public()
+        .select_related("owner")
+        .prefetch_related("tags")
+        .order_by("-first_published_at")[:FEED_LENGTH]
+    )
+    slugs = set()
+    for page in pages:
+        slugs.add(page.slug)
+        url = page.get_full_url()
+        items.append({
+            "id": url,
+            "url": url,
+            "title": page.title,
+            "summary": page.intro or page.search_description,
+            "content_html": expand_db_html(page.body),
+            "author": (page.owner.get_full_name() or str(page.owner)) if page.owner else "",
+            "published": page.first_published_at,
+            "updated": page.last_published_at or page.first_published_at,
+            "tags": [tag.name for tag in page.tags.all()],
+        })
+
+    # Legacy posts that were migrated to Wagtail are already listed above
+    posts = (
+        BlogPost.objects.filter(published=True)
+        .exclude(slug__in=slugs)
+        .order_by("-date")[:FEED_LENGTH]
+    )
+    for post in posts:
+        url = _legacy_post_url(post)
+        items.append({
+            "id": url,
+            "url": url,
+            "title": post.title,
+            "summary": post.excerpt,
+            "content_html": post.body,
+            "author": post.author,
+            "published": post.date,
+            "updated": post.updated_at,
+            "tags": [t.strip() for t in post.tags.split(",") if t.strip()],
+        })
+
+    items.sort(key=lambda item: item["published"], reverse=True)
+    return items[:FEED_LENGTH]
+
+
+def _render_syndication(feed_class, items, feed_url):
+    feed = feed_class(
+        title=FEED_TITLE,
+        link=_absolute("/blog/"),
+        description=FEED_DESCRIPTION,
+        feed_url=feed_url,
+        language=settings.LANGUAGE_CODE,
+    )
+    for item in items:
+        feed.add_item(
+            title=item["title"],
+            link=item["url"],
+            description=item["summary"] or strip_tags(item["content_html"])[:300],
+            content=item["content_html"],
+            unique_id=item["id"],
+            author_name=item["author"],
+            pubdate=item["published"],
+            updateddate=item["updated"],
+            categories=item["tags"],
+        )
+    return feed.writeString("utf-8")
+
+
+def _render_json(items, feed_url):
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": FEED_TITLE,
+        "description": FEED_DESCRIPTION,
+        "home_page_url": _absolute("/blog/"),
+        "feed_url": feed_url,
+        "language": settings.LANGUAGE_CODE,
+        "items": [
+            {
+                "id": item["id"],
+                "url": item["url"],
+                "title": item["title"],
+                "summary": item["summary"],
+                "content_html": item["content_html"],
+                "authors": [{"name": item["author"]}] if item["author"] else [],
+                "date_published": item["published"].isoformat(),
+                "date_modified": item["updated"].isoformat() if item["updated"] else None,
+                "tags": item["tags"],
+            }
+            for item in items
+        ],
+    }
+    return json.dumps(feed, ensure_ascii=False)
+
+
+def render_feed(format, items):
+    feed_url = _absolute(reverse(f"blogcms:feed_{format}"))
+    if format == SyndicationFeed.ATOM:
+        return _render_syndication(feedgenerator.Atom1Feed, items, feed_url)
+    if format == SyndicationFeed.RSS:
+        return _render_syndication(feedgenerator.Rss201rev2Feed, items, feed_url)
+    return _render_json(items, feed_url)
+
+
+def rebuild_feeds():
+    """Render every feed format once and store the serialised output"""
+    items = feed_items()
+    last_modified = max(
+        (item["updated"] or item["published"] for item in items),
+        default=timezone.now(),
+    )
+    snapshots = {}
+    for format, _label in SyndicationFeed.FORMAT_CHOICES:
+        content = render_feed(format, items)
+        snapshots[format], _created = SyndicationFeed.objects.update_or_create(
+            format=format,
+            defaults={
+                "content": content,
+                "content_type": CONTENT_TYPES[format],
+                "etag": hashlib.sha1(content.encode("utf-8")).hexdigest(),
+                "last_modified": last_modified,
+            },
+        )
+    return snapshots
+
+
+def get_feed(format):
+    """Return the stored feed, building all formats on first use"""
+    try:
+        return SyndicationFeed.objects.get(format=format)
+    except SyndicationFeed.DoesNotExist:
+        return rebuild_feeds()[format]
+
+
+_rebuild_job = DebouncedJob('feeds', rebuild_feeds, lambda: settings.FEED_REBUILD_DELAY)
+
+
+def schedule_rebuild():
+    """Debounce publishing changes into a single background feed rebuild"""
+    _rebuild_job.schedule()
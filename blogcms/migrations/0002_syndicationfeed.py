@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogcms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyndicationFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('atom', 'Atom'), ('rss', 'RSS'), ('json', 'JSON Feed')], max_length=10, unique=True)),
+                ('content', models.TextField()),
+                ('content_type', models.CharField(max_length=100)),
+                ('etag', models.CharField(max_length=64)),
+                ('last_modified', models.DateTimeField()),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Syndication Feed',
+                'verbose_name_plural': 'Syndication Feeds',
+            },
+        ),
+    ]
@@ -1,13 +1,46 @@
 from django.db import models
-from wagtail.models import Page
+from wagtail.models import Page, PageManager
+from wagtail.query import PageQuerySet
 from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel
+from wagtail.images import get_image_model
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
 from taggit.models import TaggedItemBase
+
+from portfolio.page_cache import cached_response
+from portfolio.related import related_for
 # Create your models here.
 
 
+# Rendition specs used by the blog templates. They are generated when a page
+# is published (see blogcms.signals), so rendering only ever reads them.
+LISTING_IMAGE_SPEC = "fill-800x400"
+HEADER_IMAGE_SPEC = "fill-1200x600"
+OG_IMAGE_SPEC = "fill-1200x630"
+BLOG_RENDITION_SPECS = (LISTING_IMAGE_SPEC, HEADER_IMAGE_SPEC, OG_IMAGE_SPEC)
+
+
+def header_renditions_prefetch(lookup="header_image__renditions"):
+    """Prefetch only the blog renditions of the header image"""
+    Rendition = get_image_model().get_rendition_model()
+    return models.Prefetch(
+        lookup,
+        queryset=Rendition.objects.filter(filter_spec__in=BLOG_RENDITION_SPECS),
+    )
+
+
+class BlogPageQuerySet(PageQuerySet):
+    def with_listing_data(self):
+        """Load everything a blog card or detail page touches in a fixed number of queries"""
+        return self.select_related("owner", "header_image").prefetch_related(
+            "tags", header_renditions_prefetch()
+        )
+
+
+BlogPageManager = PageManager.from_queryset(BlogPageQuerySet)
+
+
 class BlogIndexPage(Page):
     intro = RichTextField(blank=True)
 
@@ -15,6 +48,22 @@ class BlogIndexPage(Page):
         FieldPanel("intro"),
     ]
 
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        # Query BlogPage directly instead of get_children().specific(), which
+        # costs an extra query per content type and loads tags per card.
+        context["posts"] = (
+            BlogPage.objects.child_of(self)
+            .live()
+            .public()
+            .with_listing_data()
+            .order_by("-first_published_at")
+        )
+        return context
+
+    def serve(self, request, *args, **kwargs):
+        return cached_response(request, lambda r: super(BlogIndexPage, self).serve(r, *args, **kwargs))
+
 class BlogPageTag(TaggedItemBase):
     content_object = ParentalKey(
         'BlogPage',
@@ -32,6 +81,8 @@ class BlogPage(Page):
         null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
     )
 
+    objects = BlogPageManager()
+
     content_panels = Page.content_panels + [
         FieldPanel("date"),
         FieldPanel("intro"),
@@ -39,3 +90,50 @@ class BlogPage(Page):
         FieldPanel("tags"),
         FieldPanel("header_image"),
     ]
+
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        # Wagtail's router loads the page without related data; fetch the
+        # header image, its renditions and the tags once for the template.
+        # Previews render unsaved in-memory tags, so leave those alone.
+        if not getattr(request, "is_preview", False):
+            models.prefetch_related_objects(
+                [self], "tags", header_renditions_prefetch()
+            )
+        context["tags"] = self.tags.all()
+        context["related"] = related_for(self)
+        return context
+
+    def serve(self, request, *args, **kwargs):
+        return cached_response(request, lambda r: super(BlogPage, self).serve(r, *args, **kwargs))
+
+    def generate_renditions(self):
+        """Create the header image renditions used by the blog templates"""
+        if self.header_image_id:
+            self.header_image.get_renditions(*BLOG_RENDITION_SPECS)
+
+
+class SyndicationFeed(models.Model):
+    """Pre-serialised blog feed, rebuilt whenever blog content is published"""
+    ATOM = "atom"
+    RSS = "rss"
+    JSON = "json"
+    FORMAT_CHOICES = [
+        (ATOM, "Atom"),
+        (RSS, "RSS"),
+        (JSON, "JSON Feed"),
+    ]
+
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, unique=True)
+    content = models.TextField()
+    content_type = models.CharField(max_length=100)
+    etag = models.CharField(max_length=64)
+    last_modified = models.DateTimeField()
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Syndication Feed"
+        verbose_name_plural = "Syndication Feeds"
+
+    def __str__(self):
+        return self.get_format_display()
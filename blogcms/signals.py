@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.signals import page_published, page_unpublished
+
+from portfolio.models import BlogPost
+from .models import BlogPage
+
+
+@receiver(page_published, sender=BlogPage)
+def generate_header_renditions(sender, instance, **kwargs):
+    """Pre-generate header image renditions so page renders never resize images"""
+    instance.generate_renditions()
+
+
+def _rebuild_feeds():
+    from .feeds import schedule_rebuild
+    transaction.on_commit(schedule_rebuild)
+
+
+@receiver(page_published, sender=BlogPage)
+@receiver(page_unpublished, sender=BlogPage)
+def rebuild_feeds_on_publish(sender, **kwargs):
+    """Re-render the stored feeds once the publishing transaction commits"""
+    _rebuild_feeds()
+
+
+@receiver(post_delete, sender=BlogPage)
+def rebuild_feeds_on_page_delete(sender, instance, **kwargs):
+    # Drafts and revisions never appear in the feeds
+    if instance.live:
+        _rebuild_feeds()
+
+
+@receiver(post_save, sender=BlogPost)
+def rebuild_feeds_on_post_save(sender, instance, raw=False, **kwargs):
+    # Saves of unpublished posts that stay unpublished leave the feeds as they are
+    if not raw and (instance.published or getattr(instance, '_was_published', False)):
+        _rebuild_feeds()
+
+
+@receiver(post_delete, sender=BlogPost)
+def rebuild_feeds_on_post_delete(sender, instance, **kwargs):
+    if instance.published:
+        _rebuild_feeds()
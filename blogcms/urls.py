@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+from .models import SyndicationFeed
+
+app_name = 'blogcms'
+
+urlpatterns = [
+    path('', views.feed, {'format': SyndicationFeed.ATOM}, name='feed_atom'),
+    path('rss/', views.feed, {'format': SyndicationFeed.RSS}, name='feed_rss'),
+    path('json/', views.feed, {'format': SyndicationFeed.JSON}, name='feed_json'),
+]
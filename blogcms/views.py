@@ -1,3 +1,22 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
 
-# Create your views here.
+from .feeds import get_feed
+
+
+@require_safe
+def feed(request, format):
+    """Serve a stored feed, answering conditional polls with 304 Not Modified"""
+    snapshot = get_feed(format)
+    etag = quote_etag(snapshot.etag)
+    last_modified = int(snapshot.last_modified.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(snapshot.content, content_type=snapshot.content_type)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=300)
+    return response
@@ -1,7 +1,7 @@
 # settings.py
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import dj_database_url  # <-- add this import
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -67,16 +67,27 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS + WAGTAIL_APPS
 WAGTAIL_SITE_NAME = "Dr Paul Mwambu"
 
 MIDDLEWARE = [
+    # Request counts and latency for /metrics; first, to time everything below
+    'portfolio.metrics.MetricsMiddleware',
+    # Development: N+1 and query budget warnings (QUERY_INSPECTOR)
+    'portfolio.query_inspector.QueryInspectorMiddleware',
+
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
 
     # WhiteNoise must be directly after SecurityMiddleware
     'whitenoise.middleware.WhiteNoiseMiddleware',
 
+    # Link preload hints (and 103 Early Hints where the server supports them)
+    'portfolio.middleware.PreloadHintsMiddleware',
+
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Staff-requested (?_profile=1) and sampled request profiles, see the admin
+    'portfolio.profiling.ProfilingMiddleware',
+    'portfolio.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'wagtail.contrib.redirects.middleware.RedirectMiddleware',
@@ -85,7 +96,8 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'dr_paulM.urls'
 
 TEMPLATES = [{
-    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    # Django's backend, timing each render for /metrics
+    'BACKEND': 'portfolio.metrics.InstrumentedDjangoTemplates',
     'DIRS': [BASE_DIR / 'templates'],
     'APP_DIRS': True,
     'OPTIONS': {
@@ -110,6 +122,39 @@ DATABASES = {
     )
 }
 
+# Optional read replicas (comma separated URLs). Public GET requests read from
+# a replica lagging less than REPLICA_MAX_LAG seconds; writes, the admin and
+# visitors who wrote in the last REPLICA_STICKY_SECONDS use the primary.
+# Locally, point this at a copy of db.sqlite3 to try it out.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{_index}'] = {
+        **dj_database_url.parse(_url, conn_max_age=600, ssl_require=not DEBUG),
+        'TEST': {'MIRROR': 'default'},
+    }
+if DATABASE_REPLICA_URLS:
+    DATABASE_ROUTERS = ['portfolio.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=10, cast=float)
+
+# Optional in-process connection pool for threaded workers: connections are
+# checked out per request, pinged before reuse and recycled. 0 keeps Django's
+# persistent per-thread connections. Compare with `manage.py benchmark_db_pool`.
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=0, cast=int)
+POOLED_ENGINES = {
+    'django.db.backends.postgresql': 'portfolio.db.backends.postgresql',
+    'django.db.backends.sqlite3': 'portfolio.db.backends.sqlite3',
+}
+if DB_POOL_SIZE:
+    for _database in DATABASES.values():
+        _database['ENGINE'] = POOLED_ENGINES.get(_database['ENGINE'], _database['ENGINE'])
+        _database['CONN_MAX_AGE'] = 0  # return the connection after each request
+        _database['POOL'] = {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'RECYCLE': config('DB_POOL_RECYCLE', default=3600, cast=int),
+        }
+
 # --- Internationalization ---
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Africa/Kampala'
@@ -136,6 +181,103 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# /api/batch/: sub-requests per batch, and threads for "parallel" batches
+API_BATCH_MAX_REQUESTS = config('API_BATCH_MAX_REQUESTS', default=20, cast=int)
+API_BATCH_MAX_WORKERS = config('API_BATCH_MAX_WORKERS', default=4, cast=int)
+
+# Sitemaps: URLs per chunk file, and seconds to debounce content changes
+# before the background rebuild (0 rebuilds inline)
+SITEMAP_CHUNK_SIZE = config('SITEMAP_CHUNK_SIZE', default=5000, cast=int)
+SITEMAP_REBUILD_DELAY = config('SITEMAP_REBUILD_DELAY', default=5, cast=int)
+
+# Blog feeds: seconds to debounce publishing changes before the background
+# re-render of the stored feeds (0 re-renders inline)
+FEED_REBUILD_DELAY = config('FEED_REBUILD_DELAY', default=5, cast=int)
+
+# Related content (portfolio.related): seconds to debounce content changes
+# before the background update of the recommendations (0 updates inline)
+RELATED_CONTENT_DELAY = config('RELATED_CONTENT_DELAY', default=5, cast=int)
+
+# Gallery (portfolio.gallery): images per infinite-scroll page, and the
+# longest edge of generated thumbnails in pixels
+GALLERY_PAGE_SIZE = config('GALLERY_PAGE_SIZE', default=12, cast=int)
+GALLERY_THUMBNAIL_SIZE = config('GALLERY_THUMBNAIL_SIZE', default=480, cast=int)
+
+# Offline support (portfolio.offline): the service worker precaches the
+# hashed static files under these prefixes and caches visited public pages.
+# Turning it off makes installed workers remove themselves.
+OFFLINE_ENABLED = config('OFFLINE_ENABLED', default=True, cast=bool)
+OFFLINE_PRECACHE_STATIC = ['css/output.css', 'js/', 'vendor/']
+
+# Contact message retention: older messages are archived to gzip NDJSON
+# files by `manage.py archive_messages` and pruned from the table
+MESSAGE_RETENTION_DAYS = config('MESSAGE_RETENTION_DAYS', default=365, cast=int)
+MESSAGE_ARCHIVE_DIR = config('MESSAGE_ARCHIVE_DIR', default=str(BASE_DIR / 'archives'))
+
+# Django cache, shared by every worker: the page cache and the gallery feed
+# live here, and a single-flight leader (portfolio.singleflight) fills it for
+# the other workers waiting on its advisory lock. Files are shared by the
+# workers of one host; point CACHE_BACKEND and CACHE_LOCATION at Redis or
+# Memcached when serving from several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    }
+}
+
+# Public page cache (portfolio.page_cache): pages are fresh for MAX_AGE
+# seconds, then served stale for up to STALE_WHILE_REVALIDATE more seconds
+# while a background thread re-renders them. MAX_AGE=0 disables the cache.
+PAGE_CACHE_MAX_AGE = config('PAGE_CACHE_MAX_AGE', default=60, cast=int)
+PAGE_CACHE_STALE_WHILE_REVALIDATE = config('PAGE_CACHE_STALE_WHILE_REVALIDATE', default=600, cast=int)
+
+# Single-flight coalescing (portfolio.singleflight): seconds a request waits
+# for another one computing the same value before computing it itself
+SINGLE_FLIGHT_TIMEOUT = config('SINGLE_FLIGHT_TIMEOUT', default=10, cast=float)
+
+# Prometheus metrics (portfolio.metrics): each worker writes its counts to
+# METRICS_DIR (default: a per-project temp directory) at most every
+# FLUSH_INTERVAL seconds; /metrics merges them. Set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on scrapes; without one, scrapes are only
+# allowed from METRICS_ALLOWED_IPS unless DEBUG is on.
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=1.0, cast=float)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+# Render time is recorded for these templates only (one series each)
+METRICS_TEMPLATE_PREFIXES = ['portfolio/', 'blogcms/']
+
+# Request profiling (portfolio.profiling): staff add ?_profile=1 or an
+# X-Profile header; SAMPLE_RATE (0-1) also profiles that share of all requests.
+# Reports are written to PROFILE_DIR and listed in the admin.
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILE_MAX_REPORTS = config('PROFILE_MAX_REPORTS', default=200, cast=int)
+
+# Query inspection (portfolio.query_inspector), on by default in development:
+# a query shape repeated REPEAT_THRESHOLD times in one request is reported as
+# an N+1, as is a page running more queries than its QUERY_BUDGETS entry.
+# STRICT raises instead of logging; `manage.py check_query_budgets` enforces
+# the budgets in CI.
+QUERY_INSPECTOR = config('QUERY_INSPECTOR', default=DEBUG, cast=bool)
+QUERY_INSPECTOR_STRICT = config('QUERY_INSPECTOR_STRICT', default=False, cast=bool)
+QUERY_REPEAT_THRESHOLD = config('QUERY_REPEAT_THRESHOLD', default=3, cast=int)
+QUERY_BUDGETS = {
+    '/': 7,
+    '/about/': 2,
+    '/projects/': 3,
+    '/awards/': 3,
+    '/gallery/': 2,
+    '/testimonials/': 2,
+}
+
+# Cross-worker cache invalidation: without Postgres LISTEN/NOTIFY, model
+# generation counters live in this memory-mapped file (default: a per-project
+# file in the temp directory)
+CACHE_GENERATIONS_FILE = config('CACHE_GENERATIONS_FILE', default='')
+
 # CORS (keep if you actually need it)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -156,17 +298,41 @@ CSRF_COOKIE_SECURE = not DEBUG
 # Logging (optional)
 LOG_DIR = BASE_DIR / 'logs'
 os.makedirs(LOG_DIR, exist_ok=True)
+# Records are queued and written as JSON lines by a background thread
+# (portfolio.log); the file is rotated at LOG_MAX_BYTES or every
+# LOG_ROTATE_INTERVAL seconds, keeping LOG_BACKUP_COUNT gzipped backups
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+LOG_ROTATE_INTERVAL = config('LOG_ROTATE_INTERVAL', default=24 * 60 * 60, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=14, cast=int)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'portfolio.log.JsonFormatter'},
+    },
+    'filters': {
+        # Fraction of records kept from high-volume loggers (errors are always kept):
+        # 4xx warnings from crawlers and the development server's access log
+        'sample': {
+            '()': 'portfolio.log.SamplingFilter',
+            'rates': {'django.request': 0.1, 'django.server': 0.1},
+        },
+    },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'portfolio.log.QueueFileHandler',
             'filename': LOG_DIR / 'django.log',
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'interval': LOG_ROTATE_INTERVAL,
+            'formatter': 'json',
+            'filters': ['sample'],
         },
     },
     'loggers': {
         'django': {'handlers': ['file'], 'level': 'INFO', 'propagate': True},
+        'portfolio': {'handlers': ['file'], 'level': 'INFO', 'propagate': True},
+        'blogcms': {'handlers': ['file'], 'level': 'INFO', 'propagate': True},
     },
 }
@@ -9,11 +9,15 @@ from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.documents import urls as wagtaildocs_urls
 from wagtail import urls as wagtail_urls   # <-- add this
 
+from portfolio.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('cms/', include(wagtailadmin_urls)),   # Wagtail admin UI
     path('documents/', include(wagtaildocs_urls)),
     path('api/', include('portfolio.api_urls')),
+    path('metrics', metrics_view, name='metrics'),   # Prometheus scrape target
+    path('blog/feed/', include('blogcms.urls')),  # Atom / RSS / JSON Feed
     path('', include('portfolio.urls')),        # your non-Wagtail pages
 
     path('', include(wagtail_urls)),            # <-- add this LAST
@@ -1,11 +1,116 @@
-from django.contrib import admin
+import csv
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
+from django.utils import timezone
 from django.utils.html import format_html
+from . import profiling
+from .gallery_upload import upload_zip
+from .importers import BulkImporter, IMPORTERS, detect_format, read_rows
 from .models import (
-    Bio, Project, Award, GalleryImage, BlogPost, 
-    Testimonial, Message, SiteSettings
+    Bio, Project, Award, GalleryImage, BlogPost, BlogTag,
+    Testimonial, Message, SiteSettings, ProfileReport
 )
 
 
+class EstimatedCountPaginator(Paginator):
+    """Use the Postgres planner's row estimate for large, unfiltered changelists"""
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 until the table has been analyzed
+            if row and row[0] >= self.threshold:
+                return row[0]
+        return super().count
+
+
+class _Echo:
+    """File-like object that hands csv.writer output straight back"""
+    def write(self, value):
+        return value
+
+
+class BulkImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row, or NDJSON (.ndjson / .jsonl)")
+    dry_run = forms.BooleanField(required=False, help_text="Validate only, do not write anything")
+
+
+class GalleryZipUploadForm(forms.Form):
+    archive = forms.FileField(help_text="ZIP of JPEG/PNG/WebP photos; captions are taken from file names")
+    category = forms.ChoiceField(choices=GalleryImage._meta.get_field('category').choices, initial='events')
+    date = forms.DateField(initial=timezone.localdate, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean_archive(self):
+        archive = self.cleaned_data['archive']
+        if not archive.name.lower().endswith('.zip'):
+            raise forms.ValidationError("Please upload a .zip file")
+        return archive
+
+
+class BulkImportAdminMixin:
+    """Adds a CSV/NDJSON bulk import page to the changelist"""
+    change_list_template = 'admin/portfolio/change_list_import.html'
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        opts = self.model._meta
+        result = None
+        form = BulkImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            dry_run = form.cleaned_data['dry_run']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+            importer = BulkImporter(opts.model_name, dry_run=dry_run)
+            try:
+                result = importer.run(read_rows(stream, detect_format(upload.name)))
+            except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f"Could not read {upload.name}: {e}")
+            else:
+                level = messages.WARNING if result.errors else messages.SUCCESS
+                verb = "would be" if dry_run else "were"
+                messages.add_message(
+                    request, level,
+                    f"{result.created} {verb} created and {result.updated} {verb} updated; "
+                    f"{len(result.errors)} rows rejected.",
+                )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': opts,
+            'title': f'Bulk import {opts.verbose_name_plural}',
+            'form': form,
+            'result': result,
+            'dry_run': form.cleaned_data.get('dry_run') if form.is_bound and form.is_valid() else False,
+            'natural_key': IMPORTERS[opts.model_name].natural_key,
+        }
+        return TemplateResponse(request, 'admin/portfolio/import.html', context)
+
+
 @admin.register(Bio)
 class BioAdmin(admin.ModelAdmin):
     list_display = ['name', 'title', 'organization', 'updated_at']
@@ -28,7 +133,7 @@ class BioAdmin(admin.ModelAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(BulkImportAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'status', 'start_date', 'featured', 'created_at']
     list_filter = ['status', 'featured', 'start_date']
     search_fields = ['title', 'description']
@@ -51,7 +156,7 @@ class ProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(Award)
-class AwardAdmin(admin.ModelAdmin):
+class AwardAdmin(BulkImportAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'organization', 'date', 'category', 'featured']
     list_filter = ['category', 'featured', 'date']
     search_fields = ['name', 'organization', 'description']
@@ -71,15 +176,52 @@ class AwardAdmin(admin.ModelAdmin):
 
 
 @admin.register(GalleryImage)
-class GalleryImageAdmin(admin.ModelAdmin):
+class GalleryImageAdmin(BulkImportAdminMixin, admin.ModelAdmin):
     list_display = ['caption', 'category', 'date', 'featured']
     list_filter = ['category', 'featured', 'date']
     search_fields = ['caption', 'description']
     readonly_fields = ['created_at']
+    change_list_template = 'admin/portfolio/gallery_change_list.html'
+
+    def get_urls(self):
+        return [
+            path('upload-zip/', self.admin_site.admin_view(self.upload_zip_view),
+                 name='portfolio_galleryimage_upload_zip'),
+        ] + super().get_urls()
+
+    def upload_zip_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        form = GalleryZipUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                result = upload_zip(
+                    form.cleaned_data['archive'],
+                    category=form.cleaned_data['category'],
+                    date=form.cleaned_data['date'],
+                )
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                level = messages.WARNING if result.skipped else messages.SUCCESS
+                messages.add_message(
+                    request, level,
+                    f"Added {len(result.created)} images; skipped {len(result.skipped)} files.",
+                )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Upload gallery ZIP',
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/portfolio/gallery_upload_zip.html', context)
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.image.url)
+            preview = obj.thumbnail or obj.image
+            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', preview.url)
         return "No image"
     image_preview.short_description = "Preview"
     
@@ -118,6 +260,13 @@ class BlogPostAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(BlogTag)
+class BlogTagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'post_count']
+    search_fields = ['name', 'slug']
+    readonly_fields = ['post_count']
+
+
 @admin.register(Testimonial)
 class TestimonialAdmin(admin.ModelAdmin):
     list_display = ['author', 'organization', 'featured', 'created_at']
@@ -142,8 +291,13 @@ class TestimonialAdmin(admin.ModelAdmin):
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['name', 'email', 'subject', 'read', 'replied', 'sent_at']
     list_filter = ['read', 'replied', 'sent_at']
+    # On Postgres each of these has a trigram index (migration 0011), so
+    # searching message bodies does not scan the whole table
     search_fields = ['name', 'email', 'subject', 'message']
     readonly_fields = ['sent_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    csv_export_fields = ['id', 'name', 'email', 'subject', 'message', 'sent_at', 'read', 'replied']
     fieldsets = (
         ('Message Information', {
             'fields': ('name', 'email', 'subject', 'message')
@@ -165,7 +319,23 @@ class MessageAdmin(admin.ModelAdmin):
         queryset.update(replied=True)
     mark_as_replied.short_description = "Mark selected messages as replied"
 
-    actions = [mark_as_read, mark_as_replied]
+    def export_as_csv(self, request, queryset):
+        # Stream rows in chunks so memory stays flat however many are selected
+        writer = csv.writer(_Echo())
+        fields = self.csv_export_fields
+        rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=2000)
+
+        def stream():
+            yield writer.writerow(fields)
+            for row in rows:
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="messages.csv"'
+        return response
+    export_as_csv.short_description = "Export selected messages as CSV"
+
+    actions = [mark_as_read, mark_as_replied, export_as_csv]
 
 
 @admin.register(SiteSettings)
@@ -197,3 +367,51 @@ class SiteSettingsAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Prevent deletion of the only instance
         return False
+
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    """Read-only browser for request profiles; the change page shows the report"""
+    list_display = ['created_at', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'trigger', 'user']
+    list_filter = ['trigger', 'method', 'status_code', 'created_at']
+    search_fields = ['path', 'user']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='portfolio_profilereport_download'),
+        ] + super().get_urls()
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        report = self.get_object(request, object_id)
+        if report is None or not self.has_view_permission(request, report):
+            raise PermissionDenied
+        try:
+            data = profiling.load_report(report.key)
+        except FileNotFoundError:
+            data = None
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': str(report),
+            'report': report,
+            'data': data,
+        }
+        return TemplateResponse(request, 'admin/portfolio/profile_report.html', context)
+
+    def download_view(self, request, pk):
+        report = self.get_object(request, str(pk))
+        if report is None or not self.has_view_permission(request, report):
+            raise PermissionDenied
+        try:
+            stats = open(profiling.report_dir() / f'{report.key}.prof', 'rb')
+        except FileNotFoundError:
+            raise Http404("The profile file is gone")
+        return FileResponse(stats, as_attachment=True, filename=f'profile-{report.pk}.prof')
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .api_views import (
     ProjectViewSet, AwardViewSet, GalleryImageViewSet, 
-    BlogPostViewSet, TestimonialViewSet, BioViewSet
+    BlogPostViewSet, TestimonialViewSet, BioViewSet, BatchView, ChangesView, ExportView
 )
 
 router = DefaultRouter()
@@ -14,5 +14,8 @@ router.register(r'testimonials', TestimonialViewSet)
 router.register(r'bio', BioViewSet)
 
 urlpatterns = [
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('changes/', ChangesView.as_view(), name='changes'),
+    path('export/', ExportView.as_view(), name='export'),
     path('', include(router.urls)),
 ]
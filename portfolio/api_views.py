@@ -1,13 +1,20 @@
-from rest_framework import viewsets, filters
+from django.http import StreamingHttpResponse
+from django.utils.text import compress_sequence
+from rest_framework import viewsets, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from .batch import BatchError, parse_batch, run_batch
+from .changes import MAX_PAGE_SIZE, PAGE_SIZE, changes_since
+from .export import iter_export, parse_since
+from django.utils.text import slugify
 from .models import (
-    Bio, Project, Award, GalleryImage, BlogPost, 
+    Bio, Project, Award, GalleryImage, BlogPost, BlogTag,
     Testimonial, Message, SiteSettings
 )
 from .serializers import (
     BioSerializer, ProjectSerializer, AwardSerializer, 
-    GalleryImageSerializer, BlogPostSerializer, 
+    GalleryImageSerializer, BlogPostSerializer, BlogTagSerializer,
     TestimonialSerializer, MessageSerializer, SiteSettingsSerializer
 )
 
@@ -74,10 +81,25 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = BlogPost.objects.filter(published=True)
     serializer_class = BlogPostSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'body', 'tags']
+    search_fields = ['title', 'body', 'tag_index__name']
     ordering_fields = ['date', 'updated_at']
     ordering = ['-date']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tag = self.request.query_params.get('tag')
+        if tag:
+            # Exact match through the indexed tag table, not a substring scan
+            queryset = queryset.filter(tag_index__slug=slugify(tag))
+        return queryset
+
+    @action(detail=False)
+    def tags(self, request):
+        """Tag cloud: published post counts per tag, read from the cached counts"""
+        tags = BlogTag.objects.filter(post_count__gt=0)
+        serializer = BlogTagSerializer(tags, many=True)
+        return Response(serializer.data)
+
     @action(detail=False)
     def featured(self, request):
         """Get featured blog posts"""
@@ -116,3 +138,74 @@ class SiteSettingsViewSet(viewsets.ReadOnlyModelViewSet):
     """API viewset for site settings"""
     queryset = SiteSettings.objects.all()
     serializer_class = SiteSettingsSerializer
+
+
+class ExportView(APIView):
+    """Stream every portfolio object and live blog page as NDJSON
+
+    Query parameters: ``since`` (ISO date/datetime), ``models`` (comma
+    separated, e.g. ``project,award``) and ``gzip=1`` for a compressed body.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError as e:
+            return Response({'since': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        labels = [name.strip().lower() for name in request.query_params.get('models', '').split(',') if name.strip()]
+
+        lines = iter_export(since=since, labels=labels)
+        if request.query_params.get('gzip') in ('1', 'true'):
+            response = StreamingHttpResponse(
+                compress_sequence(line.encode('utf-8') for line in lines),
+                content_type='application/gzip',
+            )
+            filename = 'export.ndjson.gz'
+        else:
+            response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+            filename = 'export.ndjson'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ChangesView(APIView):
+    """Creates, updates and deletes after a cursor, for incremental client sync
+
+    Query parameters: ``since`` (the ``cursor`` of the previous response;
+    0 or omitted for a full sync) and ``limit``. Keep requesting with the
+    new cursor while ``has_more`` is true.
+    """
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since') or 0)
+            limit = int(request.query_params.get('limit') or PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {'detail': "'since' and 'limit' must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        return Response(changes_since(max(since, 0), limit, self.get_serializer_context()))
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
+
+
+class BatchView(APIView):
+    """Run several GET requests against the API in one round trip
+
+    POST a JSON list of paths, or ``{"requests": [...], "parallel": true}``
+    where each request is a path (``projects/?page=2``, ``/api/bio/``) or
+    ``{"method": "GET", "path": ...}``. The response lists, in order, each
+    request's ``path``, ``status`` and ``body``. The batch succeeds even
+    when some of its requests do not.
+    """
+
+    def post(self, request):
+        try:
+            paths, parallel = parse_batch(request.data)
+        except BatchError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'responses': run_batch(request._request, paths, parallel=parallel)})
@@ -0,0 +1,250 @@
+"""
+Self-hosted third-party assets and critical CSS.
+
+``manage.py vendor_assets`` downloads the fonts and lightbox files the
+templates use into ``static/vendor/``; ``collectstatic`` then gives them
+manifest-hashed names like any other static file. Until an asset has been
+vendored, templates fall back to its CDN URL.
+
+Critical CSS is the part of ``css/output.css`` that the header and first
+section of a page need. It is extracted per template, inlined in the page,
+and the full stylesheet loads asynchronously.
+"""
+import re
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+VENDOR_DIR = 'vendor'
+# Google Fonts only serves woff2 to browsers it recognises
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+
+@dataclass
+class VendorAsset:
+    url: str
+    path: str         # relative to STATIC_URL once vendored
+    origins: tuple = ()  # (origin, crossorigin) to preconnect to while on the CDN
+
+
+VENDOR_ASSETS = {
+    'inter': VendorAsset(
+        url='https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap',
+        path=f'{VENDOR_DIR}/inter/inter.css',
+        origins=(('https://fonts.googleapis.com', False), ('https://fonts.gstatic.com', True)),
+    ),
+    'lightbox-css': VendorAsset(
+        url='https://cdnjs.cloudflare.com/ajax/libs/lightbox2/2.11.4/css/lightbox.min.css',
+        path=f'{VENDOR_DIR}/lightbox2/css/lightbox.min.css',
+        origins=(('https://cdnjs.cloudflare.com', False),),
+    ),
+    'lightbox-js': VendorAsset(
+        url='https://cdnjs.cloudflare.com/ajax/libs/lightbox2/2.11.4/js/lightbox.min.js',
+        path=f'{VENDOR_DIR}/lightbox2/js/lightbox.min.js',
+        origins=(('https://cdnjs.cloudflare.com', False),),
+    ),
+}
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _fetch(url, timeout=30):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def vendor_asset(name, root=None):
+    """Download one asset, and anything its CSS references, into ``root``
+
+    ``url()`` references are saved next to the stylesheet and rewritten to
+    relative paths, so collectstatic can fingerprint them as well. Returns
+    the list of files written.
+    """
+    asset = VENDOR_ASSETS[name]
+    root = Path(root or settings.STATICFILES_DIRS[0])
+    target = root / asset.path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    content = _fetch(asset.url)
+    if target.suffix == '.css':
+        css = content.decode('utf-8')
+
+        def localise(match):
+            reference = match.group(2)
+            if reference.startswith('data:'):
+                return match.group(0)
+            source = urljoin(asset.url, reference)
+            if urlsplit(reference).netloc or reference.startswith('/'):
+                relative = f'files/{PurePosixPath(urlsplit(source).path).name}'
+            else:
+                relative = reference  # e.g. ../images/close.png
+            local = (target.parent / relative).resolve()
+            if root.resolve() not in local.parents:
+                raise ValueError(f"{reference!r} would be written outside {root}")
+            local.parent.mkdir(parents=True, exist_ok=True)
+            local.write_bytes(_fetch(source))
+            written.append(local)
+            return f"url('{relative}')"
+
+        content = CSS_URL_RE.sub(localise, css).encode('utf-8')
+
+    target.write_bytes(content)
+    written.append(target)
+    return written
+
+
+def is_vendored(name):
+    """Whether the asset has been vendored and is servable as a static file"""
+    path = VENDOR_ASSETS[name].path
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if hashed_files:
+        return path in hashed_files
+    return finders.find(path) is not None
+
+
+def asset_url(name):
+    """Local static URL of a vendored asset, or its CDN URL"""
+    asset = VENDOR_ASSETS[name]
+    return staticfiles_storage.url(asset.path) if is_vendored(name) else asset.url
+
+
+# --- Critical CSS -----------------------------------------------------------
+
+STYLESHEET = 'css/output.css'
+EXTENDS_RE = re.compile(r"""{%\s*extends\s+['"]([^'"]+)['"]\s*%}""")
+INCLUDE_RE = re.compile(r"""{%\s*include\s+['"]([^'"]+)['"]""")
+CONTENT_BLOCK_RE = re.compile(r"{%\s*block\s+content\s*%}")
+TOKEN_RE = re.compile(r"[^\s\"'`<>=]+")
+CLASS_RE = re.compile(r"\.((?:\\.|[\w-])+)")
+UNESCAPE_RE = re.compile(r"\\(.)")
+
+
+def _parse_rules(css):
+    """Split minified CSS into ``(at_rule or None, selectors, body)`` rules"""
+    rules = []
+    position, length = 0, len(css)
+    stack = []
+    while position < length:
+        brace = css.find('{', position)
+        close = css.find('}', position)
+        if close != -1 and (brace == -1 or close < brace):
+            if stack:
+                stack.pop()
+            position = close + 1
+            continue
+        if brace == -1:
+            break
+        prelude = css[position:brace].strip()
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            stack.append(prelude)
+            position = brace + 1
+            continue
+        end = css.find('}', brace)
+        if prelude.startswith('@'):
+            # @font-face, @keyframes and friends; @keyframes nest one level
+            depth, end = 1, brace + 1
+            while depth and end < length:
+                if css[end] == '{':
+                    depth += 1
+                elif css[end] == '}':
+                    depth -= 1
+                end += 1
+            rules.append((stack[-1] if stack else None, prelude, css[brace:end]))
+            position = end
+            continue
+        rules.append((stack[-1] if stack else None, prelude, css[brace:end + 1]))
+        position = end + 1
+    return rules
+
+
+def _split_selectors(prelude):
+    """Split a selector list on top-level commas (not those inside :is() etc.)"""
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and not depth:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def _selector_used(selector, tokens):
+    classes = [UNESCAPE_RE.sub(r'\1', name) for name in CLASS_RE.findall(selector)]
+    return all(name in tokens for name in classes)
+
+
+def extract_critical_css(css, tokens):
+    """Rules whose class selectors only use ``tokens``, keeping @media groups"""
+    output, current_media = [], None
+    for media, prelude, body in _parse_rules(css):
+        if prelude.startswith('@'):
+            continue  # fonts and animations arrive with the full stylesheet
+        selectors = [s for s in _split_selectors(prelude) if _selector_used(s, tokens)]
+        if not selectors:
+            continue
+        if media != current_media:
+            if current_media:
+                output.append('}')
+            if media:
+                output.append(media + '{')
+            current_media = media
+        output.append(','.join(selectors) + body)
+    if current_media:
+        output.append('}')
+    return ''.join(output)
+
+
+def above_the_fold(template, engine):
+    """Template text for the page chrome and first section of a page"""
+    parts = []
+    source = template.source
+    while True:
+        parent = EXTENDS_RE.search(source)
+        if parent:
+            # Child template: everything up to the end of its first section
+            end = source.find('</section>')
+            parts.append(source if end == -1 else source[:end])
+        else:
+            # Root layout: the header and navigation above the content block
+            block = CONTENT_BLOCK_RE.search(source)
+            parts.append(source[:block.start()] if block else source)
+        for name in INCLUDE_RE.findall(parts[-1]):
+            parts.append(engine.get_template(name).source)
+        if not parent:
+            return '\n'.join(parts)
+        source = engine.get_template(parent.group(1)).source
+
+
+def _stylesheet_text():
+    path = finders.find(STYLESHEET)
+    if path:
+        return Path(path).read_text(encoding='utf-8')
+    with staticfiles_storage.open(STYLESHEET) as f:
+        return f.read().decode('utf-8')
+
+
+_critical_cache = {}
+
+
+def critical_css(template):
+    """Critical CSS for a compiled template, cached per process"""
+    key = template.origin.name if template.origin else id(template)
+    if key not in _critical_cache or settings.DEBUG:
+        text = above_the_fold(template, template.engine)
+        tokens = set(TOKEN_RE.findall(text))
+        _critical_cache[key] = extract_critical_css(_stylesheet_text(), tokens)
+    return _critical_cache[key]
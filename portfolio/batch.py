@@ -0,0 +1,132 @@
+"""
+Batched API reads.
+
+``run_batch`` executes several GET sub-requests against the API in one
+HTTP request, so a client screen that needs projects, awards and the bio
+costs one round trip instead of three. Sub-requests go straight to the
+resolved view: middleware, authentication and the connection are paid for
+once by the outer request, whose user and credentials the sub-requests
+share.
+"""
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve, reverse
+
+logger = logging.getLogger(__name__)
+
+# Headers of the outer request passed on to every sub-request
+SHARED_META = (
+    'HTTP_HOST', 'SERVER_NAME', 'SERVER_PORT', 'SCRIPT_NAME', 'REMOTE_ADDR',
+    'wsgi.url_scheme', 'HTTP_X_FORWARDED_PROTO', 'HTTP_X_FORWARDED_HOST',
+    'HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_ACCEPT_LANGUAGE', 'HTTP_USER_AGENT',
+)
+# Endpoints that make no sense inside a batch: itself, and streamed exports
+EXCLUDED_URL_NAMES = ('batch', 'export')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_batch(data):
+    """Validate a batch body; return (paths, parallel) or raise BatchError"""
+    if isinstance(data, list):
+        data = {'requests': data}
+    if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+        raise BatchError("Expected a list of requests, or an object with a 'requests' list")
+    items = data['requests']
+    if not items:
+        raise BatchError("The batch is empty")
+    if len(items) > settings.API_BATCH_MAX_REQUESTS:
+        raise BatchError(f"At most {settings.API_BATCH_MAX_REQUESTS} requests per batch")
+    paths = []
+    for item in items:
+        if isinstance(item, dict):
+            method = str(item.get('method', 'GET')).upper()
+            if method != 'GET':
+                raise BatchError("Only GET requests can be batched")
+            item = item.get('path')
+        if not isinstance(item, str) or not item:
+            raise BatchError("Each request needs a 'path'")
+        paths.append(item)
+    return paths, bool(data.get('parallel', False))
+
+
+def _sub_request(request, path):
+    url = urlsplit(path)
+    api_root = reverse('api-root')
+    full_path = url.path if url.path.startswith('/') else api_root + url.path
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = full_path
+    sub.META = {key: request.META[key] for key in SHARED_META if key in request.META}
+    sub.META.update(
+        REQUEST_METHOD='GET', PATH_INFO=full_path, QUERY_STRING=url.query,
+        HTTP_ACCEPT='application/json',
+    )
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = request.COOKIES
+    for attribute in ('user', 'session'):
+        if hasattr(request, attribute):
+            setattr(sub, attribute, getattr(request, attribute))
+    return sub, api_root
+
+
+def _execute(request, path):
+    sub, api_root = _sub_request(request, path)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        match = None
+    # Wagtail's catch-all route would match any path, so check the route itself
+    if match is None or not match.route.startswith(api_root.lstrip('/')):
+        if sub.path.startswith(api_root):
+            return {'path': path, 'status': 404, 'body': {'detail': "Not found."}}
+        return {'path': path, 'status': 400, 'body': {'detail': "Only API paths can be batched"}}
+    if match.url_name in EXCLUDED_URL_NAMES:
+        return {'path': path, 'status': 400, 'body': {'detail': "This endpoint cannot be batched"}}
+    sub.resolver_match = match
+
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    except Exception:
+        logger.exception("Batched request %s failed", path)
+        return {'path': path, 'status': 500, 'body': {'detail': "Server error."}}
+
+    if response.streaming:
+        return {'path': path, 'status': 400, 'body': {'detail': "This endpoint cannot be batched"}}
+    if response.get('Content-Type', '').startswith('application/json'):
+        body = json.loads(response.content or b'null')
+    else:
+        body = response.content.decode(response.charset, errors='replace')
+    return {'path': path, 'status': response.status_code, 'body': body}
+
+
+def _execute_in_thread(request, path):
+    try:
+        return _execute(request, path)
+    finally:
+        connections.close_all()  # this thread's connections die with it
+
+
+def run_batch(request, paths, parallel=False):
+    """Responses for each path, in order, as ``{'path', 'status', 'body'}``"""
+    workers = min(settings.API_BATCH_MAX_WORKERS, len(paths))
+    if not parallel or workers < 2:
+        return [_execute(request, path) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-batch') as executor:
+        # Each task runs in a copy of the request's context (e.g. replica routing)
+        futures = [
+            executor.submit(contextvars.copy_context().run, _execute_in_thread, request, path)
+            for path in paths
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,240 @@
+"""
+Change feed for client sync.
+
+Every save or delete of a synced object replaces that object's row in
+ChangeLogEntry and gives it a new ``position``, higher than any before it.
+Clients keep the ``cursor`` from their last response and ask only for what
+changed after it; a feed read from cursor 0 is a full sync. Objects that are
+no longer visible through the public API (deleted, unpublished) are reported
+as ``deleted`` tombstones.
+
+Entries are collected while a transaction runs and written by one
+``on_commit`` hook once it commits. Each recorded change also registers an
+empty hook that keeps its entries alive, so when Django drops the hooks of a
+rolled-back savepoint the entries recorded inside it are dropped with them.
+
+The cursor is only safe if positions become visible in order: a reader must
+never see position 11 while 10 can still commit. On PostgreSQL rows are
+written without a position and numbered afterwards, in a short transaction
+of their own: numbers come from a sequence, and an advisory lock lets one
+process number at a time, so later numbers always commit later. Writing the
+rows takes no lock. SQLite runs one write transaction at a time, so the
+transaction that writes the rows numbers them as well.
+"""
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import connection, transaction
+from django.db.models import F, Max
+from wagtail.rich_text import expand_db_html
+
+from blogcms.models import BlogPage
+from .export import BLOG_PAGE_FIELDS
+from .models import (
+    Award, Bio, BlogPost, ChangeLogEntry, GalleryImage, Project,
+    SiteSettings, Testimonial,
+)
+from .serializers import (
+    AwardSerializer, BioSerializer, BlogPostSerializer, GalleryImageSerializer,
+    ProjectSerializer, SiteSettingsSerializer, TestimonialSerializer,
+)
+
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def _serialize_blog_pages(pages, context):
+    data = []
+    for page in pages:
+        fields = {name: getattr(page, name) for name in BLOG_PAGE_FIELDS}
+        fields['id'] = page.pk
+        fields['url'] = page.url
+        fields['body'] = expand_db_html(page.body)
+        fields['tags'] = [tag.name for tag in page.tags.all()]
+        data.append(fields)
+    return data
+
+
+def _serializer(serializer_class):
+    return lambda objects, context: serializer_class(objects, many=True, context=context).data
+
+
+@dataclass
+class SyncedModel:
+    queryset: Callable
+    serialize: Callable
+
+
+# Model label -> the objects clients may see and how they are serialised
+SYNCED_MODELS = {
+    'portfolio.bio': SyncedModel(lambda: Bio.objects.all(), _serializer(BioSerializer)),
+    'portfolio.project': SyncedModel(lambda: Project.objects.all(), _serializer(ProjectSerializer)),
+    'portfolio.award': SyncedModel(lambda: Award.objects.all(), _serializer(AwardSerializer)),
+    'portfolio.galleryimage': SyncedModel(lambda: GalleryImage.objects.all(), _serializer(GalleryImageSerializer)),
+    'portfolio.blogpost': SyncedModel(
+        lambda: BlogPost.objects.filter(published=True), _serializer(BlogPostSerializer)
+    ),
+    'portfolio.testimonial': SyncedModel(lambda: Testimonial.objects.all(), _serializer(TestimonialSerializer)),
+    'portfolio.sitesettings': SyncedModel(lambda: SiteSettings.objects.all(), _serializer(SiteSettingsSerializer)),
+    'blogcms.blogpage': SyncedModel(
+        lambda: BlogPage.objects.live().public().prefetch_related('tags'), _serialize_blog_pages
+    ),
+}
+
+
+POSITION_SEQUENCE = 'portfolio_changelogentry_position_seq'
+POSITION_LOCK = int.from_bytes(b'changes', 'big')  # advisory lock key of the numbering step
+
+
+def record_changes(model, pks, action):
+    """Move the given objects to the head of the change log once the current transaction commits"""
+    label = model._meta.label_lower
+    pks = list(pks)
+    if label not in SYNCED_MODELS or not pks:
+        return
+    if not connection.in_atomic_block:
+        _write_entries({(label, pk): action for pk in pks})
+        return
+    _Batch.current().add(label, pks, action)
+
+
+class _Recorded:
+    """One record_changes call; alive while Django holds it as an on_commit hook"""
+    __slots__ = ('label', 'pks', 'action', '__weakref__')
+
+    def __init__(self, label, pks, action):
+        self.label, self.pks, self.action = label, pks, action
+
+    def __call__(self):
+        pass  # written by its batch, whose hook runs first
+
+
+class _Batch:
+    """The changes recorded in one transaction, written by one on_commit hook
+
+    Only Django's list of on_commit hooks holds batches and recorded changes
+    strongly. A rollback drops their hooks and with them the objects, which
+    is how a batch learns that changes were rolled back: its weak references
+    are dead by the time it writes.
+    """
+    _local = threading.local()
+
+    def __init__(self):
+        self.recorded = []
+        self.written = False
+        transaction.on_commit(self.write)
+
+    @classmethod
+    def current(cls):
+        ref = getattr(cls._local, 'batch', None)
+        batch = ref() if ref is not None else None
+        if batch is None or batch.written:
+            batch = cls()
+            cls._local.batch = weakref.ref(batch)
+        return batch
+
+    def add(self, label, pks, action):
+        recorded = _Recorded(label, pks, action)
+        transaction.on_commit(recorded)
+        self.recorded.append(weakref.ref(recorded))
+
+    def write(self):
+        self.written = True
+        entries = {}
+        for ref in self.recorded:
+            recorded = ref()
+            if recorded is None:
+                continue  # rolled back with its savepoint
+            for pk in recorded.pks:
+                key = (recorded.label, pk)
+                entries.pop(key, None)  # the latest change wins
+                entries[key] = recorded.action
+        if entries:
+            _write_entries(entries)
+
+
+def _write_entries(entries):
+    """Replace the log rows of ``{(label, pk): action}`` and give them new positions"""
+    rows = [
+        ChangeLogEntry(source=label, object_id=pk, action=action)
+        for (label, pk), action in entries.items()
+    ]
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            # Replaced rows leave the feed until they are numbered again
+            ChangeLogEntry.objects.bulk_create(
+                rows, batch_size=1000, update_conflicts=True, unique_fields=['source', 'object_id'],
+                update_fields=['action', 'changed_at', 'position'],
+            )
+        with transaction.atomic():
+            _number_new_rows()
+        return
+    # SQLite: the delete takes the database's write lock, and AUTOINCREMENT
+    # ids are never reused, so fresh ids are already numbered in commit order
+    by_label = {}
+    for label, pk in entries:
+        by_label.setdefault(label, []).append(pk)
+    with transaction.atomic():
+        for label, pks in by_label.items():
+            ChangeLogEntry.objects.filter(source=label, object_id__in=pks).delete()
+        ChangeLogEntry.objects.bulk_create(rows, batch_size=1000)
+        ChangeLogEntry.objects.filter(position__isnull=True).update(position=F('id'))
+
+
+def _number_new_rows():
+    """Number the rows left without a position; PostgreSQL only"""
+    table = ChangeLogEntry._meta.db_table
+    with connection.cursor() as cursor:
+        # Held until commit: the next numbering starts after these numbers are visible
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [POSITION_LOCK])
+        cursor.execute(
+            f"UPDATE {table} SET position = nextval('{POSITION_SEQUENCE}') WHERE position IS NULL"
+        )
+
+
+def current_cursor():
+    return ChangeLogEntry.objects.aggregate(cursor=Max('position'))['cursor'] or 0
+
+
+def changes_since(cursor, limit=PAGE_SIZE, context=None):
+    """One page of changes after ``cursor``, oldest first
+
+    Returns ``{"changes": [...], "cursor": int, "has_more": bool}``. Current
+    data is fetched with one query per model present in the page.
+    """
+    entries = list(ChangeLogEntry.objects.filter(position__gt=cursor).order_by('position')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    by_source = {}
+    for entry in entries:
+        by_source.setdefault(entry.source, []).append(entry.object_id)
+    data = {}
+    for source, ids in by_source.items():
+        synced = SYNCED_MODELS.get(source)
+        if synced is None:
+            continue
+        objects = list(synced.queryset().filter(pk__in=ids))
+        for obj, fields in zip(objects, synced.serialize(objects, context or {})):
+            data[(source, obj.pk)] = fields
+
+    changes = []
+    for entry in entries:
+        fields = data.get((entry.source, entry.object_id))
+        change = {
+            'model': entry.source,
+            'id': entry.object_id,
+            'action': entry.action if fields is not None else ChangeLogEntry.DELETED,
+            'changed_at': entry.changed_at,
+        }
+        if fields is not None:
+            change['data'] = fields
+        changes.append(change)
+
+    return {
+        'changes': changes,
+        'cursor': entries[-1].position if entries else cursor,
+        'has_more': has_more,
+    }
@@ -0,0 +1,37 @@
+from ..pool import ConnectionPool, PoolTimeout, get_pool
+
+
+class PooledDatabaseWrapperMixin:
+    """Take connections from the per-process pool instead of opening them
+
+    Pool options come from the ``POOL`` key of the database settings:
+    ``MAX_SIZE``, ``TIMEOUT``, ``RECYCLE`` and ``PRE_PING``. Backends clear
+    session state left on a returned connection in ``reset_pooled_connection``.
+    """
+
+    @staticmethod
+    def reset_pooled_connection(conn):
+        pass
+
+    def _get_pool(self):
+        options = self.settings_dict.get('POOL') or {}
+        return get_pool(self.alias, lambda: ConnectionPool(
+            max_size=options.get('MAX_SIZE', 10),
+            timeout=options.get('TIMEOUT', 10.0),
+            recycle=options.get('RECYCLE', 3600),
+            pre_ping=options.get('PRE_PING', True),
+            reset=self.reset_pooled_connection,
+        ))
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self._get_pool().acquire(
+                lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params)
+            )
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is not None:
+            reusable = not self.errors_occurred or self.is_usable()
+            self._get_pool().release(self.connection, reusable=reusable)
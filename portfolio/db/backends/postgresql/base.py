@@ -0,0 +1,12 @@
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+
+from ..pooled import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, PostgresDatabaseWrapper):
+    @staticmethod
+    def reset_pooled_connection(conn):
+        # A connection left listening would queue notifications nobody reads
+        with conn.cursor() as cursor:
+            cursor.execute('UNLISTEN *')
+        conn.commit()
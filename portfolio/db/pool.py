@@ -0,0 +1,197 @@
+"""
+In-process database connection pool.
+
+Django keeps one connection per thread; with threaded workers that means
+one connection per thread per process, whether or not the thread is busy.
+The pooled backends in ``portfolio.db.backends`` instead check a
+connection out of a bounded per-process pool when a request first touches
+the database and return it when Django closes the connection at the end of
+the request (``CONN_MAX_AGE = 0``).
+
+Connections are pinged before reuse and recycled after ``recycle`` seconds,
+so a connection dropped by the server or a proxy is replaced quietly
+instead of surfacing as a 500. A returned connection is rolled back and
+passed to the backend's ``reset`` (e.g. ``UNLISTEN *``), so no session
+state leaks to its next user. ``stats()`` reports checkouts, waits and
+pool size for monitoring.
+"""
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    waits: int = 0            # checkouts that had to wait for a free connection
+    wait_seconds: float = 0.0
+    timeouts: int = 0
+    created: int = 0
+    recycled: int = 0
+    ping_failures: int = 0
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _Waiter:
+    __slots__ = ('event', 'item')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.item = None  # (conn, created_at) handed over, or None: open a new one
+
+
+class ConnectionPool:
+    """Bounded pool; waiting threads are served first come, first served"""
+
+    def __init__(self, max_size=10, timeout=10.0, recycle=3600, pre_ping=True, reset=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.reset = reset          # called with each returned connection
+        self._idle = []             # [(raw connection, created_at)], LIFO
+        self._created_at = {}       # id(raw connection) -> created_at
+        self._in_use = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self.stats = PoolStats()
+
+    @property
+    def size(self):
+        return self._in_use + len(self._idle)
+
+    def acquire(self, connect):
+        """Check out a connection, calling ``connect()`` if a new one is needed"""
+        waiter = None
+        with self._lock:
+            self.stats.checkouts += 1
+            # Newcomers queue behind existing waiters so nobody is starved
+            if not self._waiters and (self._idle or self._in_use < self.max_size):
+                self._in_use += 1
+                item = self._idle.pop() if self._idle else None
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self.stats.waits += 1
+
+        if waiter is not None:
+            started = time.monotonic()
+            handed_over = waiter.event.wait(self.timeout)
+            with self._lock:
+                self.stats.wait_seconds += time.monotonic() - started
+                if not handed_over and waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self.stats.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection free after {self.timeout}s "
+                        f"({self.max_size} in use)"
+                    )
+            item = waiter.item
+
+        # Connect and ping outside the lock; the slot is already reserved
+        try:
+            if item is not None:
+                conn, created_at = item
+                if time.monotonic() - created_at > self.recycle:
+                    self.stats.recycled += 1
+                    self._discard(conn)
+                elif self.pre_ping and not self._alive(conn):
+                    self.stats.ping_failures += 1
+                    self._discard(conn)
+                else:
+                    return conn
+            conn = connect()
+            self._created_at[id(conn)] = time.monotonic()
+            self.stats.created += 1
+            return conn
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def release(self, conn, reusable=True):
+        """Return a connection; unusable ones are closed and their slot freed"""
+        created_at = self._created_at.get(id(conn))
+        if reusable and created_at is not None:
+            try:
+                conn.rollback()  # never hand over an open transaction
+                if self.reset is not None:
+                    self.reset(conn)
+            except Exception:
+                reusable = False
+        if not reusable or created_at is None:
+            self._discard(conn)
+            self._release_slot()
+            return
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.item = (conn, created_at)
+                waiter.event.set()
+            else:
+                self._in_use -= 1
+                self._idle.append((conn, created_at))
+
+    def _alive(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT 1')
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release_slot(self):
+        with self._lock:
+            if self._waiters:
+                # The slot passes to the next waiter, which opens a connection
+                self._waiters.popleft().event.set()
+            else:
+                self._in_use -= 1
+
+    def close_idle(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _created_at in idle:
+            self._discard(conn)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(asdict(self.stats), size=self.size, in_use=self._in_use, max_size=self.max_size)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory):
+    """The pool for a database alias in this process (pools are not shared across forks)"""
+    key = (alias, os.getpid())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = factory()
+    return pool
+
+
+def stats():
+    """Pool statistics for this process, keyed by database alias"""
+    pid = os.getpid()
+    return {alias: pool.snapshot() for (alias, owner), pool in list(_pools.items()) if owner == pid}
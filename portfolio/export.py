@@ -0,0 +1,96 @@
+"""
+Streaming NDJSON export of all portfolio content and live blog pages.
+
+Each line is one object in the shape of Django's JSON serializer
+(``{"model": ..., "pk": ..., "fields": {...}}``). Rows are read with
+``iterator(chunk_size=...)`` so memory use does not depend on table size.
+"""
+import json
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from wagtail.rich_text import expand_db_html
+
+from blogcms.models import BlogPage
+from .models import (
+    Bio, Project, Award, GalleryImage, BlogPost,
+    Testimonial, Message, SiteSettings
+)
+
+CHUNK_SIZE = 2000
+
+# Model -> timestamp field used for ``since`` filtering
+EXPORT_MODELS = {
+    Bio: 'updated_at',
+    Project: 'updated_at',
+    Award: 'updated_at',
+    GalleryImage: 'created_at',
+    BlogPost: 'updated_at',
+    Testimonial: 'created_at',
+    Message: 'sent_at',
+    SiteSettings: 'updated_at',
+    BlogPage: 'last_published_at',
+}
+
+BLOG_PAGE_FIELDS = [
+    'title', 'slug', 'url_path', 'date', 'intro', 'search_description',
+    'first_published_at', 'last_published_at', 'header_image_id',
+]
+
+
+def parse_since(value):
+    """Parse an ISO date or datetime; dates mean midnight in the site timezone"""
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid 'since' value: {value!r}")
+        since = datetime.combine(day, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _line(label, pk, fields):
+    return json.dumps({'model': label, 'pk': pk, 'fields': fields}, cls=DjangoJSONEncoder) + '\n'
+
+
+def _iter_model(model, since_field, since, chunk_size):
+    label = model._meta.label_lower
+    if model is BlogPage:
+        queryset = BlogPage.objects.live().public().prefetch_related('tags')
+    else:
+        queryset = model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(**{f'{since_field}__gte': since})
+    queryset = queryset.order_by('pk')
+
+    if model is BlogPage:
+        # Instances are needed for tags; prefetches run per chunk
+        for page in queryset.iterator(chunk_size=chunk_size):
+            fields = {name: getattr(page, name) for name in BLOG_PAGE_FIELDS}
+            fields['body'] = expand_db_html(page.body)
+            fields['tags'] = [tag.name for tag in page.tags.all()]
+            yield _line(label, page.pk, fields)
+        return
+
+    for row in queryset.values().iterator(chunk_size=chunk_size):
+        pk = row.pop('id')
+        yield _line(label, pk, row)
+
+
+def iter_export(since=None, labels=None, chunk_size=CHUNK_SIZE):
+    """Yield NDJSON lines for every exported model, one model after another
+
+    ``labels`` optionally restricts the export to models named either by
+    label (``portfolio.project``) or by model name (``project``).
+    """
+    for model, since_field in EXPORT_MODELS.items():
+        names = {model._meta.label_lower, model._meta.model_name}
+        if labels and not names & set(labels):
+            continue
+        yield from _iter_model(model, since_field, since, chunk_size)
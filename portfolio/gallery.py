@@ -0,0 +1,209 @@
+"""
+Gallery thumbnails and the infinite-scroll feed.
+
+Each GalleryImage has a thumbnail at most ``GALLERY_THUMBNAIL_SIZE`` pixels
+on its longest edge, and the row stores the dimensions of both files so
+pages can reserve space for images before they load. Thumbnails are made
+once a saved image commits, by the workers of a ZIP upload, and by
+``manage.py generate_thumbnails`` for images that predate them.
+
+The gallery is read in pages of ``GALLERY_PAGE_SIZE`` images, newest
+first. A page is addressed by a cursor, the (date, id) of the last image
+before it, so pages do not shift as images are added, and each page is
+fetched with one index range scan however deep the visitor has scrolled.
+Pages are kept in the shared cache under the gallery's cache generation
+(see portfolio.invalidation): any change to an image makes every cached
+page unreachable, and concurrent misses for one page share one query.
+"""
+import base64
+import datetime
+import io
+import logging
+import zlib
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import invalidation, singleflight
+from .changes import record_changes
+from .metrics import record_cache
+from .models import ChangeLogEntry, GalleryImage
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'gallery/thumbnails'
+JPEG_QUALITY = 80
+FEED_CACHE_PREFIX = 'gallery-feed'
+FEED_CACHE_TIMEOUT = 60 * 60
+CATEGORIES = dict(GalleryImage._meta.get_field('category').choices)
+
+
+@dataclass
+class Thumbnail:
+    data: bytes
+    extension: str
+    size: tuple            # (width, height) of the original
+    thumbnail_size: tuple  # (width, height) of the thumbnail
+
+
+def make_thumbnail(data, max_dimension=None, quality=JPEG_QUALITY):
+    """Thumbnail an encoded image; pure, so it can run in a worker process"""
+    max_dimension = max_dimension or settings.GALLERY_THUMBNAIL_SIZE
+    with Image.open(io.BytesIO(data)) as original:
+        keep_png = original.format == 'PNG'
+        image = ImageOps.exif_transpose(original)
+        size = image.size
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        output = io.BytesIO()
+        if keep_png:
+            image.save(output, 'PNG', optimize=True)
+            extension = '.png'
+        else:
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+            extension = '.jpg'
+        return Thumbnail(output.getvalue(), extension, size, image.size)
+
+
+def _thumbnail_stem(image_name):
+    # Named after its source, so a replaced image is noticed by name alone
+    path = PurePosixPath(image_name)
+    return f'{THUMBNAIL_DIR}/{path.stem}-{zlib.crc32(image_name.encode()):08x}'
+
+
+def needs_thumbnail(image):
+    if not image.image:
+        return bool(image.thumbnail)
+    return (
+        not image.thumbnail
+        or str(PurePosixPath(image.thumbnail.name).with_suffix('')) != _thumbnail_stem(image.image.name)
+    )
+
+
+def save_thumbnail(image_name, thumbnail):
+    """Store a thumbnail for ``image_name``; returns the GalleryImage field values"""
+    name = _thumbnail_stem(image_name) + thumbnail.extension
+    default_storage.delete(name)  # left over from an earlier run
+    return {
+        'thumbnail': default_storage.save(name, ContentFile(thumbnail.data)),
+        'width': thumbnail.size[0],
+        'height': thumbnail.size[1],
+        'thumbnail_width': thumbnail.thumbnail_size[0],
+        'thumbnail_height': thumbnail.thumbnail_size[1],
+    }
+
+
+def update_thumbnail(image):
+    """(Re)make the thumbnail of a saved image if it is missing or stale
+
+    Returns whether the row changed. Unreadable images are logged and left
+    without a thumbnail; the feed then falls back to the original.
+    """
+    if not needs_thumbnail(image):
+        return False
+    old = image.thumbnail.name
+    if image.image:
+        try:
+            with image.image.open('rb') as source:
+                values = save_thumbnail(image.image.name, make_thumbnail(source.read()))
+        except (OSError, ValueError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.warning("Could not make a thumbnail of %s", image.image.name, exc_info=True)
+            return False
+    else:
+        values = dict.fromkeys(['width', 'height', 'thumbnail_width', 'thumbnail_height'], None)
+        values['thumbnail'] = ''
+    if old and old != values['thumbnail']:
+        default_storage.delete(old)
+
+    # update() skips the save signals, so invalidate and log the change here
+    GalleryImage.objects.filter(pk=image.pk).update(**values)
+    for field, value in values.items():
+        setattr(image, field, value)
+    record_changes(GalleryImage, [image.pk], ChangeLogEntry.UPDATED)
+    invalidation.bump(GalleryImage)
+    return True
+
+
+# --- Feed ---
+
+def encode_cursor(image):
+    raw = f'{image.date.isoformat()}.{image.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(date, pk) from a cursor; ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date, pk = raw.split('.')
+        return datetime.date.fromisoformat(date), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _file(field, width, height):
+    return {'url': field.url, 'width': width, 'height': height}
+
+
+def _serialize(image):
+    original = _file(image.image, image.width, image.height)
+    return {
+        'id': image.pk,
+        'caption': image.caption,
+        'description': image.description,
+        'category': image.category,
+        'category_label': CATEGORIES.get(image.category, image.category),
+        'date': image.date,
+        'featured': image.featured,
+        'image': original,
+        'thumbnail': (
+            _file(image.thumbnail, image.thumbnail_width, image.thumbnail_height)
+            if image.thumbnail else original
+        ),
+    }
+
+
+def _load_page(category, cursor, size):
+    images = GalleryImage.objects.exclude(image='')
+    if category:
+        images = images.filter(category=category)
+    if cursor:
+        date, pk = decode_cursor(cursor)
+        images = images.filter(Q(date__lt=date) | Q(date=date, pk__lt=pk))
+    rows = list(images.order_by('-date', '-pk')[:size + 1])
+    return {
+        'images': [_serialize(image) for image in rows[:size]],
+        'next': encode_cursor(rows[size - 1]) if len(rows) > size else None,
+    }
+
+
+def feed_page(category='', cursor=None):
+    """One page of the gallery: ``{"images": [...], "next": cursor or None}``
+
+    ``category`` is '' for every category. Raises ValueError for a
+    malformed cursor.
+    """
+    if cursor:
+        decode_cursor(cursor)  # reject before it becomes a cache key
+    size = settings.GALLERY_PAGE_SIZE
+    key = f'{FEED_CACHE_PREFIX}:{invalidation.current(GalleryImage)}:{size}:{category}:{cursor or ""}'
+    page = cache.get(key)
+    if page is not None:
+        record_cache('gallery', 'hit')
+        return page
+    record_cache('gallery', 'miss')
+
+    def load_and_store():
+        page = _load_page(category, cursor, size)
+        cache.set(key, page, FEED_CACHE_TIMEOUT)
+        return page
+
+    return singleflight.do(key, load_and_store, recheck=lambda: cache.get(key))
@@ -0,0 +1,177 @@
+"""
+Bulk gallery upload from a ZIP archive.
+
+Members are read from the archive one at a time and handed to a process pool
+that fixes EXIF orientation, strips metadata and downsizes oversized
+originals, then makes the thumbnail (see portfolio.gallery). Only a bounded
+number of images is in flight at once, and all GalleryImage rows are
+written with a single ``bulk_create``.
+
+The pool's processes are spawned, not forked: a forked copy of a web worker
+inherits locks held by its other threads (log handlers, background jobs,
+the invalidation listener) and can deadlock on them. Sizes declared in the
+archive are not trusted: members are read with a bounded read, and images
+are refused before decoding when they have too many pixels. Files stored
+before a failure are deleted again.
+"""
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .changes import record_changes
+from .gallery import make_thumbnail, save_thumbnail
+from .models import ChangeLogEntry, GalleryImage
+from .signals import bulk_content_changed
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.tif', '.tiff', '.bmp'}
+MAX_DIMENSION = 2400           # longest edge of stored originals, in pixels
+JPEG_QUALITY = 85
+MAX_MEMBER_SIZE = 50 * 1024 * 1024
+MAX_PIXELS = 64_000_000        # decoded size limit, about 190 MB as RGB
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+
+@dataclass
+class UploadResult:
+    created: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)   # (member name, reason)
+
+
+def process_image(data, max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY, max_pixels=MAX_PIXELS):
+    """Normalise one image; runs in a worker process
+
+    Returns ``(bytes, extension)``. Metadata is dropped by re-encoding
+    without it, after the EXIF orientation has been applied to the pixels.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        # Opening only reads the header; refuse before the pixels are decoded
+        if original.width * original.height > max_pixels:
+            raise Image.DecompressionBombError(
+                f"{original.width}x{original.height} is more than {max_pixels} pixels"
+            )
+        keep_png = original.format == 'PNG'
+        image = ImageOps.exif_transpose(original)
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        output = io.BytesIO()
+        if keep_png:
+            image.save(output, 'PNG', optimize=True)
+            return output.getvalue(), '.png'
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return output.getvalue(), '.jpg'
+
+
+def process_member(data, thumbnail_size):
+    """``process_image`` plus the thumbnail of the result; runs in a worker process"""
+    data, extension = process_image(data)
+    return data, extension, make_thumbnail(data, thumbnail_size)
+
+
+def _read_member(archive, member):
+    """The member's bytes, or None if it is bigger than its header may claim"""
+    with archive.open(member) as source:
+        data = source.read(MAX_MEMBER_SIZE + 1)
+    return data if len(data) <= MAX_MEMBER_SIZE else None
+
+
+def caption_from_filename(name):
+    return PurePosixPath(name).stem.replace('_', ' ').replace('-', ' ').strip().capitalize() or 'Untitled'
+
+
+def _image_members(archive, result):
+    for member in archive.infolist():
+        path = PurePosixPath(member.filename)
+        if member.is_dir() or path.name.startswith('.') or '__MACOSX' in path.parts:
+            continue
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            result.skipped.append((member.filename, 'not an image file'))
+        elif member.file_size > MAX_MEMBER_SIZE:
+            result.skipped.append((member.filename, 'larger than 50 MB uncompressed'))
+        else:
+            yield member
+
+
+def upload_zip(fileobj, category, date, max_workers=MAX_WORKERS):
+    """Process every image in a ZIP and create its GalleryImage rows"""
+    result = UploadResult()
+    objects = []
+    stored = []  # file names to delete again if the upload fails
+    thumbnail_size = settings.GALLERY_THUMBNAIL_SIZE  # workers may not have settings configured
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError("The uploaded file is not a valid ZIP archive")
+
+    def collect(future, position, member):
+        try:
+            data, extension, thumbnail = future.result()
+        except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError) as e:
+            result.skipped.append((member.filename, f'unreadable image ({e.__class__.__name__})'))
+            return
+        name = default_storage.save(
+            f'gallery/{PurePosixPath(member.filename).stem}{extension}', ContentFile(data)
+        )
+        stored.append(name)
+        fields = save_thumbnail(name, thumbnail)
+        stored.append(fields['thumbnail'])
+        objects.append((position, GalleryImage(
+            image=name,
+            caption=caption_from_filename(member.filename)[:200],
+            category=category,
+            date=date,
+            **fields,
+        )))
+
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        # Spawned processes start bare; unpickling process_member imports this module
+        initializer=django.setup,
+    )
+    try:
+        with archive, pool:
+            pending = {}
+            for position, member in enumerate(_image_members(archive, result)):
+                # Keep at most two images per worker in memory at a time
+                if len(pending) >= max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future, *pending.pop(future))
+                try:
+                    data = _read_member(archive, member)
+                except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                    result.skipped.append((member.filename, f'could not extract ({e})'))
+                    continue
+                if data is None:
+                    result.skipped.append((member.filename, 'larger than 50 MB uncompressed'))
+                    continue
+                pending[pool.submit(process_member, data, thumbnail_size)] = (position, member)
+            for future in list(pending):
+                collect(future, *pending.pop(future))
+
+        if objects:
+            # Rows keep the archive's order, whatever order the workers finished in
+            objects.sort(key=lambda item: item[0])
+            with transaction.atomic():
+                result.created = GalleryImage.objects.bulk_create([obj for _position, obj in objects])
+                record_changes(GalleryImage, [obj.pk for obj in result.created], ChangeLogEntry.CREATED)
+                transaction.on_commit(lambda: bulk_content_changed.send(sender=GalleryImage))
+    except BaseException:
+        for name in stored:
+            default_storage.delete(name)
+        raise
+    return result
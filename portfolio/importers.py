@@ -0,0 +1,183 @@
+"""
+Bulk import of projects, awards and gallery images from CSV or NDJSON.
+
+Rows are validated with the API serializers in batches and written with
+``bulk_create`` / ``bulk_update`` keyed by a natural key, so re-importing a
+file updates rows instead of duplicating them. Per-row signals are skipped;
+``bulk_content_changed`` is sent once per model after the import instead.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.db import models, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .changes import record_changes
+from .models import Award, ChangeLogEntry, GalleryImage, Project
+from .serializers import AwardSerializer, GalleryImageSerializer, ProjectSerializer
+from .signals import bulk_content_changed
+
+BATCH_SIZE = 500
+
+
+@dataclass
+class Importer:
+    model: type
+    serializer_class: type
+    natural_key: tuple
+
+
+IMPORTERS = {
+    'project': Importer(Project, ProjectSerializer, ('title',)),
+    'award': Importer(Award, AwardSerializer, ('name', 'organization')),
+    'galleryimage': Importer(GalleryImage, GalleryImageSerializer, ('caption', 'date')),
+}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def total(self):
+        return self.created + self.updated
+
+
+def read_rows(stream, format):
+    """Yield dicts from a CSV or NDJSON text stream
+
+    NDJSON lines may also be in the export shape (``{"model", "fields"}``).
+    """
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            # Empty cells mean "not provided" so model defaults apply
+            yield {key: value for key, value in row.items() if key and value != ''}
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        if 'fields' in row:
+            row = dict(row['fields'], _model=row.get('model'))
+        yield row
+
+
+def detect_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkImporter:
+    def __init__(self, model_name, batch_size=BATCH_SIZE, dry_run=False):
+        try:
+            self.config = IMPORTERS[model_name]
+        except KeyError:
+            raise ValueError(f"Cannot import {model_name!r}; choose from {', '.join(IMPORTERS)}")
+        self.model = self.config.model
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        opts = self.model._meta
+        self.file_fields = [f.name for f in opts.concrete_fields if isinstance(f, models.FileField)]
+        self.update_fields = [
+            f.name for f in opts.concrete_fields
+            if not f.primary_key and f.name not in self.config.natural_key
+            and not getattr(f, 'auto_now_add', False)
+        ]
+
+    def run(self, rows):
+        result = ImportResult()
+        label = self.model._meta.label_lower
+        rows = (
+            row for row in rows
+            if row.pop('_model', None) in (None, label)
+        )
+        offset = 0
+        for batch in _batches(rows, self.batch_size):
+            self._import_batch(batch, offset, result)
+            offset += len(batch)
+
+        if result.total and not self.dry_run:
+            transaction.on_commit(
+                lambda: bulk_content_changed.send(sender=self.model)
+            )
+        return result
+
+    def _import_batch(self, rows, offset, result):
+        # One serializer instance validates every row in the batch; file
+        # fields hold storage names here, not uploads, so they bypass it
+        validator = self.config.serializer_class()
+        objects = {}
+        for number, row in enumerate(rows, start=offset + 1):
+            file_values = {name: row.pop(name) for name in self.file_fields if name in row}
+            row.pop('id', None)
+            try:
+                data = validator.run_validation(row)
+            except ValidationError as e:
+                result.errors.append((number, e.detail))
+                continue
+            data.update(file_values)
+            # Later rows with the same natural key win
+            objects[self._key(data)] = data
+        if not objects:
+            return
+
+        # One IN on the leading key field, whatever the batch size; rows that
+        # match only on that field are dropped by the full-key comparison
+        lead = self.config.natural_key[0]
+        candidates = self.model.objects.filter(**{f'{lead}__in': {key[0] for key in objects}})
+        existing = {
+            key: obj for key, obj in ((self._key(obj), obj) for obj in candidates)
+            if key in objects
+        }
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        changed_fields = set()
+        for key, data in objects.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(self.model(**data))
+                continue
+            changed = [name for name, value in data.items() if getattr(obj, name) != value]
+            if not changed:
+                continue  # unchanged rows cost nothing on re-import
+            for name in changed:
+                setattr(obj, name, data[name])
+            changed_fields.update(changed)
+            if hasattr(obj, 'updated_at'):
+                obj.updated_at = now  # bulk_update skips auto_now
+                changed_fields.add('updated_at')
+            to_update.append(obj)
+
+        if not self.dry_run:
+            with transaction.atomic():
+                self.model.objects.bulk_create(to_create)
+                if to_update:
+                    # bulk_update builds a CASE per field and row, so only send
+                    # the fields that changed, in modest statements
+                    fields = [name for name in self.update_fields if name in changed_fields]
+                    self.model.objects.bulk_update(to_update, fields, batch_size=100)
+                record_changes(self.model, [obj.pk for obj in to_create], ChangeLogEntry.CREATED)
+                record_changes(self.model, [obj.pk for obj in to_update], ChangeLogEntry.UPDATED)
+        result.created += len(to_create)
+        result.updated += len(to_update)
+
+    def _key(self, data):
+        if isinstance(data, dict):
+            return tuple(data.get(name) for name in self.config.natural_key)
+        return tuple(getattr(data, name) for name in self.config.natural_key)
@@ -0,0 +1,260 @@
+"""
+Cross-worker cache invalidation with per-model generation counters.
+
+Saving or deleting a row bumps its model's generation once the transaction
+commits (see portfolio.signals). In-process caches remember the generations
+a value was built at and rebuild it when they move, so a freshness check is
+one lookup per model and never a query.
+
+Generations are the same numbers in every worker, so stamps built from
+them can also key entries in the shared cache (the page cache, the gallery
+feed). How workers share them depends on the database:
+
+* Postgres: counters are CacheGeneration rows. A bump increments the row
+  and sends the new value with ``NOTIFY``. Each process runs a listener
+  thread that ``LISTEN``s on its own connection and keeps a local copy of
+  the counters, which it reloads from the table whenever it (re)connects.
+* Anything else: counters live in a memory-mapped file shared by every
+  worker on the host, so a bump is visible to them immediately.
+"""
+import logging
+import mmap
+import os
+import select
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, connections
+
+from . import singleflight
+from .metrics import record_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'cache_invalidation'
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+class FileGenerations:
+    """Counters in a shared memory-mapped file, one 8-byte slot per label
+
+    Labels are hashed to slots; a collision only means two models
+    invalidate together, never that a change goes unnoticed.
+    """
+    SLOTS = 1024
+    SLOT = struct.Struct('<Q')
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._map = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Re-map after a fork so each worker holds its own descriptor
+        if self._map is None or self._pid != os.getpid():
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    size = self.SLOTS * self.SLOT.size
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                    self._map = mmap.mmap(fd, size)
+                    self._fd, self._pid = fd, os.getpid()
+                except Exception:
+                    os.close(fd)
+                    raise
+        return self._map
+
+    def _offset(self, label):
+        return (zlib.crc32(label.encode()) % self.SLOTS) * self.SLOT.size
+
+    def current(self, label):
+        return self.SLOT.unpack_from(self._open(), self._offset(label))[0]
+
+    def bump(self, label):
+        data, offset = self._open(), self._offset(label)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self.SLOT.pack_into(data, offset, self.SLOT.unpack_from(data, offset)[0] + 1)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class PostgresGenerations:
+    """CacheGeneration rows, mirrored in each process by a LISTEN thread
+
+    Notifications sent while the listener is disconnected are lost, so it
+    reloads every counter from the table each time it connects.
+    """
+    RECONNECT_DELAY = 1.0
+    POLL_TIMEOUT = 30.0
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self.counters = defaultdict(int)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _table(self):
+        from .models import CacheGeneration
+
+        return CacheGeneration._meta.db_table
+
+    def _advance(self, label, generation):
+        # Notifications and reloads may arrive out of order; counters only move forwards
+        with self._lock:
+            if generation > self.counters[label]:
+                self.counters[label] = generation
+
+    def _load(self, cursor):
+        cursor.execute(f'SELECT label, generation FROM {self._table()}')
+        for label, generation in cursor.fetchall():
+            self._advance(label, generation)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        # Counters inherited through a fork may be stale; start from the table
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f'SELECT label, generation FROM {self._table()}')
+            counters = defaultdict(int, cursor.fetchall())
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.counters = counters
+                thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+                thread.start()
+
+    def _connect(self):
+        # A raw connection, never taken from or returned to a connection pool:
+        # it stays in LISTEN for the life of the process
+        wrapper = connections.create_connection(self.alias)
+        raw = wrapper.Database.connect(**wrapper.get_connection_params())
+        raw.autocommit = True
+        return raw
+
+    def _listen(self):
+        while True:
+            raw = None
+            try:
+                raw = self._connect()
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                    # After LISTEN, so a bump is either reloaded here or notified
+                    self._load(cursor)
+                while True:
+                    if select.select([raw], [], [], self.POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        label, _, generation = raw.notifies.pop(0).payload.rpartition(':')
+                        self._advance(label, int(generation))
+            except Exception:
+                logger.warning("Cache invalidation listener lost its connection", exc_info=True)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+            time.sleep(self.RECONNECT_DELAY)
+
+    def current(self, label):
+        self._ensure_listener()
+        return self.counters[label]
+
+    def bump(self, label):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self._table()} (label, generation) VALUES (%s, 1) '
+                f'ON CONFLICT (label) DO UPDATE SET generation = {self._table()}.generation + 1 '
+                f'RETURNING generation',
+                [label],
+            )
+            generation = cursor.fetchone()[0]
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, f'{label}:{generation}'])
+        # Visible to this process at once; the listener also sees our own notification
+        self._advance(label, generation)
+
+
+def _default_file():
+    name = f'cache-generations-{zlib.crc32(str(settings.BASE_DIR).encode()):08x}'
+    return Path(tempfile.gettempdir()) / name
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresGenerations()
+        else:
+            _backend = FileGenerations(settings.CACHE_GENERATIONS_FILE or _default_file())
+    return _backend
+
+
+def current(model):
+    """Generation of a model (or model label); changes whenever a row does"""
+    return get_backend().current(_label(model))
+
+
+def bump(model):
+    """Mark every cache that depends on this model as stale, in all workers"""
+    get_backend().bump(_label(model))
+
+
+class ProcessCache:
+    """In-process cache whose entries expire when any dependency changes
+
+    Usage::
+
+        site_settings = ProcessCache(SiteSettings)
+        site_settings.get_or_set('current', SiteSettings.objects.first)
+    """
+
+    def __init__(self, *models):
+        self.labels = [_label(model) for model in models]
+        self._entries = {}
+
+    def _stamp(self):
+        return tuple(current(label) for label in self.labels)
+
+    def get_or_set(self, key, default):
+        # Stamp before computing so a change made meanwhile is not masked
+        stamp = self._stamp()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            record_cache('process', 'hit')
+            return entry[1]
+        record_cache('process', 'miss')
+
+        def fill():
+            value = default()
+            self._entries[key] = (stamp, value)
+            return value
+
+        # Threads missing together share one computation
+        return singleflight.do(f'process-cache:{id(self)}:{key}:{stamp}', fill, shared=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,251 @@
+"""
+Non-blocking structured logging.
+
+``QueueFileHandler`` is what ``LOGGING`` points at. Its ``emit`` only puts
+the record on a bounded in-memory queue; a ``QueueListener`` thread per
+process formats it as one JSON object per line and writes it to a
+``CompressingRotatingFileHandler``. Request threads therefore never wait
+on the disk. If the queue fills up, records are dropped and counted rather
+than blocking.
+
+The log file rotates when it reaches ``max_bytes`` or is ``interval``
+seconds old. Older backups are gzipped. Every worker writes the same file,
+so rotation is serialised with a lock file, and a worker whose file was
+rotated by another one reopens it before writing.
+
+``SamplingFilter`` keeps only a fraction of the records from high-volume
+loggers. It never drops errors.
+"""
+import atexit
+import copy
+import datetime
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+# Attributes every LogRecord has; anything else was passed with ``extra=``
+_STANDARD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass ``rate`` of the records below ERROR from the given loggers
+
+    ``rates`` maps logger names to a fraction between 0 and 1; a name also
+    covers its children. Kept records carry ``sample_rate`` so counts can be
+    scaled back up.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size- and age-based rotation to gzipped backups, safe across processes"""
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, interval=0, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.interval = interval
+
+    def _rotate(self):
+        """django.log -> django.log.1 -> django.log.2.gz -> ... -> django.log.<backup_count>.gz
+
+        The newest backup stays uncompressed until the next rotation: a
+        worker that has not noticed the rotation yet may still append to it.
+        """
+        base = self.baseFilename
+        for index in range(self.backupCount - 1, 1, -1):
+            if os.path.exists(f'{base}.{index}.gz'):
+                os.replace(f'{base}.{index}.gz', f'{base}.{index + 1}.gz')
+        if os.path.exists(f'{base}.1'):
+            if self.backupCount > 1:
+                with open(f'{base}.1', 'rb') as plain, gzip.open(f'{base}.2.gz', 'wb') as compressed:
+                    shutil.copyfileobj(plain, compressed)
+            os.remove(f'{base}.1')
+        os.replace(base, f'{base}.1')
+
+    def _reopen_if_rotated(self):
+        # Another worker may have rotated the file we still have open
+        if self.stream is None:
+            return
+        try:
+            rotated = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.stream.close()
+            self.stream = None
+
+    @property
+    def _lock_path(self):
+        # Its mtime records the last rotation, shared by every worker
+        return self.baseFilename + '.lock'
+
+    def _too_old(self):
+        if not self.interval:
+            return False
+        try:
+            return time.time() - os.stat(self._lock_path).st_mtime >= self.interval
+        except FileNotFoundError:
+            open(self._lock_path, 'a').close()
+            return False
+
+    def emit(self, record):
+        self._reopen_if_rotated()
+        super().emit(record)
+
+    def shouldRollover(self, record):
+        if self._too_old():
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        lock = open(self._lock_path, 'a')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another worker may have rotated while we waited for the lock
+            self._reopen_if_rotated()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.seek(0, os.SEEK_END)
+            if self.stream.tell() and (
+                self._too_old() or (self.maxBytes and self.stream.tell() >= self.maxBytes)
+            ):
+                self.stream.close()
+                self.stream = None
+                if self.backupCount:
+                    self._rotate()
+                else:
+                    os.truncate(self.baseFilename, 0)
+                os.utime(self._lock_path)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+
+class QueueFileHandler(logging.handlers.QueueHandler):
+    """Queue records for a background thread that formats and writes them
+
+    Configured like a file handler; the formatter set on it is applied by
+    the background thread.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, interval=0, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = CompressingRotatingFileHandler(
+            filename, max_bytes=max_bytes, backup_count=backup_count, interval=interval,
+        )
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        # Threads do not survive a fork, so each worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._listener = logging.handlers.QueueListener(self.queue, self.target)
+                self._listener.start()
+                self._pid = os.getpid()
+                atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        """Write out what is still queued"""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                self._listener.stop()
+                self._pid = None
+
+    def prepare(self, record):
+        # Leave formatting to the listener; only make the record safe to hand over
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"Log queue was full; dropped {dropped} records",
+                }))
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        self._stop_listener()
+        self.target.close()
+        super().close()
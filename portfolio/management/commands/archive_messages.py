@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from portfolio.models import Message
+
+ARCHIVE_FIELDS = ['id', 'name', 'email', 'subject', 'message', 'sent_at', 'read', 'replied']
+
+
+def _read_ids(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            yield json.loads(line)['id']
+
+
+class Command(BaseCommand):
+    help = "Archive contact messages older than the retention window to gzip NDJSON and prune them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.MESSAGE_RETENTION_DAYS,
+                            help="Archive messages older than this many days")
+        parser.add_argument("--output-dir", default=settings.MESSAGE_ARCHIVE_DIR,
+                            help="Directory the dated archive files are written to")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows fetched and deleted per batch")
+        parser.add_argument("--keep", action="store_true",
+                            help="Write and verify the archive but do not delete any rows")
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(days=opts["days"])
+        batch_size = opts["batch_size"]
+        output_dir = Path(opts["output_dir"])
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        queryset = Message.objects.filter(sent_at__lt=cutoff).order_by("pk")
+        if not queryset.exists():
+            self.stdout.write(f"No messages older than {cutoff:%Y-%m-%d} to archive")
+            return
+
+        stamp = timezone.now().strftime("%Y%m%dT%H%M%S")
+        path = output_dir / f"messages-before-{cutoff:%Y-%m-%d}-{stamp}.ndjson.gz"
+        partial = path.with_name(path.name + ".partial")
+
+        # Stream rows straight into the archive; only one chunk is in memory
+        written = 0
+        digest = hashlib.sha256()
+        with gzip.open(partial, "wt", encoding="utf-8") as archive:
+            for row in queryset.values(*ARCHIVE_FIELDS).iterator(chunk_size=batch_size):
+                # DjangoJSONEncoder cuts datetimes to milliseconds; keep them exact
+                row["sent_at"] = row["sent_at"].isoformat()
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+                digest.update(f"{row['id']}\n".encode())
+                written += 1
+
+        # Re-read the compressed file before trusting it enough to delete rows
+        read = 0
+        check = hashlib.sha256()
+        try:
+            for pk in _read_ids(partial):
+                check.update(f"{pk}\n".encode())
+                read += 1
+        except (OSError, EOFError, ValueError) as e:
+            raise CommandError(f"Archive {partial} failed verification: {e}")
+        if read != written or check.digest() != digest.digest():
+            raise CommandError(f"Archive {partial} failed verification: wrote {written} rows, read back {read}")
+        os.replace(partial, path)
+        self.stdout.write(f"✓ Archived {written} messages to {path}")
+
+        if opts["keep"]:
+            return
+
+        # Delete by archived id in small transactions so locks stay short
+        deleted = 0
+        batch = []
+        for pk in _read_ids(path):
+            batch.append(pk)
+            if len(batch) >= batch_size:
+                deleted += self._delete_batch(batch, cutoff)
+                batch = []
+        if batch:
+            deleted += self._delete_batch(batch, cutoff)
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {written} and deleted {deleted} messages"))
+
+    def _delete_batch(self, pks, cutoff):
+        with transaction.atomic():
+            deleted, _ = Message.objects.filter(pk__in=pks, sent_at__lt=cutoff).delete()
+        return deleted
@@ -0,0 +1,100 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from portfolio.db.pool import get_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare Django's persistent per-thread connections (CONN_MAX_AGE) with "
+        "the pooled backend under threaded load"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=50, help="Requests per thread")
+        parser.add_argument('--queries', type=int, default=3, help="Queries per request")
+        parser.add_argument('--work-ms', type=float, default=5.0, help="Non-database time per request")
+        parser.add_argument('--pool-size', type=int, default=8)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        base = dict(connections[options['database']].settings_dict)
+        engine = base['ENGINE']
+        plain_engine = next((k for k, v in settings.POOLED_ENGINES.items() if v == engine), engine)
+        pooled_engine = settings.POOLED_ENGINES.get(plain_engine)
+        if pooled_engine is None:
+            self.stderr.write(f"No pooled backend for {engine}")
+            return
+
+        runs = [
+            ('persistent (CONN_MAX_AGE=600)', dict(base, ENGINE=plain_engine, CONN_MAX_AGE=600)),
+            (f'pooled (size {options["pool_size"]})', dict(
+                base, ENGINE=pooled_engine, CONN_MAX_AGE=0,
+                POOL={'MAX_SIZE': options['pool_size'], 'TIMEOUT': 30},
+            )),
+        ]
+        for index, (label, settings_dict) in enumerate(runs):
+            result = self._run(f'benchmark_{index}', settings_dict, options)
+            self.stdout.write(
+                f"{label:32} {result['elapsed']:6.2f}s  "
+                f"p50 {result['p50']:6.1f}ms  p95 {result['p95']:6.1f}ms  "
+                f"connections opened {result['connections']:3}"
+                + (f"  waits {result['waits']} ({result['wait_seconds']:.2f}s)" if 'waits' in result else '')
+            )
+
+    def _run(self, alias, settings_dict, options):
+        backend = load_backend(settings_dict['ENGINE'])
+        opened = []
+
+        class CountingWrapper(backend.DatabaseWrapper):
+            def get_new_connection(self, conn_params):
+                conn = super().get_new_connection(conn_params)
+                opened.append(id(conn))
+                return conn
+
+        latencies = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['threads'])
+
+        def worker():
+            wrapper = CountingWrapper(settings_dict, alias)
+            barrier.wait()
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                for _ in range(options['queries']):
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchall()
+                time.sleep(options['work_ms'] / 1000)
+                wrapper.close_if_unusable_or_obsolete()  # what request_finished does
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+            wrapper.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        result = {
+            'elapsed': elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'connections': len(set(opened)),
+        }
+        if 'POOL' in settings_dict:
+            stats = get_pool(alias, None).snapshot()
+            result['connections'] = stats['created']
+            result.update(waits=stats['waits'], wait_seconds=stats['wait_seconds'])
+        return result
@@ -0,0 +1,67 @@
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from portfolio.log import JsonFormatter, QueueFileHandler
+
+logger = logging.getLogger('portfolio.benchmark')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare request latency with logging off, with a synchronous file "
+        "handler, and with the queued JSON handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--records', type=int, default=5, help="INFO records logged per request")
+        parser.add_argument('--path', default='/api/bio/')
+
+    def handle(self, *args, **options):
+        directory = Path(tempfile.mkdtemp(prefix='benchmark-logging-'))
+        sync = logging.FileHandler(directory / 'sync.log')
+        sync.setFormatter(JsonFormatter())
+        queued = QueueFileHandler(directory / 'queued.log')
+        queued.setFormatter(JsonFormatter())
+
+        runs = [('off', None), ('FileHandler (sync)', sync), ('QueueFileHandler', queued)]
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost')
+        client.get(options['path'])  # warm up URL resolution and caches
+        for label, handler in runs:
+            result = self._run(client, handler, options)
+            self.stdout.write(
+                f"{label:20} p50 {result['p50']:6.2f}ms  p95 {result['p95']:6.2f}ms  "
+                f"p99 {result['p99']:6.2f}ms  logging on request thread {result['emit']:6.3f}ms/request"
+            )
+        queued.close()
+        sync.close()
+        self.stdout.write(f"Log files written to {directory}")
+
+    def _run(self, client, handler, options):
+        logger.handlers = [handler] if handler else []
+        logger.propagate = False
+        logger.setLevel(logging.INFO if handler else logging.CRITICAL)
+        latencies, emit_times = [], []
+        for index in range(options['requests']):
+            started = time.perf_counter()
+            client.get(options['path'])
+            emitted = time.perf_counter()
+            for record in range(options['records']):
+                logger.info("request %s record %s", index, record, extra={'path': options['path']})
+            finished = time.perf_counter()
+            latencies.append((finished - started) * 1000)
+            emit_times.append((finished - emitted) * 1000)
+        latencies.sort()
+        return {
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'emit': statistics.mean(emit_times),
+        }
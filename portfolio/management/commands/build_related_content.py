@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.related import rebuild_related_content
+
+
+class Command(BaseCommand):
+    help = "Recompute the related-content recommendations for every object"
+
+    def handle(self, *args, **options):
+        vectors, items = rebuild_related_content()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {vectors} objects and stored {items} recommendations"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.sitemaps import rebuild_sitemaps
+
+
+class Command(BaseCommand):
+    help = "Render and store the chunked XML sitemaps"
+
+    def handle(self, *args, **options):
+        files = rebuild_sitemaps()
+        self.stdout.write(self.style.SUCCESS(f"Stored {len(files)} sitemap files"))
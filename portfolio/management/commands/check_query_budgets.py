@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from portfolio.query_inspector import QueryInspector, check
+
+
+def _host():
+    """A concrete allowed host; '*' and '.example.com' patterns can't be sent"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        "Request each page in QUERY_BUDGETS as an anonymous visitor and fail if "
+        "it runs more queries than its budget or repeats a query shape (N+1)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Only check these paths")
+
+    def handle(self, *args, **options):
+        budgets = settings.QUERY_BUDGETS
+        paths = options['paths'] or list(budgets)
+        client = Client(HTTP_HOST=_host())
+        failures = errors = 0
+        # Measure rendering, not the page cache; the first request warms per-process caches
+        with override_settings(PAGE_CACHE_MAX_AGE=0, PROFILE_SAMPLE_RATE=0):
+            for path in paths:
+                client.get(path)
+                with QueryInspector() as inspector:
+                    response = client.get(path)
+                budget = budgets.get(path)
+                line = f"{path:30} {inspector.count:3} queries (budget {budget if budget is not None else '-'})"
+                if response.status_code != 200:
+                    # An error page's queries say nothing about the page's budget
+                    errors += 1
+                    self.stdout.write(self.style.ERROR(f"{line}  ERROR status {response.status_code}"))
+                    continue
+                problems = check(inspector, budget)
+                if problems:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"{line}  FAIL\n  " + problems.replace('\n', '\n  ')))
+                else:
+                    self.stdout.write(f"{line}  ok")
+        messages = []
+        if errors:
+            messages.append(f"{errors} of {len(paths)} pages did not return 200")
+        if failures:
+            messages.append(f"{failures} of {len(paths)} pages failed their query budget")
+        if messages:
+            raise CommandError('; '.join(messages))
@@ -0,0 +1,48 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.export import CHUNK_SIZE, iter_export, parse_since
+
+
+class Command(BaseCommand):
+    help = "Export all portfolio content and live blog pages as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", default="-",
+                            help="File to write to ('-' for stdout)")
+        parser.add_argument("--since", help="Only objects changed on or after this ISO date/datetime")
+        parser.add_argument("--models", default="",
+                            help="Comma-separated models to export, e.g. project,award")
+        parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                            help="Rows fetched from the database per round trip")
+
+    def handle(self, *args, **opts):
+        try:
+            since = parse_since(opts["since"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        labels = [name.strip().lower() for name in opts["models"].split(",") if name.strip()]
+        lines = iter_export(since=since, labels=labels, chunk_size=opts["chunk_size"])
+
+        if opts["output"] == "-":
+            stream = gzip.open(sys.stdout.buffer, "wt", encoding="utf-8") if opts["gzip"] else self.stdout
+            count = self._write(stream, lines)
+            if opts["gzip"]:
+                stream.close()
+            self.stderr.write(f"Exported {count} objects")
+            return
+
+        opener = gzip.open if opts["gzip"] else open
+        with opener(opts["output"], "wt", encoding="utf-8") as stream:
+            count = self._write(stream, lines)
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} objects to {opts['output']}"))
+
+    def _write(self, stream, lines):
+        count = 0
+        for line in lines:
+            stream.write(line)
+            count += 1
+        return count
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blogcms.models import BlogPage
+
+
+class Command(BaseCommand):
+    help = "Pre-generate header image renditions for all live blog pages"
+
+    def handle(self, *args, **options):
+        count = 0
+        pages = BlogPage.objects.live().filter(header_image__isnull=False).select_related("header_image")
+        for page in pages.iterator():
+            page.generate_renditions()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated renditions for {count} blog pages"))
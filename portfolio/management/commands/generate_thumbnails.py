@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.gallery import needs_thumbnail, update_thumbnail
+from portfolio.models import GalleryImage
+
+
+class Command(BaseCommand):
+    help = "Make missing or stale gallery thumbnails and record image dimensions"
+
+    def handle(self, *args, **options):
+        updated = failed = 0
+        for image in GalleryImage.objects.order_by('pk').iterator():
+            if not needs_thumbnail(image):
+                continue
+            if update_thumbnail(image):
+                updated += 1
+            else:
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated {updated} thumbnails"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} images could not be read (see the log)"))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.importers import BATCH_SIZE, IMPORTERS, BulkImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import projects, awards or gallery images from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(IMPORTERS), help="What the file contains")
+        parser.add_argument("path", help="CSV (with header row) or NDJSON file")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="File format (default: guessed from the extension)")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                            help="Rows validated and written per batch")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only, do not write anything")
+
+    def handle(self, *args, **opts):
+        format = opts["format"] or detect_format(opts["path"])
+        importer = BulkImporter(opts["model"], batch_size=opts["batch_size"], dry_run=opts["dry_run"])
+
+        started = time.monotonic()
+        try:
+            with open(opts["path"], encoding="utf-8-sig", newline="") as stream:
+                result = importer.run(read_rows(stream, format))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not import {opts['path']}: {e}")
+        elapsed = time.monotonic() - started
+
+        for number, errors in result.errors[:50]:
+            self.stderr.write(f"Row {number}: {errors}")
+        if len(result.errors) > 50:
+            self.stderr.write(f"... and {len(result.errors) - 50} more rejected rows")
+
+        verb = "Would create" if opts["dry_run"] else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.created}, updated {result.updated}, rejected {len(result.errors)} "
+            f"{IMPORTERS[opts['model']].model._meta.verbose_name_plural.lower()} in {elapsed:.1f}s"
+        ))
+        if result.total and not opts["dry_run"]:
+            # The debounced jobs (portfolio.jobs) are flushed when the command exits
+            self.stdout.write("Rebuilding sitemaps and related content before exiting...")
@@ -55,9 +55,8 @@ class Command(BaseCommand):
                 page.header_image = wi
 
             # Add tags
-            if hasattr(legacy, "tags"):
-                for t in legacy.tags.all():
-                    page.tags.add(t)
+            for tag in legacy.tag_index.all():
+                page.tags.add(tag.name)
 
             blog_index.add_child(instance=page)
             page.save_revision().publish()
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from portfolio.models import Message
+
+
+class Command(BaseCommand):
+    help = "Bulk-load contact messages back from an archive_messages gzip NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="Path to a messages-*.ndjson.gz archive")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows inserted per batch")
+
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+        restored = read = 0
+        batch = []
+        try:
+            with gzip.open(opts["archive"], "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    row = json.loads(line)
+                    row["sent_at"] = parse_datetime(row["sent_at"])
+                    batch.append(Message(**row))
+                    read += 1
+                    if len(batch) >= batch_size:
+                        restored += self._load_batch(batch)
+                        batch = []
+        except (OSError, EOFError, ValueError) as e:
+            raise CommandError(f"Could not read {opts['archive']}: {e}")
+        if batch:
+            restored += self._load_batch(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Restored {restored} messages; skipped {read - restored} whose ids were already present"
+        ))
+
+    def _load_batch(self, messages):
+        """Insert the messages whose ids are not in the table; returns how many"""
+        with transaction.atomic():
+            present = set(Message.objects.filter(
+                pk__in=[message.pk for message in messages],
+            ).values_list("pk", flat=True))
+            missing = [message for message in messages if message.pk not in present]
+            if not missing:
+                return 0
+            # bulk_create stamps auto_now_add fields with the current time, so
+            # put the archived sent_at values back afterwards; only on the rows
+            # inserted here, never on live rows that were skipped
+            sent_at = [message.sent_at for message in missing]
+            Message.objects.bulk_create(missing)
+            for message, value in zip(missing, sent_at):
+                message.sent_at = value
+            Message.objects.bulk_update(missing, ["sent_at"])
+        return len(missing)
@@ -0,0 +1,25 @@
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.assets import VENDOR_ASSETS, vendor_asset
+
+
+class Command(BaseCommand):
+    help = "Download third-party fonts and scripts into static/vendor/ for self-hosting"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Assets to vendor (default: all of {', '.join(VENDOR_ASSETS)})")
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(VENDOR_ASSETS)
+        unknown = set(names) - set(VENDOR_ASSETS)
+        if unknown:
+            raise CommandError(f"Unknown assets: {', '.join(sorted(unknown))}")
+        for name in names:
+            try:
+                files = vendor_asset(name)
+            except (URLError, OSError, ValueError) as e:
+                raise CommandError(f"Could not vendor {name}: {e}")
+            self.stdout.write(f"{name}: {len(files)} files")
+        self.stdout.write(self.style.SUCCESS("Run collectstatic to fingerprint the vendored files"))
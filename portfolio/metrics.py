@@ -0,0 +1,394 @@
+"""
+Prometheus metrics, aggregated across workers without an external service.
+
+Each process counts in memory and writes a snapshot to its own file under
+``METRICS_DIR`` at most every ``METRICS_FLUSH_INTERVAL`` seconds and at
+exit. The ``/metrics`` view merges every worker's file into the Prometheus
+text format: counters and histograms are summed, gauges are reported per
+worker. Files of workers that have exited are folded into an archive, so
+their counts survive worker restarts.
+
+Recorded here or by the callers noted:
+
+* requests per view, method and status, and their latency (MetricsMiddleware)
+* database queries and query time per alias (a wrapper on every connection)
+* render time of the site's page templates (``InstrumentedDjangoTemplates``)
+* cache lookups by result (``record_cache``, from the page, process and gallery feed caches)
+* resident memory of each worker and database pool usage
+"""
+import atexit
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+
+from . import profiling
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE = 'archive.json'
+
+_values = {}  # (name, ((label, value), ...)) -> float, or histogram [per-bucket counts..., +Inf, sum]
+_lock = threading.Lock()
+_metrics = {}
+
+
+class _Metric:
+    def __init__(self, name, kind, documentation, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.buckets = buckets
+        _metrics[name] = self
+
+    def _key(self, labels):
+        return (self.name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+class Counter(_Metric):
+    def __init__(self, name, documentation):
+        super().__init__(name, 'counter', documentation)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            _values[key] = _values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    def __init__(self, name, documentation):
+        super().__init__(name, 'gauge', documentation)
+
+    def set(self, value, **labels):
+        with _lock:
+            _values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, 'histogram', documentation, buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with _lock:
+            counts = _values.get(key)
+            if counts is None:
+                counts = _values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+
+REQUESTS = Counter('django_http_requests_total', "Requests by view, method and status code")
+REQUEST_LATENCY = Histogram('django_http_request_duration_seconds', "Request latency by view")
+DB_QUERIES = Counter('django_db_queries_total', "Database queries by alias")
+DB_QUERY_TIME = Counter('django_db_query_duration_seconds_total', "Time spent in database queries by alias")
+TEMPLATE_RENDER = Histogram('django_template_render_seconds', "Render time of page templates")
+CACHE_LOOKUPS = Counter('cache_lookups_total', "Cache lookups by cache and result (hit, stale, miss)")
+MEMORY = Gauge('process_resident_memory_bytes', "Resident memory of each worker")
+POOL_CONNECTIONS = Gauge('django_db_pool_connections', "Pooled database connections by alias and state")
+
+
+def record_cache(cache, result):
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+
+
+def _count_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        alias = context['connection'].alias
+        DB_QUERIES.inc(alias=alias)
+        DB_QUERY_TIME.inc(time.perf_counter() - started, alias=alias)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # A wrapper object outlives its connections (pooling), so add the hook once.
+    # It goes to the bottom of the stack: a connection first opened inside
+    # execute_wrapper() (QueryInspector, the profiler) pops the last entry on exit
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+# Set while a template renders; templates rendered inside it (Wagtail icons,
+# widgets and other render_to_string calls) are part of its time
+_rendering = ContextVar('template_rendering', default=False)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        outermost = not _rendering.get()
+        token = _rendering.set(True)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            _rendering.reset(token)
+            name = getattr(self.template.origin, 'template_name', None) or '<string>'
+            elapsed = time.perf_counter() - started
+            # One series per page template: not per include, icon or admin screen
+            if outermost and name.startswith(tuple(settings.METRICS_TEMPLATE_PREFIXES)):
+                TEMPLATE_RENDER.observe(elapsed, template=name)
+            profiling.record_template(name, elapsed)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing the page templates named in ``METRICS_TEMPLATE_PREFIXES``"""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def _resident_memory():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+        except ImportError:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, in KiB on Linux
+
+
+def _sample_gauges():
+    from .db import pool
+
+    memory = _resident_memory()
+    if memory is not None:
+        MEMORY.set(memory)
+    for alias, snapshot in pool.stats().items():
+        POOL_CONNECTIONS.set(snapshot['in_use'], alias=alias, state='in_use')
+        POOL_CONNECTIONS.set(snapshot['size'] - snapshot['in_use'], alias=alias, state='idle')
+
+
+class MetricsMiddleware:
+    """Count and time every request; goes first so the timing covers all middleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        atexit.register(flush, force=True)  # web workers only, not management commands
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else '<unresolved>'
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_LATENCY.observe(time.perf_counter() - started, view=view)
+        flush()
+        return response
+
+
+def _may_scrape(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    # Without a token only development servers and allowlisted scrapers get in
+    return settings.DEBUG or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint
+
+    Requires ``Authorization: Bearer METRICS_TOKEN`` when a token is set;
+    otherwise, unless ``DEBUG``, the client must be in ``METRICS_ALLOWED_IPS``.
+    """
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Multiprocess store ---
+
+def metrics_dir():
+    if settings.METRICS_DIR:
+        return Path(settings.METRICS_DIR)
+    name = f'metrics-{zlib.crc32(str(settings.BASE_DIR).encode()):08x}'
+    return Path(tempfile.gettempdir()) / name
+
+
+_process = {'pid': None, 'file': None, 'flushed': 0.0}
+
+
+def _process_file():
+    # Named by pid and start time so a recycled pid never overwrites a dead worker's counts
+    if _process['pid'] != os.getpid():
+        if _process['pid'] is not None:
+            with _lock:
+                _values.clear()  # forked: the parent's counts are in the parent's file
+        _process.update(pid=os.getpid(), file=f'{os.getpid()}-{time.time_ns()}.json', flushed=0.0)
+    return metrics_dir() / _process['file']
+
+
+def flush(force=False):
+    """Write this worker's values to its file, at most once per flush interval"""
+    now = time.monotonic()
+    path = _process_file()
+    if not force and now - _process['flushed'] < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _process['flushed'] = now
+    _sample_gauges()
+    with _lock:
+        rows = [
+            [name, labels, list(value) if isinstance(value, list) else value]
+            for (name, labels), value in _values.items()
+        ]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps({'pid': os.getpid(), 'values': rows}))
+        os.replace(temporary, path)
+    except OSError:
+        logger.warning("Could not write metrics to %s", path, exc_info=True)
+
+
+
+@contextmanager
+def _directory_lock(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(directory / '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _load(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _add(totals, name, labels, value):
+    key = (name, tuple(tuple(pair) for pair in labels))
+    if isinstance(value, list):
+        current = totals.get(key)
+        totals[key] = value if current is None else [a + b for a, b in zip(current, value)]
+    else:
+        totals[key] = totals.get(key, 0) + value
+
+
+def collect():
+    """Every worker's values merged: {(name, labels): value}"""
+    flush(force=True)
+    directory = metrics_dir()
+    totals = {}
+    with _directory_lock(directory):
+        archive_path = directory / ARCHIVE
+        archive = _load(archive_path) or {'values': []}
+        archive_changed = False
+        files = []
+        for path in directory.glob('*-*.json'):
+            data = _load(path)
+            if data is None:
+                continue
+            if _alive(data['pid']):
+                files.append(data)
+                continue
+            # Keep a dead worker's counts; its gauges died with it
+            merged = {}
+            for name, labels, value in archive['values']:
+                _add(merged, name, labels, value)
+            for name, labels, value in data['values']:
+                if name in _metrics and _metrics[name].kind != 'gauge':
+                    _add(merged, name, labels, value)
+            archive['values'] = [[name, labels, value] for (name, labels), value in merged.items()]
+            archive_changed = True
+            path.unlink(missing_ok=True)
+        if archive_changed:
+            archive_path.write_text(json.dumps(archive))
+
+    for name, labels, value in archive['values']:
+        _add(totals, name, labels, value)
+    for data in files:
+        for name, labels, value in data['values']:
+            if name in _metrics and _metrics[name].kind == 'gauge':
+                labels = labels + [['pid', str(data['pid'])]]
+            _add(totals, name, labels, value)
+    return totals
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    by_metric = {}
+    for (name, labels), value in sorted(collect().items()):
+        by_metric.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, metric in _metrics.items():
+        samples = by_metric.get(name)
+        if not samples:
+            continue
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in samples:
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            bounds = [repr(bound) for bound in metric.buckets] + ['+Inf']
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,137 @@
+"""
+Preload hints for the render-blocking assets of each page.
+
+The first HTML response for a route is scanned for the stylesheets, scripts
+and third-party origins its ``<head>`` depends on. Static files are matched
+against the WhiteNoise manifest so only real, hashed assets are hinted.
+Later requests for the same route get those assets as ``Link`` headers and,
+when the WSGI server exposes an early-hints callable, as an HTTP 103
+response sent before the view starts querying the database.
+
+Wagtail serves every page through one catch-all route, and its pages use
+different templates, so hints for Wagtail pages are learned per path.
+"""
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+MAX_PRELOADS = 6
+EARLY_HINTS_KEY = 'wsgi.early_hints'
+WAGTAIL_SERVE = 'wagtail_serve'
+
+
+class _HeadAssetParser(HTMLParser):
+    """Collect stylesheet, script and preconnect references up to </head>"""
+
+    def __init__(self):
+        super().__init__()
+        self.styles, self.scripts, self.origins = [], [], {}
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        if tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            href = attrs.get('href')
+            if not href:
+                return
+            if 'stylesheet' in rel or ('preload' in rel and attrs.get('as') == 'style'):
+                self.styles.append(href)
+            elif 'preconnect' in rel:
+                self.origins[href.rstrip('/')] = 'crossorigin' in attrs
+        elif tag == 'script' and attrs.get('src'):
+            self.scripts.append(attrs['src'])
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.done = True
+
+
+def _manifest_urls():
+    """URLs of the hashed files in the WhiteNoise manifest (empty in development)"""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return {settings.STATIC_URL + name for name in hashed_files.values()}
+
+
+def asset_links(html):
+    """Build ``Link`` header values for the assets referenced in a page's head"""
+    head, _sep, _rest = html.partition('</head>')
+    parser = _HeadAssetParser()
+    parser.feed(head)
+
+    manifest = _manifest_urls()
+    links = []
+    origins = dict(parser.origins)
+    for kind, urls in (('style', parser.styles), ('script', parser.scripts)):
+        for url in dict.fromkeys(urls):
+            parts = urlsplit(url)
+            if parts.netloc:
+                origins.setdefault(f'{parts.scheme}://{parts.netloc}', False)
+                continue
+            if not url.startswith(settings.STATIC_URL):
+                continue
+            if manifest and url not in manifest:
+                continue  # not a collected asset, e.g. a stale or unhashed name
+            links.append(f'<{url}>; rel=preload; as={kind}')
+
+    preconnects = [
+        f'<{origin}>; rel=preconnect' + ('; crossorigin' if crossorigin else '')
+        for origin, crossorigin in origins.items()
+    ]
+    return preconnects + links[:MAX_PRELOADS]
+
+
+class PreloadHintsMiddleware(MiddlewareMixin):
+    """Send learned ``Link`` preload/preconnect hints, early when possible"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.links = {}  # route (or Wagtail page path) -> Link values, learned once per process
+
+    def _route(self, request):
+        match = request.resolver_match
+        if match is None:
+            return None
+        if match.url_name == WAGTAIL_SERVE:
+            # The page, and so its template, is only known once the view has run
+            return (WAGTAIL_SERVE, request.path)
+        return match.route
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        links = self.links.get(self._route(request))
+        send_early_hints = request.META.get(EARLY_HINTS_KEY)
+        if links and callable(send_early_hints):
+            try:
+                send_early_hints([('Link', link) for link in links])
+            except Exception:
+                logger.warning("Could not send 103 Early Hints", exc_info=True)
+        return None
+
+    def process_response(self, request, response):
+        if (
+            request.method != 'GET'
+            or response.status_code != 200
+            or response.streaming
+            or not response.get('Content-Type', '').startswith('text/html')
+        ):
+            return response
+        route = self._route(request)
+        if route is None:
+            return response
+        links = self.links.get(route)
+        if links is None:
+            links = asset_links(response.content.decode(response.charset, errors='replace'))
+            self.links[route] = links
+        if links and 'Link' not in response:
+            response['Link'] = ', '.join(links)
+        return response
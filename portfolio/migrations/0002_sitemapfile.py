@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=50)),
+                ('page', models.PositiveIntegerField(default=1)),
+                ('content', models.TextField()),
+                ('lastmod', models.DateTimeField(blank=True, null=True)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sitemap File',
+                'verbose_name_plural': 'Sitemap Files',
+                'ordering': ['section', 'page'],
+                'unique_together': {('section', 'page')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_message_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('post_count', models.PositiveIntegerField(default=0, help_text='Published posts with this tag (cached)')),
+            ],
+            options={
+                'verbose_name': 'Blog Tag',
+                'verbose_name_plural': 'Blog Tags',
+                'ordering': ['-post_count', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogPostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='portfolio.blogpost')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='portfolio.blogtag')),
+            ],
+            options={
+                'verbose_name': 'Blog Post Tag',
+                'verbose_name_plural': 'Blog Post Tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='tag_index',
+            field=models.ManyToManyField(blank=True, related_name='posts', through='portfolio.BlogPostTag', to='portfolio.blogtag'),
+        ),
+        migrations.AddIndex(
+            model_name='blogposttag',
+            index=models.Index(fields=['tag', 'post'], name='blogposttag_tag_post_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='blogposttag',
+            unique_together={('post', 'tag')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count, Q
+from django.utils.text import slugify
+
+
+def backfill_tag_index(apps, schema_editor):
+    BlogPost = apps.get_model('portfolio', 'BlogPost')
+    BlogTag = apps.get_model('portfolio', 'BlogTag')
+    BlogPostTag = apps.get_model('portfolio', 'BlogPostTag')
+
+    tags = {}
+    links = []
+    for post_id, value in BlogPost.objects.values_list('pk', 'tags').iterator():
+        seen = set()
+        for name in (value or '').split(','):
+            name = name.strip()
+            slug = slugify(name)
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            tags.setdefault(slug, name[:100])
+            links.append((post_id, slug))
+
+    BlogTag.objects.bulk_create(
+        [BlogTag(slug=slug, name=name) for slug, name in tags.items()],
+        ignore_conflicts=True,
+    )
+    tag_ids = dict(BlogTag.objects.values_list('slug', 'pk'))
+    BlogPostTag.objects.bulk_create(
+        [BlogPostTag(post_id=post_id, tag_id=tag_ids[slug]) for post_id, slug in links],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    counts = BlogTag.objects.annotate(
+        published=Count('post_links', filter=Q(post_links__post__published=True))
+    )
+    for tag in counts:
+        tag.post_count = tag.published
+    BlogTag.objects.bulk_update(counts, ['post_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_blog_tag_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tag_index, migrations.RunPython.noop),
+    ]
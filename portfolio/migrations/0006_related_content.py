@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_backfill_blog_tag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('target_source', models.CharField(max_length=50)),
+                ('target_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('url', models.CharField(max_length=500)),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Related Item',
+                'verbose_name_plural': 'Related Items',
+                'ordering': ['source', 'object_id', 'rank'],
+                'indexes': [models.Index(fields=['source', 'object_id', 'rank'], name='relateditem_lookup_idx'), models.Index(fields=['target_source', 'target_id'], name='relateditem_target_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContentVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Model label, e.g. portfolio.project', max_length=50)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('url', models.CharField(max_length=500)),
+                ('terms', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Content Vector',
+                'verbose_name_plural': 'Content Vectors',
+                'unique_together': {('source', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+SYNCED_MODELS = [
+    ('portfolio', 'bio'),
+    ('portfolio', 'project'),
+    ('portfolio', 'award'),
+    ('portfolio', 'galleryimage'),
+    ('portfolio', 'blogpost'),
+    ('portfolio', 'testimonial'),
+    ('portfolio', 'sitesettings'),
+    ('blogcms', 'blogpage'),
+]
+
+
+def backfill_change_log(apps, schema_editor):
+    """Log every existing object so a feed read from cursor 0 is a full sync"""
+    ChangeLogEntry = apps.get_model('portfolio', 'ChangeLogEntry')
+    for app_label, model_name in SYNCED_MODELS:
+        model = apps.get_model(app_label, model_name)
+        queryset = model.objects.order_by('pk')
+        if model_name == 'blogpost':
+            queryset = queryset.filter(published=True)
+        elif model_name == 'blogpage':
+            queryset = queryset.filter(live=True)
+        ChangeLogEntry.objects.bulk_create(
+            [
+                ChangeLogEntry(source=f'{app_label}.{model_name}', object_id=pk, action='created')
+                for pk in queryset.values_list('pk', flat=True).iterator()
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_change_log'),
+        ('blogcms', '0002_syndicationfeed'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_backfill_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Name of the report files', max_length=32, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2000)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('query_ms', models.FloatField()),
+                ('user', models.CharField(blank=True, max_length=150)),
+                ('trigger', models.CharField(choices=[('requested', 'Requested by staff'), ('sampled', 'Random sample')], max_length=10)),
+            ],
+            options={
+                'verbose_name': 'Profile Report',
+                'verbose_name_plural': 'Profile Reports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# The admin searches these columns with icontains, which Postgres runs as
+# UPPER(column::text) LIKE UPPER('%term%'). Trigram indexes on that
+# expression serve it; all four are needed because the terms are OR-ed and
+# one unindexed column forces a sequential scan anyway.
+SEARCH_COLUMNS = ['name', 'email', 'subject', 'message']
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS message_{column}_trgm_idx '
+            f'ON portfolio_message USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS message_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_gallery_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
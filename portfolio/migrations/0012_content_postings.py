@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:18
+
+import math
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def backfill_postings(apps, schema_editor):
+    """Index the stored vectors, weighted as portfolio.related.Corpus weighs them"""
+    ContentVector = apps.get_model('portfolio', 'ContentVector')
+    ContentPosting = apps.get_model('portfolio', 'ContentPosting')
+    vectors = list(ContentVector.objects.values_list('source', 'object_id', 'terms'))
+    df = Counter(term for _source, _object_id, terms in vectors for term in terms)
+    n = len(vectors)
+    postings = []
+    for source, object_id, terms in vectors:
+        weights = {
+            term: (1 + math.log(count)) * (math.log((1 + n) / (1 + df[term])) + 1)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        postings.extend(
+            ContentPosting(term=term[:100], source=source, object_id=object_id, weight=w / norm)
+            for term, w in weights.items()
+        )
+    ContentPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_message_search_trigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('source', models.CharField(max_length=50)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('weight', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Content Posting',
+                'verbose_name_plural': 'Content Postings',
+                'indexes': [models.Index(fields=['term', 'source', 'object_id', 'weight'], name='contentposting_term_idx'), models.Index(fields=['source', 'object_id'], name='contentposting_object_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_postings, migrations.RunPython.noop),
+    ]
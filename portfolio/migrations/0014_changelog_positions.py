@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:27
+
+from django.db import migrations, models
+from django.db.models import F
+
+POSITION_SEQUENCE = 'portfolio_changelogentry_position_seq'
+
+
+def number_existing_entries(apps, schema_editor):
+    """Positions start as the old ids, so cursors clients already hold stay valid"""
+    ChangeLogEntry = apps.get_model('portfolio', 'ChangeLogEntry')
+    ChangeLogEntry.objects.update(position=F('id'))
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'CREATE SEQUENCE IF NOT EXISTS {POSITION_SEQUENCE}')
+        schema_editor.execute(
+            f"SELECT setval('{POSITION_SEQUENCE}', "
+            f"(SELECT COALESCE(MAX(position), 0) + 1 FROM portfolio_changelogentry), false)"
+        )
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {POSITION_SEQUENCE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0013_cache_generations'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='changelogentry',
+            options={'ordering': ['position'], 'verbose_name': 'Change Log Entry', 'verbose_name_plural': 'Change Log Entries'},
+        ),
+        migrations.AddField(
+            model_name='changelogentry',
+            name='position',
+            field=models.BigIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_entries, drop_sequence),
+    ]
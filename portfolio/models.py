@@ -1,6 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.text import slugify
+
+
+def parse_tags(value):
+    """Split a comma-separated tag string into unique (slug, name) pairs"""
+    tags = {}
+    for name in (value or '').split(','):
+        name = name.strip()
+        slug = slugify(name)
+        if slug and slug not in tags:
+            tags[slug] = name[:100]
+    return tags
 
 
 class Bio(models.Model):
@@ -114,9 +126,21 @@ class GalleryImage(models.Model):
     )
     featured = models.BooleanField(default=False, help_text="Show on homepage")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Filled in from the image file (see portfolio.gallery), so pages can
+    # reserve space for images and lists load small thumbnails
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail = models.FileField(upload_to='gallery/thumbnails/', blank=True, editable=False)
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-date']
+        # The gallery feed pages by (date, id), optionally within a category
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='galleryimage_feed_idx'),
+            models.Index(fields=['category', '-date', '-id'], name='galleryimage_category_feed_idx'),
+        ]
         verbose_name = "Gallery Image"
         verbose_name_plural = "Gallery Images"
 
@@ -137,6 +161,8 @@ class BlogPost(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags")
+    # Normalised copy of `tags`, kept in sync on save for exact tag filtering
+    tag_index = models.ManyToManyField('BlogTag', through='BlogPostTag', related_name='posts', blank=True)
 
 
     class Meta:
@@ -150,6 +176,73 @@ class BlogPost(models.Model):
     def get_absolute_url(self):
         return reverse('portfolio:blog_detail', kwargs={'slug': self.slug})
 
+    def save(self, *args, **kwargs):
+        was_published = False
+        if self.pk:
+            was_published = BlogPost.objects.filter(pk=self.pk, published=True).exists()
+        self._was_published = was_published  # read by post_save receivers
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_tag_index(was_published)
+
+    def sync_tag_index(self, was_published):
+        """Bring tag links in line with `tags` and adjust cached tag counts"""
+        wanted = parse_tags(self.tags)
+        linked = dict(self.tag_links.values_list('tag__slug', 'tag_id'))
+        old_ids = set(linked.values())
+
+        removed = [tag_id for slug, tag_id in linked.items() if slug not in wanted]
+        if removed:
+            self.tag_links.filter(tag_id__in=removed).delete()
+        new_ids = {tag_id for slug, tag_id in linked.items() if slug in wanted}
+        for slug, name in wanted.items():
+            if slug not in linked:
+                tag, _created = BlogTag.objects.get_or_create(slug=slug, defaults={'name': name})
+                BlogPostTag.objects.create(post=self, tag=tag)
+                new_ids.add(tag.pk)
+
+        # Only published posts count towards the tag cloud
+        before = old_ids if was_published else set()
+        after = new_ids if self.published else set()
+        BlogTag.adjust_counts(after - before, 1)
+        BlogTag.adjust_counts(before - after, -1)
+
+
+class BlogTag(models.Model):
+    """Normalised tag for legacy blog posts"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    post_count = models.PositiveIntegerField(default=0, help_text="Published posts with this tag (cached)")
+
+    class Meta:
+        ordering = ['-post_count', 'name']
+        verbose_name = "Blog Tag"
+        verbose_name_plural = "Blog Tags"
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def adjust_counts(cls, tag_ids, delta):
+        if tag_ids:
+            cls.objects.filter(pk__in=tag_ids).update(post_count=models.F('post_count') + delta)
+
+
+class BlogPostTag(models.Model):
+    """Through model linking legacy blog posts to normalised tags"""
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(BlogTag, on_delete=models.CASCADE, related_name='post_links')
+
+    class Meta:
+        unique_together = [('post', 'tag')]
+        # unique_together already indexes (post, tag); this serves tag filters
+        indexes = [models.Index(fields=['tag', 'post'], name='blogposttag_tag_post_idx')]
+        verbose_name = "Blog Post Tag"
+        verbose_name_plural = "Blog Post Tags"
+
+    def __str__(self):
+        return f"{self.post} - {self.tag}"
+
 
 class Testimonial(models.Model):
     """Testimonials from colleagues and partners"""
@@ -184,6 +277,13 @@ class Message(models.Model):
         ordering = ['-sent_at']
         verbose_name = "Message"
         verbose_name_plural = "Messages"
+        indexes = [
+            models.Index(fields=['-sent_at'], name='message_sent_at_idx'),
+            # Partial indexes keep the admin's unread / unreplied views small
+            # and fast no matter how much spam piles up in the table
+            models.Index(fields=['-sent_at'], condition=models.Q(read=False), name='message_unread_idx'),
+            models.Index(fields=['-sent_at'], condition=models.Q(replied=False), name='message_unreplied_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
@@ -215,3 +315,168 @@ class SiteSettings(models.Model):
         if not self.pk and SiteSettings.objects.exists():
             return SiteSettings.objects.first()
         return super().save(*args, **kwargs)
+
+
+class SitemapFile(models.Model):
+    """Pre-rendered sitemap XML, one row per section chunk"""
+    section = models.CharField(max_length=50)
+    page = models.PositiveIntegerField(default=1)
+    content = models.TextField()
+    lastmod = models.DateTimeField(blank=True, null=True)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['section', 'page']
+        unique_together = [('section', 'page')]
+        verbose_name = "Sitemap File"
+        verbose_name_plural = "Sitemap Files"
+
+    def __str__(self):
+        return f"{self.section} ({self.page})"
+
+
+class ContentVector(models.Model):
+    """Term frequencies of one piece of content, used by portfolio.related"""
+    source = models.CharField(max_length=50, help_text="Model label, e.g. portfolio.project")
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    url = models.CharField(max_length=500)
+    terms = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [('source', 'object_id')]
+        verbose_name = "Content Vector"
+        verbose_name_plural = "Content Vectors"
+
+    def __str__(self):
+        return f"{self.source}:{self.object_id}"
+
+
+class ContentPosting(models.Model):
+    """One term of a ContentVector with its TF-IDF weight: the inverted index"""
+    term = models.CharField(max_length=100)
+    source = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # Covers the postings read for a term, so scoring never touches the table
+            models.Index(fields=['term', 'source', 'object_id', 'weight'], name='contentposting_term_idx'),
+            models.Index(fields=['source', 'object_id'], name='contentposting_object_idx'),
+        ]
+        verbose_name = "Content Posting"
+        verbose_name_plural = "Content Postings"
+
+    def __str__(self):
+        return f"{self.term} -> {self.source}:{self.object_id}"
+
+
+class RelatedItem(models.Model):
+    """Precomputed related content for an object, best match first"""
+    source = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    target_source = models.CharField(max_length=50)
+    target_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    url = models.CharField(max_length=500)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['source', 'object_id', 'rank']
+        indexes = [
+            models.Index(fields=['source', 'object_id', 'rank'], name='relateditem_lookup_idx'),
+            models.Index(fields=['target_source', 'target_id'], name='relateditem_target_idx'),
+        ]
+        verbose_name = "Related Item"
+        verbose_name_plural = "Related Items"
+
+    def __str__(self):
+        return f"{self.source}:{self.object_id} -> {self.title}"
+
+    KIND_LABELS = {
+        'portfolio.project': 'Project',
+        'portfolio.award': 'Award',
+        'portfolio.blogpost': 'Blog post',
+        'blogcms.blogpage': 'Blog post',
+    }
+
+    @property
+    def kind(self):
+        return self.KIND_LABELS.get(self.target_source, '')
+
+
+class ChangeLogEntry(models.Model):
+    """Latest change to a synced object; ``position`` is the change-feed cursor
+
+    Each object keeps a single row that is replaced on every change, so the
+    table grows with the number of objects, not the number of edits.
+    Positions are handed out in commit order (see portfolio.changes).
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    source = models.CharField(max_length=50, help_text="Model label, e.g. portfolio.project")
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now=True)
+    position = models.BigIntegerField(null=True, unique=True, editable=False)
+
+    class Meta:
+        ordering = ['position']
+        unique_together = [('source', 'object_id')]
+        verbose_name = "Change Log Entry"
+        verbose_name_plural = "Change Log Entries"
+
+    def __str__(self):
+        return f"{self.source}:{self.object_id} {self.action}"
+
+
+class ProfileReport(models.Model):
+    """A profiled request; the report itself is a file in PROFILE_DIR"""
+    REQUESTED = 'requested'
+    SAMPLED = 'sampled'
+    TRIGGER_CHOICES = [
+        (REQUESTED, 'Requested by staff'),
+        (SAMPLED, 'Random sample'),
+    ]
+
+    key = models.CharField(max_length=32, unique=True, help_text="Name of the report files")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_ms = models.FloatField()
+    user = models.CharField(max_length=150, blank=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Profile Report"
+        verbose_name_plural = "Profile Reports"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class CacheGeneration(models.Model):
+    """Shared cache generation of a model, used by portfolio.invalidation on PostgreSQL"""
+    label = models.CharField(max_length=100, unique=True, help_text="Model label, e.g. portfolio.project")
+    generation = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Cache Generation"
+        verbose_name_plural = "Cache Generations"
+
+    def __str__(self):
+        return f"{self.label} @ {self.generation}"
@@ -0,0 +1,141 @@
+"""
+Service worker and web app manifest, for repeat visits on flaky connections.
+
+``/sw.js`` is rendered from ``portfolio/sw.js`` with:
+
+* the hashed static files under ``OFFLINE_PRECACHE_STATIC`` from the
+  WhiteNoise manifest. They are precached at install and then served from
+  the cache, since a hashed name never changes content.
+* the public pages, which are precached too. Visited HTML pages are served
+  from the cache while a fresh copy is fetched for next time
+  (stale-while-revalidate). Only responses the server marked ``public``
+  are cached; those are the page-cached anonymous pages.
+* a version, a digest of both lists and of the worker itself. Each
+  ``collectstatic`` that changes a file changes its hashed name and so the
+  version. The new worker then installs alongside the old one and deletes
+  the old caches once it takes over.
+
+Without a manifest (development, ``DEBUG``) nothing static is precached
+and static files always come from the network. ``OFFLINE_ENABLED=False``
+serves a worker that clears its caches and unregisters itself, so turning
+the feature off also removes it from browsers that already installed it.
+"""
+import functools
+import hashlib
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import etag
+
+# The pages public visitors get from the page cache (see portfolio.urls)
+PUBLIC_ROUTES = (
+    'portfolio:home', 'portfolio:about', 'portfolio:projects',
+    'portfolio:awards', 'portfolio:gallery', 'portfolio:testimonials',
+)
+# Never handled by the worker: private, non-HTML or always-live URLs
+BYPASS_PREFIXES = ('/admin/', '/cms/', '/api/', '/documents/', '/metrics', '/blog/feed/')
+MAX_CACHED_PAGES = 50
+MAX_CACHED_MEDIA = 100
+THEME_COLOR = '#0369a1'
+BACKGROUND_COLOR = '#ffffff'
+ICONS = (('images/icon-192.png', '192x192'), ('images/icon-512.png', '512x512'))
+
+
+def _hashed_files():
+    return getattr(staticfiles_storage, 'hashed_files', None) or {}
+
+
+def precache_static():
+    """URLs of the collected, hashed static files the worker precaches"""
+    prefixes = tuple(settings.OFFLINE_PRECACHE_STATIC)
+    return sorted(
+        settings.STATIC_URL + hashed
+        for name, hashed in _hashed_files().items()
+        if name.startswith(prefixes) and not name.endswith('.map')
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def worker_config():
+    """What /sw.js is rendered from; fixed for the life of a process
+
+    The staticfiles manifest is only read at startup, so a collectstatic
+    takes effect with the worker restart that deploys it.
+    """
+    config = {
+        'static': precache_static(),
+        'pages': [reverse(name) for name in PUBLIC_ROUTES],
+        'offline': reverse('portfolio:offline'),
+        'staticUrl': settings.STATIC_URL,
+        'mediaUrl': settings.MEDIA_URL,
+        'bypass': list(BYPASS_PREFIXES),
+        'maxPages': MAX_CACHED_PAGES,
+        'maxMedia': MAX_CACHED_MEDIA,
+    }
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode())
+    digest.update(Path(get_template('portfolio/sw.js').origin.name).read_bytes())  # a changed worker replaces the old one
+    config['version'] = digest.hexdigest()[:12]
+    return config
+
+
+def _worker_etag(request):
+    return worker_config()['version'] if settings.OFFLINE_ENABLED else 'disabled'
+
+
+@etag(_worker_etag)
+def service_worker(request):
+    """The generated service worker script, at the site root so it controls every page"""
+    if settings.OFFLINE_ENABLED:
+        body = render_to_string('portfolio/sw.js', {'config': json.dumps(worker_config())})
+    else:
+        body = render_to_string('portfolio/sw_unregister.js')
+    response = HttpResponse(body, content_type='text/javascript; charset=utf-8')
+    # Browsers revalidate the worker script on every navigation anyway; the ETag keeps that cheap
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def offline_page(request):
+    """Shown by the worker for a page that is neither reachable nor cached"""
+    from .views import get_site_settings
+
+    return render(request, 'portfolio/offline.html', {'site_settings': get_site_settings()})
+
+
+def _static_exists(path):
+    if _hashed_files():
+        return path in _hashed_files()
+    return finders.find(path) is not None
+
+
+def web_manifest(request):
+    """Web app manifest, so the site can be installed and opened full-screen"""
+    from .views import get_site_settings
+
+    site_settings = get_site_settings()
+    title = site_settings.site_title if site_settings else 'Dr. Paul Mwambu'
+    manifest = {
+        'name': title,
+        'short_name': 'Dr. Paul Mwambu',
+        'description': site_settings.site_description if site_settings else '',
+        'start_url': reverse('portfolio:home'),
+        'scope': '/',
+        'display': 'standalone',
+        'theme_color': THEME_COLOR,
+        'background_color': BACKGROUND_COLOR,
+        'icons': [
+            {'src': staticfiles_storage.url(path), 'sizes': sizes, 'type': 'image/png'}
+            for path, sizes in ICONS if _static_exists(path)
+        ],
+    }
+    response = JsonResponse(manifest, content_type='application/manifest+json')
+    patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
@@ -0,0 +1,191 @@
+"""
+Stale-while-revalidate page cache for public pages.
+
+A cached page is fresh for ``PAGE_CACHE_MAX_AGE`` seconds. After that, or
+as soon as any content model changes (see portfolio.invalidation), it is
+stale: visitors still get the cached copy immediately while one background
+thread per page re-renders it. Only once a copy is older than max-age plus
+``PAGE_CACHE_STALE_WHILE_REVALIDATE`` seconds does a visitor wait for a
+fresh render, and concurrent misses for one page share a single render
+(see portfolio.singleflight). Responses carry the matching
+``Cache-Control`` header so browsers and CDNs can apply the same policy.
+
+Only anonymous GET/HEAD requests are cached, and never responses that set
+cookies or embed a CSRF token.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control
+
+from . import invalidation, singleflight
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'swr-page'
+# Content that public pages are rendered from
+DEPENDENCIES = (
+    'portfolio.bio', 'portfolio.project', 'portfolio.award', 'portfolio.galleryimage',
+    'portfolio.blogpost', 'portfolio.testimonial', 'portfolio.sitesettings',
+    'blogcms.blogpage', 'wagtailcore.page',
+)
+REPLAYED_META = (
+    'HTTP_HOST', 'SERVER_NAME', 'SERVER_PORT', 'SCRIPT_NAME', 'QUERY_STRING',
+    'wsgi.url_scheme', 'HTTP_X_FORWARDED_PROTO', 'HTTP_X_FORWARDED_HOST',
+)
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _enabled():
+    return settings.PAGE_CACHE_MAX_AGE > 0
+
+
+def _cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES  # may be logged in
+        and 'messages' not in request.COOKIES                   # pending flash messages
+    )
+
+
+def _cache_key(request):
+    return f'{KEY_PREFIX}:{request.scheme}://{request.get_host()}{request.get_full_path()}'
+
+
+def _stamp():
+    return tuple(invalidation.current(label) for label in DEPENDENCIES)
+
+
+def _store(key, request, response, stamp):
+    """Cache a rendered response if it can be shared; return the entry or None"""
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    ):
+        return None
+    max_age = settings.PAGE_CACHE_MAX_AGE
+    stale = settings.PAGE_CACHE_STALE_WHILE_REVALIDATE
+    patch_cache_control(response, public=True, max_age=max_age, stale_while_revalidate=stale)
+    entry = {
+        'status': response.status_code,
+        'headers': [(k, v) for k, v in response.items() if k.lower() != 'age'],
+        'content': response.content,
+        'created': time.time(),
+        'stamp': stamp,
+    }
+    cache.set(key, entry, timeout=max_age + stale)
+    return entry
+
+
+def _from_entry(entry, age):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    response['Age'] = str(int(age))
+    return response
+
+
+def _replay_request(request):
+    """An anonymous copy of the request that outlives the original"""
+    replay = HttpRequest()
+    replay.method = 'GET'
+    replay.path, replay.path_info = request.path, request.path_info
+    replay.META = {key: request.META[key] for key in REPLAYED_META if key in request.META}
+    replay.META['REQUEST_METHOD'] = 'GET'
+    replay.GET = request.GET.copy()
+    replay.user = AnonymousUser()
+    replay.resolver_match = request.resolver_match
+    replay._swr_refresh = True
+    return replay
+
+
+def _refresh_in_background(key, request):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    replay = _replay_request(request)
+    match = request.resolver_match
+
+    def refresh():
+        close_old_connections()
+        try:
+            # One worker refreshes a page; the others keep serving it stale
+            with singleflight.advisory_lock(key) as acquired:
+                if acquired:
+                    # Re-resolving the view loads fresh objects (e.g. Wagtail pages)
+                    match.func(replay, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception("Background refresh of %s failed", key)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+            connection.close()
+
+    threading.Thread(target=refresh, name='page-cache-refresh', daemon=True).start()
+
+
+def cached_response(request, render):
+    """Serve ``render(request)`` through the stale-while-revalidate cache"""
+    if not _enabled() or not _cacheable_request(request):
+        return render(request)
+    key = _cache_key(request)
+    stamp = _stamp()
+    if getattr(request, '_swr_refresh', False):
+        response = render(request)
+        _store(key, request, response, stamp)
+        return response
+
+    entry = cache.get(key)
+    if entry is not None:
+        age = time.time() - entry['created']
+        if age <= settings.PAGE_CACHE_MAX_AGE and entry['stamp'] == stamp:
+            record_cache('page', 'hit')
+            return _from_entry(entry, age)
+        if age <= settings.PAGE_CACHE_MAX_AGE + settings.PAGE_CACHE_STALE_WHILE_REVALIDATE:
+            record_cache('page', 'stale')
+            _refresh_in_background(key, request)
+            return _from_entry(entry, age)
+    record_cache('page', 'miss')
+
+    # Missing or past the hard expiry: one visitor renders, concurrent ones
+    # for the same page wait for its entry instead of rendering it again
+    rendered = []
+
+    def render_and_store():
+        response = render(request)
+        rendered.append(response)
+        return _store(key, request, response, stamp)
+
+    def recheck():
+        entry = cache.get(key)
+        return entry if entry is not None and entry['stamp'] == stamp else None
+
+    entry = singleflight.do(key, render_and_store, recheck=recheck)
+    if rendered:
+        return rendered[0]
+    if entry is None:
+        return render(request)  # the leader's page could not be shared
+    return _from_entry(entry, time.time() - entry['created'])
+
+
+def stale_while_revalidate(view):
+    """View decorator applying the page cache"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        return cached_response(request, lambda r: view(r, *args, **kwargs))
+    return wrapped
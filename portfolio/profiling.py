@@ -0,0 +1,312 @@
+"""
+On-demand request profiling.
+
+Staff can profile a single request by adding ``?_profile=1`` to the URL or
+sending an ``X-Profile: 1`` header. ``PROFILE_SAMPLE_RATE`` also profiles
+that fraction of all other requests, to catch pages that are only slow
+in production.
+
+A profiled request runs under exactly one profiler while every SQL query
+and template render is recorded:
+
+* the stack sampler, by default and for every sampled request: a call
+  tree and the functions with the most own time, from periodic snapshots
+  of the request's stack, at little cost to the request
+* cProfile, when staff ask for ``?_profile=cprofile``
+  (``X-Profile: cprofile``): exact call counts and times per function,
+  at several times the request's normal run time
+
+The report is written to ``PROFILE_DIR``: ``<key>.json`` holds the
+profile, SQL and template timings, and cProfile runs also leave
+``<key>.prof``, raw pstats data for tools such as snakeviz.
+
+A ProfileReport row indexes the files for the admin, which keeps the latest
+``PROFILE_MAX_REPORTS``.
+"""
+import cProfile
+import json
+import logging
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from .query_inspector import fingerprint
+
+logger = logging.getLogger(__name__)
+
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+CPROFILE = 'cprofile'  # the _profile / X-Profile value that selects cProfile
+EXCLUDED_PATHS = ('/admin/', '/static/', '/media/', '/metrics')
+MIN_NODE_SHARE = 0.005  # call tree nodes under 0.5% of the request are left out
+# The interpreter's default switch interval: the sampler needs the GIL to
+# take a sample, and a busy request thread only gives it up this often
+SAMPLE_INTERVAL = 0.005
+MAX_DEPTH = 60
+TOP_FUNCTIONS = 40
+MAX_SQL_LENGTH = 4000
+
+_active = ContextVar('profile_collector', default=None)
+
+
+class _Collector:
+    def __init__(self):
+        self.queries = []
+        self.templates = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql[:MAX_SQL_LENGTH],
+                'ms': (time.perf_counter() - started) * 1000,
+            })
+
+
+def record_template(name, seconds):
+    """Called for each template render (see portfolio.metrics)"""
+    collector = _active.get()
+    if collector is not None:
+        collector.templates.append({'name': name, 'ms': seconds * 1000})
+
+
+def report_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # built-in
+    return f'{name} ({filename}:{line})'
+
+
+def _frames(frame):
+    """(filename, line, name) of each frame, outermost first"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class _StackSampler(threading.Thread):
+    """Record the stack of one thread every SAMPLE_INTERVAL seconds
+
+    The call tree comes from these samples rather than from cProfile, whose
+    per-edge timings cannot separate the levels of a recursive call chain
+    such as Django's middleware.
+    """
+
+    def __init__(self, thread_id, skip):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.skip = skip  # frames outside the profiled call
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[tuple(_frames(frame)[self.skip:])] += 1
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self.join()
+
+
+def call_tree(stacks, duration):
+    """Sampled stacks merged into a tree; each node's time is its share of the request"""
+    total = sum(stacks.values())
+    if not total:
+        return []
+    root = {}
+    for stack, count in stacks.items():
+        children = root
+        for frame in stack:
+            node = children.setdefault(frame, {'samples': 0, 'children': {}})
+            node['samples'] += count
+            children = node['children']
+
+    def convert(children, depth):
+        nodes = []
+        for frame, node in sorted(children.items(), key=lambda item: -item[1]['samples']):
+            share = node['samples'] / total
+            if share < MIN_NODE_SHARE:
+                continue
+            nodes.append({
+                'name': _label(frame),
+                'ms': share * duration * 1000,
+                'share': share,
+                'samples': node['samples'],
+                'children': convert(node['children'], depth + 1) if depth < MAX_DEPTH else [],
+            })
+        return nodes
+
+    return convert(root, 0)
+
+
+def top_functions(stats):
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:TOP_FUNCTIONS]
+    return [
+        {'name': _label(func), 'calls': nc, 'own_ms': tt * 1000, 'cumulative_ms': ct * 1000}
+        for func, (_cc, nc, tt, ct, _callers) in rows
+    ]
+
+
+def sampled_functions(stacks, duration):
+    """``top_functions`` estimated from samples; call counts are unknown"""
+    total = sum(stacks.values())
+    own, cumulative = Counter(), Counter()
+    for stack, count in stacks.items():
+        if stack:
+            own[stack[-1]] += count
+        for frame in set(stack):  # once per sample, however deep the recursion
+            cumulative[frame] += count
+    return [
+        {
+            'name': _label(frame),
+            'calls': None,
+            'own_ms': count / total * duration * 1000,
+            'cumulative_ms': cumulative[frame] / total * duration * 1000,
+        }
+        for frame, count in own.most_common(TOP_FUNCTIONS)
+    ]
+
+
+def _duplicate_queries(queries):
+    # Grouped by shape, so an N+1 loop shows up however its parameters vary
+    counts = {}
+    for query in queries:
+        shape = fingerprint(query['sql'])
+        counts[shape] = counts.get(shape, 0) + 1
+    return sorted(
+        ({'sql': sql, 'count': count} for sql, count in counts.items() if count > 1),
+        key=lambda d: -d['count'],
+    )
+
+
+def save_report(request, response, profiler, collector, duration, trigger):
+    from .models import ProfileReport
+
+    key = uuid.uuid4().hex
+    directory = report_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.dump_stats(directory / f'{key}.prof')
+        report = {'profiler': CPROFILE, 'call_tree': [], 'top_functions': top_functions(pstats.Stats(profiler))}
+    else:
+        report = {
+            'profiler': 'sampler',
+            'call_tree': call_tree(profiler.stacks, duration),
+            'top_functions': sampled_functions(profiler.stacks, duration),
+        }
+    report.update({
+        'queries': collector.queries,
+        'duplicate_queries': _duplicate_queries(collector.queries),
+        'templates': collector.templates,
+    })
+    (directory / f'{key}.json').write_text(json.dumps(report))
+
+    user = getattr(request, 'user', None)
+    saved = ProfileReport.objects.create(
+        key=key,
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        query_count=len(collector.queries),
+        query_ms=sum(query['ms'] for query in collector.queries),
+        user=user.get_username() if user is not None and user.is_authenticated else '',
+        trigger=trigger,
+    )
+    stale = ProfileReport.objects.values_list('pk', flat=True)[settings.PROFILE_MAX_REPORTS:]
+    ProfileReport.objects.filter(pk__in=list(stale)).delete()
+    return saved
+
+
+def load_report(key):
+    return json.loads((report_dir() / f'{key}.json').read_text())
+
+
+def remove_report_files(key):
+    for suffix in ('.json', '.prof'):
+        (report_dir() / f'{key}{suffix}').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profile requests asked for by staff, and a random sample of the rest
+
+    Goes after AuthenticationMiddleware, which it needs to recognise staff.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _trigger(self, request):
+        if request.path.startswith(EXCLUDED_PATHS):
+            return None
+        if (QUERY_PARAM in request.GET or request.META.get(HEADER)) and request.user.is_staff:
+            return 'requested'
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return 'sampled'
+        return None
+
+    def _profiler(self, request, trigger):
+        # One profiler per request: cProfile's tracing would distort the samples
+        asked = request.GET.get(QUERY_PARAM) or request.META.get(HEADER)
+        if trigger == 'requested' and asked == CPROFILE:
+            return cProfile.Profile()
+        return _StackSampler(threading.get_ident(), skip=len(_frames(sys._getframe(1))))
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        collector = _Collector()
+        profiler = self._profiler(request, trigger)
+        token = _active.set(collector)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(collector))
+                if isinstance(profiler, cProfile.Profile):
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    stack.enter_context(profiler)
+                    response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            _active.reset(token)
+
+        try:
+            report = save_report(request, response, profiler, collector, duration, trigger)
+        except Exception:
+            logger.exception("Could not save the profile of %s", request.path)
+            return response
+        if trigger == 'requested':
+            response['X-Profile-Report'] = reverse('admin:portfolio_profilereport_change', args=[report.pk])
+        return response
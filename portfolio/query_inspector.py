@@ -0,0 +1,178 @@
+"""
+N+1 and query-budget detection for development and tests.
+
+Every query is fingerprinted by its shape, with literals and ``IN`` lists
+collapsed, and attributed to the template line and application code that
+ran it. A shape repeated ``QUERY_REPEAT_THRESHOLD`` times in one request is
+reported as a likely N+1: usually a template loop touching a relation the
+view did not ``select_related``/``prefetch_related``.
+
+* ``QueryInspectorMiddleware`` (on when ``QUERY_INSPECTOR``, by default
+  with DEBUG) logs N+1s and ``QUERY_BUDGETS`` overruns, and adds an
+  ``X-Query-Count`` header. With ``QUERY_INSPECTOR_STRICT`` it raises
+  instead, failing the request.
+* ``query_budget()`` asserts a budget around any block of code::
+
+      with query_budget(6):
+          client.get('/awards/')
+
+* ``manage.py check_query_budgets`` requests every page in
+  ``QUERY_BUDGETS`` and exits non-zero on an overrun, for CI.
+"""
+import logging
+import re
+import sys
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\bIN \((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+_RENDER_CODE = Node.render_annotated.__code__
+_LIBRARY_PATHS = ('site-packages', 'dist-packages')
+_WRAPPER_ARGS = {'execute', 'sql', 'params', 'many', 'context'}
+
+Query = namedtuple('Query', 'alias sql fingerprint template code')
+
+
+def fingerprint(sql):
+    """The shape of a query: the same for every row an N+1 loop fetches"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _is_execute_wrapper(code):
+    # Other execute wrappers (portfolio.metrics, portfolio.profiling) pass
+    # queries on; the code that asked for them is further out
+    return _WRAPPER_ARGS <= set(code.co_varnames[:code.co_argcount])
+
+
+def _origin(frame):
+    """(template line, application line) that led to a query"""
+    template = code = None
+    base_dir = str(settings.BASE_DIR)
+    while frame is not None and (template is None or code is None):
+        filename = frame.f_code.co_filename
+        if template is None and frame.f_code is _RENDER_CODE:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name or origin.name}:{token.lineno}'
+        elif (
+            code is None and filename.startswith(base_dir) and filename != __file__
+            and not any(part in filename for part in _LIBRARY_PATHS)
+            and not _is_execute_wrapper(frame.f_code)
+        ):
+            code = f'{filename[len(base_dir) + 1:]}:{frame.f_lineno}'
+        frame = frame.f_back
+    return template, code
+
+
+class QueryInspector:
+    """Context manager recording every query run inside it, on all databases"""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        template, code = _origin(sys._getframe(1))
+        self.queries.append(Query(context['connection'].alias, sql, fingerprint(sql), template, code))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=None):
+        """Shapes run at least ``threshold`` times: [(fingerprint, [Query, ...])], worst first"""
+        threshold = threshold or settings.QUERY_REPEAT_THRESHOLD
+        groups = {}
+        for query in self.queries:
+            groups.setdefault(query.fingerprint, []).append(query)
+        return sorted(
+            ((shape, queries) for shape, queries in groups.items() if len(queries) >= threshold),
+            key=lambda group: -len(group[1]),
+        )
+
+    def describe(self, threshold=None):
+        lines = []
+        for shape, queries in self.repeated(threshold):
+            first = queries[0]
+            where = ', '.join(filter(None, [
+                f'template {first.template}' if first.template else None,
+                f'code {first.code}' if first.code else None,
+            ])) or 'unknown origin'
+            lines.append(f'{len(queries)}x {shape[:300]}  ({where})')
+        return '\n'.join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def check(inspector, max_queries=None, repeat_threshold=None):
+    """Problems found by an inspector, as a message, or '' if there are none"""
+    problems = []
+    if max_queries is not None and inspector.count > max_queries:
+        problems.append(f"{inspector.count} queries, budget {max_queries}")
+    if repeat_threshold != 0:
+        repeats = inspector.describe(repeat_threshold)
+        if repeats:
+            problems.append("Repeated queries (likely N+1):\n" + repeats)
+    return '\n'.join(problems)
+
+
+@contextmanager
+def query_budget(max_queries=None, repeat_threshold=None):
+    """Fail if the block runs more than ``max_queries`` queries or has an N+1
+
+    ``repeat_threshold`` defaults to ``QUERY_REPEAT_THRESHOLD``; pass 0 to
+    allow repeated queries.
+    """
+    with QueryInspector() as inspector:
+        yield inspector
+    problems = check(inspector, max_queries, repeat_threshold)
+    if problems:
+        raise QueryBudgetExceeded(problems)
+
+
+class QueryInspectorMiddleware:
+    """Report N+1s and query budget overruns per request (development only)"""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTOR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryInspector() as inspector:
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(inspector.count)
+        problems = check(inspector, settings.QUERY_BUDGETS.get(request.path))
+        if problems:
+            message = f"{request.method} {request.path}: {problems}"
+            if settings.QUERY_INSPECTOR_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,406 @@
+"""
+Related-content recommendations from TF-IDF similarity.
+
+Term counts for projects, awards, legacy blog posts and live blog pages are
+kept in ContentVector. Each object's top-k neighbours are stored in
+RelatedItem, so detail pages fetch recommendations with one indexed query.
+
+Vectors are sparse ``{term: weight}`` dicts and similarities are computed
+through an inverted index (a sparse matrix product in all but name), which
+keeps the work proportional to shared terms rather than corpus size. The
+index is stored too, as ContentPosting rows of normalised TF-IDF weights.
+
+Saves and deletes never recompute anything in the request. Their keys are
+queued and a debounced background job (see portfolio.jobs) applies them
+together: each changed object is weighed against the stored document
+frequencies, scored through the postings of its own terms only, and just
+the neighbour lists it enters, leaves or moves in are rewritten. Weights
+of unchanged objects keep the IDF they were computed with; that drift,
+bulk writes and batches of more than ``INCREMENTAL_LIMIT`` changes are
+handled by a full rebuild, also in the background.
+``manage.py build_related_content`` runs one directly.
+
+A full rebuild computes everything in memory, then replaces the stored rows
+``REBUILD_CHUNK`` objects at a time, each chunk in a short transaction of
+its own. The database's write lock (all of it, on SQLite) is never held for
+the whole rebuild, and a rebuild cut short keeps the chunks it wrote.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Callable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.urls import NoReverseMatch, reverse
+from django.utils.html import strip_tags
+
+from .jobs import DebouncedJob
+from .models import Award, BlogPost, ContentPosting, ContentVector, Project, RelatedItem
+
+TOP_K = 4
+MIN_SCORE = 0.05
+# Queued changes beyond this are cheaper to apply as one full rebuild
+INCREMENTAL_LIMIT = 50
+# Terms per postings query, well under SQLite's bound-parameter limit
+TERMS_PER_QUERY = 500
+REBUILD_CHUNK = 200            # objects written per transaction by a full rebuild
+MAX_TERM_LENGTH = 100
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9]{2,}")
+STOP_WORDS = frozenset("""
+    about after also and are been but can for from has have his her into its more
+    not our over such than that the their them then there these they this those
+    through under was were which while who will with within without would your
+    dr paul mwambu uganda ugandan
+""".split())
+
+
+@dataclass
+class Source:
+    queryset: Callable
+    text: Callable
+    title: Callable
+    url: Callable
+
+
+def _legacy_post_url(post):
+    try:
+        return post.get_absolute_url()
+    except NoReverseMatch:
+        return f"/blog/{post.slug}/"
+
+
+def _sources():
+    from blogcms.models import BlogPage
+
+    return {
+        'portfolio.project': Source(
+            queryset=lambda: Project.objects.all(),
+            text=lambda o: ' '.join([o.title, o.title, o.description, o.detailed_description]),
+            title=lambda o: o.title,
+            url=lambda o: o.get_absolute_url(),
+        ),
+        'portfolio.award': Source(
+            queryset=lambda: Award.objects.all(),
+            text=lambda o: ' '.join([o.name, o.name, o.organization, o.description]),
+            title=lambda o: o.name,
+            url=lambda o: reverse('portfolio:awards'),
+        ),
+        'portfolio.blogpost': Source(
+            queryset=lambda: BlogPost.objects.filter(published=True),
+            text=lambda o: ' '.join([o.title, o.title, o.excerpt, strip_tags(o.body), o.tags]),
+            title=lambda o: o.title,
+            url=_legacy_post_url,
+        ),
+        'blogcms.blogpage': Source(
+            queryset=lambda: BlogPage.objects.live().public().prefetch_related('tags'),
+            text=lambda o: ' '.join(
+                [o.title, o.title, o.intro, strip_tags(o.body)] + [tag.name for tag in o.tags.all()]
+            ),
+            title=lambda o: o.title,
+            url=lambda o: o.url or '',
+        ),
+    }
+
+
+def tokenize(text):
+    return Counter(
+        token for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS and len(token) <= MAX_TERM_LENGTH
+    )
+
+
+def _vector_for(label, source, obj):
+    return ContentVector(
+        source=label,
+        object_id=obj.pk,
+        title=source.title(obj)[:255],
+        url=source.url(obj)[:500],
+        terms=dict(tokenize(source.text(obj))),
+    )
+
+
+def _idf(df, n):
+    return math.log((1 + n) / (1 + df)) + 1
+
+
+def _normalise(terms, idf):
+    weights = {term: (1 + math.log(count)) * idf[term] for term, count in terms.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: w / norm for term, w in weights.items()}
+
+
+def _top(scores):
+    best = heapq.nlargest(TOP_K, scores.items(), key=itemgetter(1))
+    return [(other, score) for other, score in best if score >= MIN_SCORE]
+
+
+class Corpus:
+    """TF-IDF weighted, L2-normalised sparse vectors with an inverted index"""
+
+    def __init__(self, vectors):
+        self.meta = {(v.source, v.object_id): (v.title, v.url) for v in vectors}
+        documents = {(v.source, v.object_id): v.terms for v in vectors}
+
+        df = Counter()
+        for terms in documents.values():
+            df.update(terms.keys())
+        n = len(documents)
+        self.idf = {term: _idf(count, n) for term, count in df.items()}
+
+        self.weights = {key: _normalise(terms, self.idf) for key, terms in documents.items()}
+        self.index = defaultdict(list)
+        for key, weights in self.weights.items():
+            for term, weight in weights.items():
+                self.index[term].append((key, weight))
+
+    def scores(self, key):
+        """Cosine similarity of ``key`` against every document sharing a term"""
+        scores = defaultdict(float)
+        for term, weight in self.weights.get(key, {}).items():
+            for other, other_weight in self.index[term]:
+                if other != key:
+                    scores[other] += weight * other_weight
+        return scores
+
+    def neighbours(self, key):
+        return _top(self.scores(key))
+
+    def postings(self):
+        return [
+            ContentPosting(term=term, source=key[0], object_id=key[1], weight=weight)
+            for key, weights in self.weights.items()
+            for term, weight in weights.items()
+        ]
+
+    def related_items(self, key):
+        return _related_items(key, self.neighbours(key), self.meta)
+
+
+def _related_items(key, neighbours, meta):
+    return [
+        RelatedItem(
+            source=key[0], object_id=key[1], rank=rank,
+            target_source=other[0], target_id=other[1],
+            title=meta[other][0], url=meta[other][1],
+            score=round(score, 4),
+        )
+        for rank, (other, score) in enumerate(neighbours, start=1)
+    ]
+
+
+def rebuild_related_content():
+    """Recompute every vector, posting and neighbour list from the source models"""
+    vectors = [
+        _vector_for(label, source, obj)
+        for label, source in _sources().items()
+        for obj in source.queryset()
+    ]
+    corpus = Corpus(vectors)
+    postings = defaultdict(list)
+    for posting in corpus.postings():
+        postings[(posting.source, posting.object_id)].append(posting)
+
+    items = 0
+    for chunk in _chunks(vectors, REBUILD_CHUNK):
+        keys = [(vector.source, vector.object_id) for vector in chunk]
+        related_items = [item for key in keys for item in corpus.related_items(key)]
+        with transaction.atomic():
+            _delete_rows(keys)
+            ContentVector.objects.bulk_create(chunk, batch_size=500)
+            ContentPosting.objects.bulk_create([p for key in keys for p in postings[key]], batch_size=1000)
+            RelatedItem.objects.bulk_create(related_items, batch_size=1000)
+        items += len(related_items)
+
+    # Rows of objects that no longer exist, or are no longer public
+    stored = set(ContentVector.objects.values_list('source', 'object_id'))
+    stored.update(RelatedItem.objects.values_list('source', 'object_id').distinct())
+    for chunk in _chunks(stored - corpus.weights.keys(), REBUILD_CHUNK):
+        with transaction.atomic():
+            _delete_rows(chunk)
+    return len(vectors), items
+
+
+# --- Incremental updates, read through the stored inverted index ---
+
+def _chunks(items, size=TERMS_PER_QUERY):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _by_source(keys):
+    grouped = defaultdict(list)
+    for source, object_id in keys:
+        grouped[source].append(object_id)
+    for source, object_ids in grouped.items():
+        for chunk in _chunks(object_ids):
+            yield source, chunk
+
+
+def _delete_rows(keys):
+    """Remove the vectors, postings and neighbour lists of ``keys``"""
+    for source, object_ids in _by_source(keys):
+        for model in (ContentVector, ContentPosting, RelatedItem):
+            model.objects.filter(source=source, object_id__in=object_ids).delete()
+
+
+def _weigh(terms):
+    """Normalised TF-IDF weights for a new vector, from the stored document frequencies"""
+    n = ContentVector.objects.count()
+    df = Counter()
+    for chunk in _chunks(terms):
+        df.update(dict(
+            ContentPosting.objects.filter(term__in=chunk)
+            .values_list('term').annotate(documents=Count('id')).values_list('term', 'documents')
+        ))
+    # The new vector is already counted in n but has no postings yet
+    return _normalise(terms, {term: _idf(df[term] + 1, n) for term in terms})
+
+
+def _scores(key, weights):
+    """Similarity of ``weights`` to every other document, from the postings of its terms"""
+    scores = defaultdict(float)
+    for chunk in _chunks(weights):
+        postings = ContentPosting.objects.filter(term__in=chunk).values_list(
+            'term', 'source', 'object_id', 'weight',
+        )
+        for term, source, object_id, weight in postings.iterator():
+            other = (source, object_id)
+            if other != key:
+                scores[other] += weights[term] * weight
+    return scores
+
+
+def _stored_weights(key):
+    return dict(ContentPosting.objects.filter(source=key[0], object_id=key[1]).values_list('term', 'weight'))
+
+
+def _stored_lists(keys):
+    """The current neighbour lists of ``keys``, best first; missing lists are empty"""
+    lists = {key: [] for key in keys}
+    for source, object_ids in _by_source(keys):
+        rows = RelatedItem.objects.filter(source=source, object_id__in=object_ids).values_list(
+            'object_id', 'target_source', 'target_id', 'score',
+        ).order_by('object_id', 'rank')
+        for object_id, target_source, target_id, score in rows:
+            lists[(source, object_id)].append(((target_source, target_id), score))
+    return lists
+
+
+def _write_lists(lists):
+    meta = {}
+    targets = {other for neighbours in lists.values() for other, _score in neighbours}
+    for source, object_ids in _by_source(targets):
+        for object_id, title, url in ContentVector.objects.filter(
+            source=source, object_id__in=object_ids,
+        ).values_list('object_id', 'title', 'url'):
+            meta[(source, object_id)] = (title, url)
+    for source, object_ids in _by_source(lists):
+        RelatedItem.objects.filter(source=source, object_id__in=object_ids).delete()
+    RelatedItem.objects.bulk_create(
+        [item for key, neighbours in lists.items() for item in _related_items(key, neighbours, meta)],
+        batch_size=1000,
+    )
+
+
+def _update_one(sources, label, pk):
+    key = (label, pk)
+    source = sources.get(label)
+    obj = source.queryset().filter(pk=pk).first() if source else None
+
+    _delete_rows([key])
+
+    lists = {}
+    scores = {}
+    if obj is not None:
+        vector = _vector_for(label, source, obj)
+        vector.save()
+        weights = _weigh(vector.terms)
+        scores = _scores(key, weights)
+        ContentPosting.objects.bulk_create(
+            [ContentPosting(term=term, source=label, object_id=pk, weight=w) for term, w in weights.items()],
+            batch_size=1000,
+        )
+        lists[key] = _top(scores)
+
+    # Lists it was in: a score that held or rose only reorders the list,
+    # one that fell (or a removed object) may let another document in
+    pointing = _stored_lists(set(
+        RelatedItem.objects.filter(target_source=label, target_id=pk).values_list('source', 'object_id')
+    ))
+    for other, neighbours in pointing.items():
+        score = scores.get(other, 0.0)
+        if round(score, 4) >= dict(neighbours)[key]:
+            lists[other] = sorted(
+                [(target, score if target == key else s) for target, s in neighbours],
+                key=itemgetter(1), reverse=True,
+            )
+        else:
+            lists[other] = _top(_scores(other, _stored_weights(other)))
+
+    # Lists it now beats the weakest entry of, or that have room for it
+    candidates = {other: score for other, score in scores.items()
+                  if score >= MIN_SCORE and other not in pointing}
+    for other, neighbours in _stored_lists(candidates).items():
+        score = candidates[other]
+        if len(neighbours) < TOP_K or score > neighbours[-1][1]:
+            lists[other] = sorted(neighbours + [(key, score)], key=itemgetter(1), reverse=True)[:TOP_K]
+
+    _write_lists(lists)
+
+
+def update_related_content(keys):
+    """Apply saved or removed objects, as ``(label, pk)`` keys, to the stored lists"""
+    sources = _sources()
+    with transaction.atomic():
+        for label, pk in keys:
+            _update_one(sources, label, pk)
+
+
+# Changes queued since the last background run: object keys, or a full rebuild
+_pending = set()
+_pending_rebuild = False
+_pending_lock = threading.Lock()
+
+
+def _apply_pending():
+    global _pending, _pending_rebuild
+    with _pending_lock:
+        keys, rebuild = _pending, _pending_rebuild
+        _pending, _pending_rebuild = set(), False
+    if rebuild or len(keys) > INCREMENTAL_LIMIT:
+        rebuild_related_content()
+    elif keys:
+        update_related_content(sorted(keys))
+
+
+_update_job = DebouncedJob('related content', _apply_pending, lambda: settings.RELATED_CONTENT_DELAY)
+
+
+def schedule_update(label, pk):
+    """Queue one saved or deleted object for the next background update"""
+    with _pending_lock:
+        _pending.add((label, pk))
+    _update_job.schedule()
+
+
+def schedule_rebuild():
+    """Queue a full rebuild, which also absorbs any queued object updates"""
+    global _pending_rebuild
+    with _pending_lock:
+        _pending_rebuild = True
+    _update_job.schedule()
+
+
+def related_for(obj, limit=TOP_K):
+    """Stored recommendations for an object: a single indexed query"""
+    return list(RelatedItem.objects.filter(
+        source=obj._meta.label_lower, object_id=obj.pk,
+    )[:limit])
@@ -0,0 +1,147 @@
+"""
+Read-replica routing.
+
+``ReplicaRoutingMiddleware`` decides per request whether reads may use a
+replica: only safe (GET/HEAD) requests outside the admin and Wagtail admin,
+from visitors who are not staff and have not written anything recently.
+``ReplicaRouter`` then sends those reads to a replica whose replication lag
+is acceptable, and everything else, including every write, to ``default``.
+
+After a write the response sets a short-lived cookie that pins the visitor
+to the primary, so editors always read their own changes even though the
+replicas may still be catching up.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary_until'
+PRIMARY_ONLY_PATHS = ('/admin/', '/cms/', '/documents/')
+LAG_CHECK_INTERVAL = 5.0
+
+# Per-request routing state; None outside requests (commands, threads)
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class _RequestState:
+    __slots__ = ('use_replica', 'wrote', 'replica')
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+        self.replica = None  # chosen once, so a request reads one snapshot
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+_lag_cache = {}
+
+
+def replica_lag(alias):
+    """Replication lag in seconds, checked at most every few seconds per process
+
+    Only Postgres replicas report lag; others count as up to date. A replica
+    that has replayed everything it received is up to date however old its
+    last replayed transaction is: the primary may simply have had no writes.
+    A replica that cannot be queried reports infinite lag and is skipped.
+    """
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < LAG_CHECK_INTERVAL:
+        return cached[1]
+    lag = 0.0
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+                    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )
+                lag = float(cursor.fetchone()[0])
+        except Exception:
+            logger.warning("Could not check replication lag of %s", alias, exc_info=True)
+            lag = float('inf')
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+class ReplicaRouter:
+    """Send eligible reads to a healthy replica and all writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY  # reads inside a transaction must see its writes
+        if state.replica is None:
+            healthy = [
+                alias for alias in replica_aliases()
+                if replica_lag(alias) <= settings.REPLICA_MAX_LAG
+            ]
+            state.replica = random.choice(healthy) if healthy else PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # every alias holds the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """Mark replica-safe requests and pin recent writers to the primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState()
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        wrote = state.wrote or request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if wrote and replica_aliases():
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE, str(int(time.time() + sticky)),
+                max_age=sticky, httponly=True, samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _request_state.get()
+        if state is None or not replica_aliases():
+            return None
+        state.use_replica = (
+            request.method in ('GET', 'HEAD')
+            and not request.path.startswith(PRIMARY_ONLY_PATHS)
+            and not self._pinned(request)
+            and not getattr(request.user, 'is_staff', False)
+        )
+        return None
+
+    def _pinned(self, request):
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import (
-    Bio, Project, Award, GalleryImage, BlogPost, 
+    Bio, Project, Award, GalleryImage, BlogPost, BlogTag,
     Testimonial, Message, SiteSettings
 )
 
@@ -32,7 +32,13 @@ class GalleryImageSerializer(serializers.ModelSerializer):
 class BlogPostSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlogPost
-        fields = '__all__'
+        exclude = ['tag_index']
+
+
+class BlogTagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BlogTag
+        fields = ['name', 'slug', 'post_count']
 
 
 class TestimonialSerializer(serializers.ModelSerializer):
@@ -0,0 +1,147 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from wagtail.models import Page
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from blogcms.models import BlogPage
+
+from . import changes, gallery, invalidation, profiling, related, sitemaps
+from .models import (
+    Award, Bio, BlogPost, BlogTag, ChangeLogEntry, GalleryImage, ProfileReport,
+    Project, SiteSettings, Testimonial,
+)
+
+# Sent once after a bulk write (import, bulk_create/bulk_update) that
+# bypassed per-row signals. Provides args: sender (the model class).
+bulk_content_changed = Signal()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Award)
+@receiver(post_delete, sender=Award)
+@receiver(post_save, sender=GalleryImage)
+@receiver(post_delete, sender=GalleryImage)
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+@receiver(post_delete, sender=Page)
+@receiver(bulk_content_changed)
+def schedule_sitemap_rebuild(sender, **kwargs):
+    """Rebuild the stored sitemaps in the background once the change commits"""
+    transaction.on_commit(sitemaps.schedule_rebuild)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Award)
+@receiver(post_delete, sender=Award)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(page_published, sender=BlogPage)
+@receiver(page_unpublished, sender=BlogPage)
+@receiver(post_delete, sender=BlogPage)
+def update_related_content(sender, instance, **kwargs):
+    """Queue this object for the background related-content update once it commits"""
+    label, pk = instance._meta.label_lower, instance.pk
+    transaction.on_commit(lambda: related.schedule_update(label, pk))
+
+
+@receiver(bulk_content_changed)
+def rebuild_related_content(sender, **kwargs):
+    """Bulk writes shift term weights everywhere; recompute from scratch in the background"""
+    if sender in (Project, Award, BlogPost):
+        transaction.on_commit(related.schedule_rebuild)
+
+
+@receiver(post_save, sender=Bio)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Award)
+@receiver(post_save, sender=GalleryImage)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_save, sender=SiteSettings)
+def log_saved(sender, instance, created, raw=False, **kwargs):
+    """Move a saved object to the head of the change feed"""
+    if not raw:
+        action = ChangeLogEntry.CREATED if created else ChangeLogEntry.UPDATED
+        changes.record_changes(sender, [instance.pk], action)
+
+
+@receiver(post_delete, sender=Bio)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Award)
+@receiver(post_delete, sender=GalleryImage)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Testimonial)
+@receiver(post_delete, sender=SiteSettings)
+def log_deleted(sender, instance, **kwargs):
+    """Leave a tombstone so syncing clients drop the object"""
+    changes.record_changes(sender, [instance.pk], ChangeLogEntry.DELETED)
+
+
+@receiver(page_published, sender=BlogPage)
+def log_page_published(sender, instance, **kwargs):
+    """Publishing creates or updates the page for syncing clients"""
+    changes.record_changes(BlogPage, [instance.pk], ChangeLogEntry.UPDATED)
+
+
+@receiver(page_unpublished, sender=BlogPage)
+@receiver(post_delete, sender=BlogPage)
+def log_page_removed(sender, instance, **kwargs):
+    """Unpublished and deleted pages are tombstoned alike"""
+    changes.record_changes(BlogPage, [instance.pk], ChangeLogEntry.DELETED)
+
+
+@receiver(post_save, sender=Bio)
+@receiver(post_delete, sender=Bio)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Award)
+@receiver(post_delete, sender=Award)
+@receiver(post_save, sender=GalleryImage)
+@receiver(post_delete, sender=GalleryImage)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+@receiver(post_save, sender=BlogPage)
+@receiver(post_delete, sender=BlogPage)
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+@receiver(bulk_content_changed)
+def bump_cache_generation(sender, **kwargs):
+    """Invalidate in-process caches in every worker once the change commits"""
+    transaction.on_commit(lambda: invalidation.bump(sender))
+
+
+@receiver(pre_delete, sender=BlogPost)
+def release_blog_tag_counts(sender, instance, **kwargs):
+    """A deleted published post stops counting towards its tags"""
+    if instance.published:
+        BlogTag.adjust_counts(list(instance.tag_links.values_list('tag_id', flat=True)), -1)
+
+
+@receiver(post_delete, sender=ProfileReport)
+def remove_profile_files(sender, instance, **kwargs):
+    """Delete the report files along with their row"""
+    key = instance.key
+    transaction.on_commit(lambda: profiling.remove_report_files(key))
+
+
+@receiver(post_save, sender=GalleryImage)
+def schedule_thumbnail(sender, instance, raw=False, **kwargs):
+    """Thumbnail a new or replaced image once it commits"""
+    if not raw and gallery.needs_thumbnail(instance):
+        transaction.on_commit(lambda: gallery.update_thumbnail(instance))
+
+
+@receiver(post_delete, sender=GalleryImage)
+def remove_thumbnail(sender, instance, **kwargs):
+    """The thumbnail is derived data; it goes with its row"""
+    name = instance.thumbnail.name
+    if name:
+        transaction.on_commit(lambda: instance.thumbnail.storage.delete(name))
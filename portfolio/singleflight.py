@@ -0,0 +1,215 @@
+"""
+Single-flight coalescing of expensive computations.
+
+When a cached value expires under load, every request that misses it would
+recompute the same queries at once. ``do(key, compute)`` lets one caller
+per key compute while the others wait for its result:
+
+* Within a process, waiting threads are handed the leader's result.
+* Across workers, the leader holds an advisory lock for the key: a
+  ``pg_advisory_lock`` on Postgres, an ``flock`` on a lock file elsewhere.
+  Workers that find the lock taken wait for it and then call ``recheck()``,
+  which should look in the shared cache the leader has just filled.
+
+Waiting is bounded by ``SINGLE_FLIGHT_TIMEOUT``. A caller that waits longer,
+or whose leader failed, computes the value itself, so a stuck leader costs
+performance, never availability.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_STRIPES = 256  # lock files used without Postgres; collisions only cost a recheck
+POLL_INTERVAL = (0.01, 0.2)  # first and longest sleep while polling a lock
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'failed')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def _lock_id(key):
+    """Signed 64-bit id for ``pg_advisory_lock``"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def _poll(try_acquire, wait):
+    deadline = time.monotonic() + wait
+    delay = POLL_INTERVAL[0]
+    while True:
+        if try_acquire():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, POLL_INTERVAL[1])
+
+
+@contextmanager
+def _postgres_lock(key, wait):
+    connection = connections['default']
+    lock_id = _lock_id(key)
+
+    def try_acquire():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+            return cursor.fetchone()[0]
+
+    try:
+        acquired = _poll(try_acquire, wait)
+    except DatabaseError:
+        logger.warning("Advisory lock for %s unavailable", key, exc_info=True)
+        yield True
+        return
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+
+def _lock_dir():
+    name = f'singleflight-{zlib.crc32(str(settings.BASE_DIR).encode()):08x}'
+    return Path(tempfile.gettempdir()) / name
+
+
+@contextmanager
+def _file_lock(key, wait):
+    directory = _lock_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stripe = zlib.crc32(key.encode()) % LOCK_STRIPES
+    fd = os.open(directory / f'{stripe:03d}.lock', os.O_RDWR | os.O_CREAT, 0o600)
+
+    def try_acquire():
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    try:
+        acquired = _poll(try_acquire, wait)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _no_lock(key, wait):
+    yield True
+
+
+def advisory_lock(key, wait=0):
+    """Cross-worker lock for ``key``, as a context manager yielding whether it was acquired
+
+    Waits up to ``wait`` seconds. Where no lock is available (no ``fcntl``,
+    database error) it yields True: callers then go ahead as they would
+    without coordination.
+    """
+    if connections['default'].vendor == 'postgresql':
+        return _postgres_lock(key, wait)
+    if fcntl is not None:
+        return _file_lock(key, wait)
+    return _no_lock(key, wait)
+
+
+def _lead(key, compute, recheck, shared, timeout):
+    if not shared:
+        return compute()
+    # Uncontended: go straight ahead, the caller has already missed its cache
+    with advisory_lock(key) as acquired:
+        if acquired:
+            return compute()
+    with advisory_lock(key, wait=timeout):
+        # Whether or not we got the lock, the other worker may be done by now
+        if recheck is not None:
+            value = recheck()
+            if value is not None:
+                return value
+        return compute()
+
+
+def do(key, compute, recheck=None, shared=True, timeout=None):
+    """Return ``compute()``, computing it once per key at a time
+
+    ``recheck`` is called instead when another worker held the key, and
+    should return the value it stored, or None if there is none. With
+    ``shared=False`` calls are only coalesced within this process.
+    """
+    if timeout is None:
+        timeout = settings.SINGLE_FLIGHT_TIMEOUT
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if call.done.wait(timeout) and not call.failed:
+            return call.result
+        return compute()  # leader failed or is stuck: don't fail with it
+
+    try:
+        call.result = _lead(key, compute, recheck, shared, timeout)
+        return call.result
+    except BaseException:
+        call.failed = True
+        raise
+    finally:
+        with _calls_lock:
+            del _calls[key]
+        call.done.set()
+
+
+def single_flight(key, recheck=None, shared=True, timeout=None):
+    """Decorator form of ``do``; ``key`` and ``recheck`` take the call's arguments
+
+    Usage::
+
+        @single_flight(lambda slug: f'chart:{slug}', recheck=lambda slug: cache.get(f'chart:{slug}'))
+        def build_chart(slug):
+            ...
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            return do(
+                key(*args, **kwargs),
+                lambda: func(*args, **kwargs),
+                recheck=(lambda: recheck(*args, **kwargs)) if recheck else None,
+                shared=shared,
+                timeout=timeout,
+            )
+        return wrapped
+    return decorator
@@ -0,0 +1,191 @@
+"""
+Chunked XML sitemaps, rendered ahead of time and stored in SitemapFile.
+
+Crawlers are served the stored XML. Content changes schedule a debounced
+rebuild on a background thread (portfolio.jobs), so a burst of admin saves
+costs one render, and writes from management commands are rebuilt before
+the command exits.
+"""
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import SitemapIndexItem
+from django.db import transaction
+from django.db.models import Max
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve, reverse
+from wagtail.models import Page
+from wagtail.views import serve as wagtail_serve
+
+from .jobs import DebouncedJob
+from .models import Award, GalleryImage, Project, SitemapFile
+
+INDEX_SECTION = 'index'
+
+
+class ChunkedSitemap(Sitemap):
+    limit = settings.SITEMAP_CHUNK_SIZE
+
+
+class StaticViewSitemap(ChunkedSitemap):
+    """Top-level portfolio pages"""
+    changefreq = 'weekly'
+
+    def items(self):
+        return ['portfolio:home', 'portfolio:about', 'portfolio:projects',
+                'portfolio:testimonials', 'portfolio:contact']
+
+    def location(self, item):
+        return reverse(item)
+
+
+class ProjectSitemap(ChunkedSitemap):
+    changefreq = 'monthly'
+
+    def items(self):
+        return Project.objects.only('pk', 'updated_at').order_by('pk')
+
+    def lastmod(self, obj):
+        return obj.updated_at
+
+
+class AwardSitemap(ChunkedSitemap):
+    """Awards have no detail pages; the listing changes whenever one does"""
+    changefreq = 'monthly'
+
+    def items(self):
+        return [Award.objects.aggregate(lastmod=Max('updated_at'))['lastmod']]
+
+    def location(self, item):
+        return reverse('portfolio:awards')
+
+    def lastmod(self, item):
+        return item
+
+
+class GallerySitemap(ChunkedSitemap):
+    """The gallery listing plus one entry per non-empty category"""
+    changefreq = 'weekly'
+
+    def items(self):
+        per_category = list(
+            GalleryImage.objects.order_by()
+            .values('category')
+            .annotate(lastmod=Max('created_at'))
+            .order_by('category')
+        )
+        overall = max((row['lastmod'] for row in per_category), default=None)
+        return [{'category': '', 'lastmod': overall}] + per_category
+
+    def location(self, item):
+        url = reverse('portfolio:gallery')
+        if item['category']:
+            url += f"?category={item['category']}"
+        return url
+
+    def lastmod(self, item):
+        return item['lastmod']
+
+
+class WagtailPageSitemap(ChunkedSitemap):
+    """Live, public Wagtail pages that are actually routed to Wagtail"""
+    changefreq = 'weekly'
+
+    def items(self):
+        pages = (
+            Page.objects.live().public()
+            .filter(depth__gt=1)
+            .only('id', 'path', 'url_path', 'last_published_at')
+            .order_by('path')
+        )
+        items = []
+        for page in pages:
+            parts = page.get_url_parts()
+            if parts is None:
+                continue
+            path = parts[2]
+            # Portfolio routes are matched first and shadow some page URLs
+            try:
+                if resolve(path).func is not wagtail_serve:
+                    continue
+            except Resolver404:
+                continue
+            items.append((path, page.last_published_at))
+        return items
+
+    def location(self, item):
+        return item[0]
+
+    def lastmod(self, item):
+        return item[1]
+
+
+SITEMAPS = {
+    'pages': StaticViewSitemap,
+    'projects': ProjectSitemap,
+    'awards': AwardSitemap,
+    'gallery': GallerySitemap,
+    'cms': WagtailPageSitemap,
+}
+
+
+def render_sitemaps():
+    """Render every sitemap chunk and the index as unsaved SitemapFile rows"""
+    parts = urlsplit(settings.BASE_URL)
+    protocol, site = parts.scheme, SimpleNamespace(domain=parts.netloc)
+
+    files = []
+    index = []
+    for section, sitemap_class in SITEMAPS.items():
+        sitemap = sitemap_class()
+        for page in sitemap.paginator.page_range:
+            urls = sitemap.get_urls(page=page, site=site, protocol=protocol)
+            lastmod = max((url['lastmod'] for url in urls if url['lastmod']), default=None)
+            files.append(SitemapFile(
+                section=section,
+                page=page,
+                content=render_to_string('sitemap.xml', {'urlset': urls}),
+                lastmod=lastmod,
+            ))
+            location = reverse('portfolio:sitemap_section', kwargs={'section': section, 'page': page})
+            index.append(SitemapIndexItem(f"{protocol}://{site.domain}{location}", lastmod))
+
+    files.append(SitemapFile(
+        section=INDEX_SECTION,
+        page=1,
+        content=render_to_string('sitemap_index.xml', {'sitemaps': index}),
+        lastmod=max((item.last_mod for item in index if item.last_mod), default=None),
+    ))
+    return files
+
+
+def rebuild_sitemaps():
+    """Re-render all sitemaps and swap them in with one short transaction"""
+    files = render_sitemaps()
+    with transaction.atomic():
+        SitemapFile.objects.all().delete()
+        SitemapFile.objects.bulk_create(files)
+    return files
+
+
+def get_sitemap_file(section, page=1):
+    """Return a stored sitemap chunk, building everything on first use"""
+    try:
+        return SitemapFile.objects.get(section=section, page=page)
+    except SitemapFile.DoesNotExist:
+        if SitemapFile.objects.exists():
+            raise
+    rebuild_sitemaps()
+    return SitemapFile.objects.get(section=section, page=page)
+
+
+# Debounces content changes into one background rebuild; a rebuild still
+# pending when a management command exits runs before it does
+_rebuild_job = DebouncedJob('sitemaps', rebuild_sitemaps, lambda: settings.SITEMAP_REBUILD_DELAY)
+
+
+def schedule_rebuild():
+    """Debounce content changes into a single background sitemap rebuild"""
+    _rebuild_job.schedule()
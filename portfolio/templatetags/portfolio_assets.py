@@ -0,0 +1,61 @@
+from django import template
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from portfolio import assets, offline
+
+register = template.Library()
+
+
+def _async_stylesheet(url):
+    return format_html(
+        '<link rel="preload" href="{0}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        '<noscript><link rel="stylesheet" href="{0}"></noscript>',
+        url,
+    )
+
+
+@register.simple_tag(takes_context=True)
+def critical_css(context):
+    """Inline the critical rules of output.css for the page being rendered"""
+    css = assets.critical_css(context.template)
+    return format_html('<style>{}</style>', mark_safe(css.replace('</', '<\\/')))
+
+
+@register.simple_tag
+def async_stylesheet(path):
+    """Load a static stylesheet without blocking the first paint"""
+    return _async_stylesheet(static(path))
+
+
+@register.simple_tag
+def vendor_stylesheet(name):
+    """Load a vendored stylesheet asynchronously, from the CDN until vendored"""
+    links = _async_stylesheet(assets.asset_url(name))
+    if assets.is_vendored(name):
+        return links
+    origins = assets.VENDOR_ASSETS[name].origins
+    preconnects = format_html_join(
+        '', '<link rel="preconnect" href="{}"{}>',
+        ((origin, ' crossorigin' if cors else '') for origin, cors in origins),
+    )
+    return preconnects + links
+
+
+@register.simple_tag
+def vendor_script(name):
+    """Script tag for a vendored script, from the CDN until vendored"""
+    return format_html('<script src="{}"></script>', assets.asset_url(name))
+
+
+@register.simple_tag
+def offline_support():
+    """Web app manifest, theme colour and the service worker for main.js to register"""
+    tags = format_html(
+        '<link rel="manifest" href="{}"><meta name="theme-color" content="{}">',
+        reverse('portfolio:web_manifest'), offline.THEME_COLOR,
+    )
+    # Still registered when disabled: that worker removes the installed one
+    return tags + format_html('<meta name="service-worker" content="{}">', reverse('portfolio:service_worker'))
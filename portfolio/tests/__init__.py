@@ -0,0 +1,5 @@
+from django.test import override_settings
+
+# Tests run with DEBUG off and no collectstatic manifest, so pages that link
+# static files are rendered with plain, unhashed static URLs
+plain_static = override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
@@ -0,0 +1,137 @@
+import datetime
+
+from django.db import transaction
+from django.test import TestCase
+
+from portfolio import changes
+from portfolio.changes import changes_since, current_cursor
+from portfolio.models import BlogPost, ChangeLogEntry, Project
+
+
+def make_project(title):
+    return Project.objects.create(title=title, description=title, start_date=datetime.date(2020, 1, 1))
+
+
+class ChangeFeedTests(TestCase):
+    def sync(self, cursor, limit=200):
+        page = changes_since(cursor, limit)
+        return [(c['model'], c['id'], c['action']) for c in page['changes']], page
+
+    def test_cursor_returns_only_later_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = make_project("First")
+        cursor = current_cursor()
+        with self.captureOnCommitCallbacks(execute=True):
+            second = make_project("Second")
+            first.title = "First, renamed"
+            first.save()
+
+        changes, page = self.sync(cursor)
+
+        self.assertEqual(changes, [
+            ('portfolio.project', second.pk, 'created'),
+            ('portfolio.project', first.pk, 'updated'),
+        ])
+        self.assertEqual(page['changes'][1]['data']['title'], "First, renamed")
+        self.assertEqual(self.sync(page['cursor'])[0], [])
+
+    def test_pages_follow_the_cursor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            projects = [make_project(f"Project {i}") for i in range(5)]
+
+        seen, cursor, has_more = [], 0, True
+        while has_more:
+            changes, page = self.sync(cursor, limit=2)
+            seen.extend(pk for _model, pk, _action in changes)
+            cursor, has_more = page['cursor'], page['has_more']
+
+        self.assertEqual(seen, [project.pk for project in projects])
+
+    def test_deleted_and_unpublished_objects_are_tombstones(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = make_project("Gone")
+            post = BlogPost.objects.create(title="Hidden", slug="hidden", body="Body", published=True)
+        cursor = current_cursor()
+        pk = project.pk
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.delete()
+            post.published = False
+            post.save()
+
+        changes, page = self.sync(cursor)
+        self.assertEqual(changes, [
+            ('portfolio.project', pk, 'deleted'),
+            ('portfolio.blogpost', post.pk, 'deleted'),
+        ])
+        self.assertNotIn('data', page['changes'][0])
+
+    def test_entries_are_written_after_the_change_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                project = make_project("Pending")
+                self.assertFalse(ChangeLogEntry.objects.exists())
+        self.assertTrue(ChangeLogEntry.objects.filter(object_id=project.pk).exists())
+
+    def test_rolled_back_changes_are_never_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    make_project("Rolled back")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+
+    def test_one_transaction_is_logged_by_one_write(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            projects = [make_project(f"Project {i}") for i in range(3)]
+            projects[0].delete()
+
+        writes = [c for c in callbacks if getattr(c, '__func__', None) is changes._Batch.write]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(
+            list(ChangeLogEntry.objects.order_by('id').values_list('action', flat=True)),
+            ['created', 'created', 'deleted'],
+        )
+
+    def test_changes_in_a_rolled_back_savepoint_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                kept = make_project("Kept")
+                try:
+                    with transaction.atomic():
+                        make_project("Rolled back")
+                        kept.title = "Kept, renamed"
+                        kept.save()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        self.assertEqual(
+            list(ChangeLogEntry.objects.values_list('object_id', 'action')), [(kept.pk, 'created')]
+        )
+
+    def test_a_changed_object_moves_past_every_other_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = make_project("First"), make_project("Second")
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+
+        entries = list(ChangeLogEntry.objects.values_list('object_id', 'position'))
+        self.assertEqual([pk for pk, _position in entries], [second.pk, first.pk])
+        self.assertEqual(current_cursor(), entries[-1][1])
+
+    def test_changes_after_a_rolled_back_savepoint_are_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        make_project("Rolled back")
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                kept = make_project("Kept")
+
+        self.assertEqual(list(ChangeLogEntry.objects.values_list('object_id', flat=True)), [kept.pk])
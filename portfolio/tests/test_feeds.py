@@ -0,0 +1,26 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from blogcms import feeds
+from portfolio.models import BlogPost
+
+
+class FeedRebuildTests(TestCase):
+    def save(self, post):
+        with mock.patch.object(feeds._rebuild_job, 'schedule') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                post.save()
+        return schedule.call_count
+
+    def test_only_published_changes_rebuild_the_feeds(self):
+        post = BlogPost(title="Draft", slug="draft", body="Body", excerpt="Excerpt")
+        self.assertEqual(self.save(post), 0)
+        post.body = "Edited draft"
+        self.assertEqual(self.save(post), 0)
+
+        post.published = True
+        self.assertEqual(self.save(post), 1)
+        post.published = False
+        self.assertEqual(self.save(post), 1)  # unpublishing drops it from the feeds
+        self.assertEqual(self.save(post), 0)
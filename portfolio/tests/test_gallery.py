@@ -0,0 +1,85 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from portfolio import gallery, invalidation
+from portfolio.models import GalleryImage
+
+
+def make_image(day, category='general', image=None):
+    if image is None:
+        image = f'gallery/{category}-{day}-{GalleryImage.objects.count()}.jpg'
+    return GalleryImage.objects.create(
+        image=image, caption=f'{category} {day}', category=category, date=datetime.date(2024, 1, day),
+    )
+
+
+@override_settings(GALLERY_PAGE_SIZE=2)
+class GalleryFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Ties on date are broken by id, newest first
+        self.images = [
+            make_image(5), make_image(3), make_image(3, 'events'),
+            make_image(3), make_image(1, 'events'),
+        ]
+        make_image(9, image='')  # no file: never listed
+
+    def walk(self, category=''):
+        ids, cursor = [], None
+        while True:
+            page = gallery.feed_page(category, cursor)
+            self.assertLessEqual(len(page['images']), 2)
+            ids.extend(image['id'] for image in page['images'])
+            cursor = page['next']
+            if cursor is None:
+                return ids
+
+    def expected(self, images):
+        return [image.pk for image in sorted(images, key=lambda i: (i.date, i.pk), reverse=True)]
+
+    def test_cursor_walks_every_image_once_newest_first(self):
+        self.assertEqual(self.walk(), self.expected(self.images))
+
+    def test_category_pages(self):
+        events = [image for image in self.images if image.category == 'events']
+        self.assertEqual(self.walk('events'), self.expected(events))
+
+    def test_pages_do_not_shift_when_images_are_added(self):
+        first = gallery.feed_page()
+        make_image(20)
+        invalidation.bump(GalleryImage)
+
+        second = gallery.feed_page('', first['next'])
+
+        ids = [image['id'] for image in first['images'] + second['images']]
+        self.assertEqual(ids, self.expected(self.images)[:4])
+
+    def test_cached_pages_expire_with_the_gallery_generation(self):
+        gallery.feed_page()
+        newest = make_image(28)
+        self.assertNotIn(newest.pk, [image['id'] for image in gallery.feed_page()['images']])
+
+        invalidation.bump(GalleryImage)
+
+        self.assertEqual(gallery.feed_page()['images'][0]['id'], newest.pk)
+
+    def test_cursor_round_trip_and_invalid_cursors(self):
+        image = self.images[1]
+        self.assertEqual(gallery.decode_cursor(gallery.encode_cursor(image)), (image.date, image.pk))
+        for cursor in ('not-a-cursor', 'MjAyNC0wMS0wMw', '!!'):
+            with self.assertRaises(ValueError):
+                gallery.feed_page('', cursor)
+
+    def test_feed_endpoint(self):
+        response = self.client.get('/gallery/feed/')
+        data = response.json()
+        self.assertEqual(len(data['images']), 2)
+        self.assertTrue(data['next'].startswith('/gallery/feed/?'))
+
+        rest = self.client.get(data['next']).json()
+        self.assertEqual(rest['images'][0]['id'], self.expected(self.images)[2])
+
+        self.assertEqual(self.client.get('/gallery/feed/?cursor=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/gallery/feed/?category=nope').status_code, 400)
@@ -0,0 +1,70 @@
+import datetime
+import io
+import os
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from portfolio import gallery_upload
+from portfolio.models import GalleryImage
+
+
+def png(size=(40, 30)):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'green').save(output, 'PNG')
+    return output.getvalue()
+
+
+def archive(**members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    output.seek(0)
+    return output
+
+
+class GalleryUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def stored_files(self):
+        return [name for _root, _dirs, names in os.walk(self.media) for name in names]
+
+    def upload(self, **members):
+        return gallery_upload.upload_zip(
+            archive(**members), category='general', date=datetime.date(2024, 1, 1), max_workers=1,
+        )
+
+    def test_images_are_processed_in_spawned_workers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.upload(**{'field_day.png': png(), 'notes.txt': b'text'})
+
+        self.assertEqual([image.caption for image in result.created], ['Field day'])
+        self.assertEqual(result.skipped, [('notes.txt', 'not an image file')])
+        self.assertEqual(GalleryImage.objects.get().thumbnail_width, 40)
+
+    def test_stored_files_are_deleted_when_the_insert_fails(self):
+        with mock.patch.object(GalleryImage.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.upload(**{'a.png': png(), 'b.png': png()})
+
+        self.assertEqual(self.stored_files(), [])
+
+    def test_members_are_read_no_further_than_the_size_limit(self):
+        with mock.patch.object(gallery_upload, 'MAX_MEMBER_SIZE', 10):
+            with zipfile.ZipFile(archive(**{'big.png': png()})) as zip_file:
+                self.assertIsNone(gallery_upload._read_member(zip_file, zip_file.infolist()[0]))
+
+    def test_images_with_too_many_pixels_are_refused_before_decoding(self):
+        with self.assertRaises(Image.DecompressionBombError):
+            gallery_upload.process_image(png((100, 100)), max_pixels=9999)
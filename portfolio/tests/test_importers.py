@@ -0,0 +1,66 @@
+import io
+
+from django.test import TestCase
+
+from portfolio.importers import BulkImporter, read_rows
+from portfolio.models import Award, ChangeLogEntry, Project
+
+
+def award_rows(*rows):
+    return [
+        {'name': name, 'organization': organization, 'date': '2021-05-01',
+         'description': description, 'category': 'research'}
+        for name, organization, description in rows
+    ]
+
+
+class BulkImportTests(TestCase):
+    def test_reimport_updates_by_natural_key(self):
+        BulkImporter('award').run(award_rows(
+            ('Best Researcher', 'Makerere University', 'First'),
+            ('Best Researcher', 'NARO', 'Second'),
+        ))
+
+        result = BulkImporter('award').run(award_rows(
+            ('Best Researcher', 'NARO', 'Second, revised'),
+            ('Best Researcher', 'Makerere University', 'First'),
+            ('Best Researcher', 'FAO', 'Third'),
+        ))
+
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual(
+            dict(Award.objects.values_list('organization', 'description')),
+            {'Makerere University': 'First', 'NARO': 'Second, revised', 'FAO': 'Third'},
+        )
+
+    def test_batches_smaller_than_the_file(self):
+        rows = award_rows(*[(f'Award {i}', 'NARO', 'Old') for i in range(7)])
+        BulkImporter('award', batch_size=3).run(rows)
+
+        rows = award_rows(*[(f'Award {i}', 'NARO', 'New') for i in range(7)])
+        result = BulkImporter('award', batch_size=3).run(rows)
+
+        self.assertEqual((result.created, result.updated), (0, 7))
+        self.assertEqual(set(Award.objects.values_list('description', flat=True)), {'New'})
+
+    def test_dry_run_validates_without_writing(self):
+        stream = io.StringIO(
+            "title,description,start_date,status\n"
+            "Seed systems,Clean seed for farmers,2022-01-01,ongoing\n"
+            "Broken,No start date,,ongoing\n"
+        )
+
+        result = BulkImporter('project', dry_run=True).run(read_rows(stream, 'csv'))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, _errors in result.errors], [2])
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(ChangeLogEntry.objects.filter(source='portfolio.project').exists())
+
+    def test_unchanged_rows_are_skipped(self):
+        rows = award_rows(('Best Researcher', 'NARO', 'Same'))
+        BulkImporter('award').run([dict(row) for row in rows])
+
+        result = BulkImporter('award').run([dict(row) for row in rows])
+
+        self.assertEqual(result.total, 0)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from portfolio.jobs import DebouncedJob
+
+
+class DebouncedJobTests(SimpleTestCase):
+    def setUp(self):
+        self.runs = 0
+        self.ran = threading.Event()
+
+    def job(self, delay):
+        def func():
+            self.runs += 1
+            self.ran.set()
+        return DebouncedJob('test', func, delay)
+
+    def test_a_burst_runs_once_on_one_thread(self):
+        job = self.job(0.05)
+        for _ in range(100):
+            job.schedule()
+        waiter = job._timer
+
+        self.assertTrue(self.ran.wait(5))
+        waiter.join(5)
+        self.assertEqual(self.runs, 1)
+        self.assertIs(job._timer, waiter)
+
+    def test_flush_runs_a_pending_job_without_waiting(self):
+        job = self.job(60)
+        job.schedule()
+
+        started = time.monotonic()
+        job.flush()
+
+        self.assertEqual(self.runs, 1)
+        self.assertLess(time.monotonic() - started, 5)
+        job.flush()
+        self.assertEqual(self.runs, 1)
+
+    def test_zero_delay_runs_inline(self):
+        self.job(0).schedule()
+        self.assertEqual(self.runs, 1)
+
+    def test_runs_never_overlap_and_a_trigger_mid_run_runs_after(self):
+        release = threading.Event()
+        active = []
+        overlaps = []
+        done = threading.Semaphore(0)
+
+        def func():
+            overlaps.append(len(active))
+            active.append(1)
+            release.wait(5)
+            active.pop()
+            done.release()
+
+        job = DebouncedJob('test', func, 0.02)
+        job.schedule()
+        time.sleep(0.1)  # the first run is now blocked in func
+        job.schedule()
+        time.sleep(0.1)  # the second deadline passes while it still runs
+        self.assertEqual(overlaps, [0])
+
+        release.set()
+        self.assertTrue(done.acquire(timeout=5))
+        self.assertTrue(done.acquire(timeout=5))
+        self.assertEqual(overlaps, [0, 0])
+
+    def test_flush_waits_for_a_running_job(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def func():
+            started.set()
+            release.wait(5)
+            self.runs += 1
+
+        job = DebouncedJob('test', func, 0.01)
+        job.schedule()
+        self.assertTrue(started.wait(5))
+        threading.Timer(0.1, release.set).start()
+        job.flush()
+        self.assertEqual(self.runs, 1)
@@ -0,0 +1,71 @@
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from portfolio.models import Message
+
+
+class ArchiveRestoreTests(TestCase):
+    def setUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.old = timezone.now() - timedelta(days=400)
+        for i in range(3):
+            message = Message.objects.create(
+                name=f"Sender {i}", email=f"sender{i}@example.com",
+                subject=f"Subject {i}", message=f"Body {i}",
+            )
+            Message.objects.filter(pk=message.pk).update(sent_at=self.old + timedelta(hours=i))
+        self.recent = Message.objects.create(
+            name="Recent", email="recent@example.com", subject="Recent", message="Still here",
+        )
+
+    def archive(self, *args):
+        call_command("archive_messages", "--days", "365", "--output-dir", str(self.output_dir),
+                     *args, stdout=StringIO())
+        [path] = self.output_dir.glob("messages-*.ndjson.gz")
+        return path
+
+    def restore(self, path):
+        out = StringIO()
+        call_command("restore_messages", str(path), stdout=out)
+        return out.getvalue()
+
+    def test_archive_prunes_only_old_messages(self):
+        path = self.archive()
+
+        with gzip.open(path, "rt", encoding="utf-8") as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row["subject"] for row in rows], ["Subject 0", "Subject 1", "Subject 2"])
+        self.assertEqual(list(Message.objects.values_list("pk", flat=True)), [self.recent.pk])
+
+    def test_round_trip_restores_rows_with_their_timestamps(self):
+        before = {m.pk: (m.subject, m.sent_at) for m in Message.objects.exclude(pk=self.recent.pk)}
+        path = self.archive()
+
+        output = self.restore(path)
+
+        after = {m.pk: (m.subject, m.sent_at) for m in Message.objects.exclude(pk=self.recent.pk)}
+        self.assertEqual(after, before)
+        self.assertIn("Restored 3 messages; skipped 0", output)
+
+    def test_restore_skips_and_leaves_existing_rows_alone(self):
+        path = self.archive("--keep")
+        live = Message.objects.exclude(pk=self.recent.pk).first()
+        edited = timezone.now() - timedelta(days=1)
+        Message.objects.filter(pk=live.pk).update(sent_at=edited, read=True)
+        Message.objects.exclude(pk__in=[live.pk, self.recent.pk]).first().delete()
+
+        output = self.restore(path)
+
+        self.assertIn("Restored 1 messages; skipped 2", output)
+        live.refresh_from_db()
+        self.assertEqual(live.sent_at, edited)
+        self.assertTrue(live.read)
+        self.assertEqual(Message.objects.count(), 4)
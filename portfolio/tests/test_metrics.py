@@ -0,0 +1,63 @@
+import tempfile
+import threading
+
+from django.db import connections
+from django.test import TestCase, override_settings
+
+from portfolio import metrics
+from portfolio.query_inspector import QueryInspector
+
+from . import plain_static
+
+
+@plain_static
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='', METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_without_token_only_allowed_addresses_scrape(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.9').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='secret', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_only_page_templates_are_timed(self):
+        self.client.get('/awards/')
+        body = metrics.render()
+
+        self.assertIn('django_template_render_seconds_count{template="portfolio/awards.html"}', body)
+        self.assertNotIn('template="base.html"', body)
+        self.assertNotIn('template="wagtailadmin/', body)
+
+
+class QueryCountingTests(TestCase):
+    def test_inspector_on_a_new_connection_is_removed_on_exit(self):
+        result = {}
+
+        def run():
+            # A new thread gets a new connection, opened inside the inspector
+            connection = connections['default']
+            try:
+                with QueryInspector() as inspector:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                result['queries'] = inspector.count
+                result['wrappers'] = list(connection.execute_wrappers)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(result['queries'], 1)
+        self.assertEqual(result['wrappers'], [metrics._count_query])
@@ -0,0 +1,91 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from portfolio import invalidation, page_cache
+
+
+@override_settings(PAGE_CACHE_MAX_AGE=60, PAGE_CACHE_STALE_WHILE_REVALIDATE=600)
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.renders = 0
+        patcher = mock.patch.object(page_cache, '_refresh_in_background')
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def render(self, request):
+        self.renders += 1
+        return HttpResponse(f'render {self.renders}')
+
+    def get(self, path='/awards/', **extra):
+        return page_cache.cached_response(self.factory.get(path, **extra), self.render)
+
+    def test_fresh_copy_is_served_from_the_cache(self):
+        first = self.get()
+        second = self.get()
+
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertIn('Age', second)
+        self.assertIn('stale-while-revalidate=600', second['Cache-Control'])
+        self.assertIn('public', second['Cache-Control'])
+
+    def test_content_change_serves_stale_and_refreshes_in_background(self):
+        self.get()
+        invalidation.bump('portfolio.project')
+
+        response = self.get()
+
+        self.assertEqual(response.content, b'render 1')
+        self.assertEqual(self.renders, 1)
+        self.refresh.assert_called_once()
+
+    def test_old_copy_serves_stale_and_refreshes_in_background(self):
+        self.get()
+        with mock.patch.object(page_cache.time, 'time', return_value=time.time() + 120):
+            response = self.get()
+
+        self.assertEqual(response.content, b'render 1')
+        self.refresh.assert_called_once()
+
+    def test_copy_past_the_stale_window_is_rendered_again(self):
+        self.get()
+        with mock.patch.object(page_cache.time, 'time', return_value=time.time() + 700):
+            response = self.get()
+
+        self.assertEqual(response.content, b'render 2')
+        self.refresh.assert_not_called()
+
+    def test_background_refresh_replaces_the_entry(self):
+        self.get()
+        invalidation.bump('portfolio.project')
+        replay = page_cache._replay_request(self.factory.get('/awards/'))
+
+        page_cache.cached_response(replay, self.render)
+        response = self.get()
+
+        self.assertEqual(response.content, b'render 2')
+        self.refresh.assert_not_called()
+
+    def test_requests_with_a_session_are_not_cached(self):
+        self.get(HTTP_COOKIE='sessionid=abc')
+        self.get(HTTP_COOKIE='sessionid=abc')
+
+        self.assertEqual(self.renders, 2)
+
+    def test_responses_setting_cookies_are_not_cached(self):
+        def render(request):
+            self.renders += 1
+            response = HttpResponse('personal')
+            response.set_cookie('seen', '1')
+            return response
+
+        page_cache.cached_response(self.factory.get('/'), render)
+        page_cache.cached_response(self.factory.get('/'), render)
+
+        self.assertEqual(self.renders, 2)
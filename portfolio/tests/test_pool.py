@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from portfolio.db.pool import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.calls = []
+
+    def rollback(self):
+        self.calls.append('rollback')
+
+    def close(self):
+        self.calls.append('close')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_returned_connections_are_reset_before_reuse(self):
+        pool = ConnectionPool(max_size=1, pre_ping=False, reset=lambda conn: conn.calls.append('reset'))
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        self.assertEqual(conn.calls, ['rollback', 'reset'])
+
+    def test_a_connection_that_cannot_be_reset_is_discarded(self):
+        def reset(conn):
+            raise RuntimeError
+
+        pool = ConnectionPool(max_size=1, pre_ping=False, reset=reset)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertEqual(conn.calls, ['rollback', 'close'])
+        self.assertIsNot(pool.acquire(FakeConnection), conn)
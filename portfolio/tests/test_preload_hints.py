@@ -0,0 +1,34 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from portfolio.middleware import PreloadHintsMiddleware
+
+
+def page(script):
+    return HttpResponse(f'<html><head><script src="/static/js/{script}.js"></script></head></html>')
+
+
+@override_settings(STATIC_URL='/static/')
+class PreloadHintsTests(SimpleTestCase):
+    def setUp(self):
+        self.middleware = PreloadHintsMiddleware(lambda request: None)
+        self.factory = RequestFactory()
+
+    def respond(self, path, response):
+        request = self.factory.get(path)
+        request.resolver_match = resolve(path)
+        return self.middleware.process_response(request, response)
+
+    def test_wagtail_pages_learn_hints_per_path(self):
+        self.respond('/blog/', page('listing'))
+        response = self.respond('/blog/a-post/', page('post'))
+
+        self.assertIn('/static/js/post.js', response['Link'])
+        self.assertNotIn('listing', response['Link'])
+
+    def test_django_routes_share_their_hints(self):
+        self.respond('/awards/', page('awards'))
+        response = self.respond('/awards/', page('other'))
+
+        self.assertIn('/static/js/awards.js', response['Link'])
@@ -0,0 +1,55 @@
+import sys
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from portfolio import profiling
+from portfolio.models import ProfileReport
+
+from . import plain_static
+
+
+@plain_static
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+
+    def profile(self, value):
+        switch_interval = sys.getswitchinterval()
+        response = self.client.get(f'/awards/?_profile={value}')
+        self.assertEqual(sys.getswitchinterval(), switch_interval)
+        self.assertIn('X-Profile-Report', response)
+        report = ProfileReport.objects.get()
+        return report, profiling.load_report(report.key)
+
+    def test_sampler_is_the_default(self):
+        report, data = self.profile('1')
+
+        self.assertEqual(data['profiler'], 'sampler')
+        self.assertTrue(all(row['calls'] is None for row in data['top_functions']))
+        self.assertFalse((self.directory / f'{report.key}.prof').exists())
+
+    def test_cprofile_on_request(self):
+        report, data = self.profile('cprofile')
+
+        self.assertEqual(data['profiler'], 'cprofile')
+        self.assertEqual(data['call_tree'], [])
+        self.assertTrue(data['top_functions'][0]['calls'])
+        self.assertTrue((self.directory / f'{report.key}.prof').exists())
+
+    def test_report_page_shows_either_profile(self):
+        report, _data = self.profile('1')
+        self.client.get('/awards/?_profile=cprofile')
+        User.objects.filter(username='staff').update(is_superuser=True)
+
+        for saved in ProfileReport.objects.all():
+            response = self.client.get(f'/admin/portfolio/profilereport/{saved.pk}/change/')
+            self.assertEqual(response.status_code, 200)
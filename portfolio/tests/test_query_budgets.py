@@ -0,0 +1,91 @@
+import datetime
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from portfolio.models import Award, BlogPost, GalleryImage, Project, Testimonial
+from portfolio.query_inspector import QueryBudgetExceeded, QueryInspector, query_budget
+
+from . import plain_static
+
+
+@plain_static
+@override_settings(PAGE_CACHE_MAX_AGE=0, PROFILE_SAMPLE_RATE=0)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Enough rows on every page that a per-row query would repeat
+        for i in range(5):
+            Project.objects.create(
+                title=f"Project {i}", description="Seed systems", featured=True,
+                start_date=datetime.date(2020, 1, i + 1),
+            )
+            Award.objects.create(
+                name=f"Award {i}", organization="NARO", description="Research",
+                date=datetime.date(2021, 1, i + 1), featured=True,
+            )
+            GalleryImage.objects.create(
+                image=f"gallery/photo-{i}.jpg", caption=f"Photo {i}", featured=True,
+                date=datetime.date(2022, 1, i + 1),
+            )
+            Testimonial.objects.create(
+                author=f"Author {i}", position="Farmer", organization="Co-op",
+                quote="Helpful", featured=True,
+            )
+            BlogPost.objects.create(
+                title=f"Post {i}", slug=f"post-{i}", body="Body", excerpt="Excerpt",
+                published=True, featured=True, tags="seeds, policy",
+            )
+
+    def assert_within_budget(self, path):
+        self.client.get(path)  # warm per-process caches, as check_query_budgets does
+        with query_budget(settings.QUERY_BUDGETS[path]):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+
+    def test_home_page(self):
+        self.assert_within_budget('/')
+
+    def test_awards_page(self):
+        self.assert_within_budget('/awards/')
+
+    def test_gallery_page(self):
+        self.assert_within_budget('/gallery/')
+
+    def test_check_query_budgets_command(self):
+        out = StringIO()
+        call_command('check_query_budgets', '/', '/awards/', '/gallery/', stdout=out)
+        self.assertEqual(out.getvalue().count(' ok'), 3)
+
+    def test_check_query_budgets_sends_a_concrete_host(self):
+        for hosts in (['*'], ['.example.com', 'localhost']):
+            with self.subTest(hosts=hosts), override_settings(ALLOWED_HOSTS=hosts):
+                call_command('check_query_budgets', '/', stdout=StringIO())
+
+    def test_check_query_budgets_reports_error_pages_separately(self):
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 of 2 pages did not return 200"):
+            call_command('check_query_budgets', '/', '/no-such-page/', stdout=out)
+        self.assertIn("ERROR status 404", out.getvalue())
+
+    def test_n_plus_one_loop_is_detected(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "Repeated queries (likely N+1)"):
+            with query_budget():
+                for post in BlogPost.objects.all():
+                    list(post.tag_links.all())
+
+    def test_prefetched_loop_passes(self):
+        with query_budget(2):
+            for post in BlogPost.objects.prefetch_related('tag_links'):
+                list(post.tag_links.all())
+
+    def test_repeats_are_attributed_to_their_code(self):
+        with QueryInspector() as inspector:
+            for post in BlogPost.objects.all():
+                list(post.tag_links.all())
+
+        [(shape, queries)] = inspector.repeated()
+        self.assertEqual(len(queries), 5)
+        self.assertIn('portfolio/tests/test_query_budgets.py', queries[0].code)
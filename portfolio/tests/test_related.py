@@ -0,0 +1,116 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from portfolio import related
+from portfolio.models import ContentPosting, Project, RelatedItem
+from portfolio.signals import bulk_content_changed
+
+TOPICS = [
+    "cassava mosaic virus resistance breeding in smallholder farms",
+    "banana bacterial wilt surveillance and extension training",
+    "maize lethal necrosis diagnostics for seed certification",
+    "coffee wilt disease management with resistant varieties",
+    "bean root rot screening across highland districts",
+    "sweet potato weevil control through integrated pest management",
+]
+
+
+def make_project(description):
+    return Project.objects.create(
+        title=description.split(" in ")[0].split(" and ")[0],
+        description=description,
+        start_date=datetime.date(2020, 1, 1),
+    )
+
+
+def stored_lists():
+    lists = {}
+    for item in RelatedItem.objects.all():
+        lists.setdefault((item.source, item.object_id), []).append(((item.target_source, item.target_id), item.score))
+    return lists
+
+
+@override_settings(RELATED_CONTENT_DELAY=0)
+class RelatedContentTests(TestCase):
+    def setUp(self):
+        self.projects = [make_project(topic) for topic in TOPICS]
+        related.rebuild_related_content()
+
+    def key(self, project):
+        return ('portfolio.project', project.pk)
+
+    def targets(self, project):
+        return [(item.target_source, item.target_id) for item in related.related_for(project)]
+
+    def test_new_object_joins_neighbour_lists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            twin = make_project("cassava mosaic virus resistance screening for smallholder farms")
+
+        self.assertEqual(self.targets(twin)[0], self.key(self.projects[0]))
+        self.assertEqual(self.targets(self.projects[0])[0], self.key(twin))
+        self.assertTrue(ContentPosting.objects.filter(source='portfolio.project', object_id=twin.pk).exists())
+
+    def test_delete_removes_object_from_lists_and_index(self):
+        twin = make_project("cassava mosaic virus resistance screening for smallholder farms")
+        related.rebuild_related_content()
+        self.assertIn(self.key(twin), self.targets(self.projects[0]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.delete()
+
+        self.assertNotIn(self.key(twin), self.targets(self.projects[0]))
+        self.assertFalse(RelatedItem.objects.filter(target_id=twin.pk).exists())
+        self.assertFalse(ContentPosting.objects.filter(object_id=twin.pk).exists())
+
+    def test_unchanged_save_keeps_the_rebuilt_lists(self):
+        before = stored_lists()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.projects[2].save()
+
+        self.assertEqual(stored_lists(), before)
+
+    def test_edit_that_drops_a_match_refills_the_list(self):
+        twin = make_project("cassava mosaic virus resistance screening for smallholder farms")
+        related.rebuild_related_content()
+
+        twin.title = twin.description = "annual report on laboratory staffing"
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.save()
+
+        self.assertNotIn(self.key(twin), self.targets(self.projects[0]))
+
+    def test_queued_changes_are_applied_together(self):
+        keys = sorted(self.key(project) for project in self.projects[:3])
+        with mock.patch.object(related._update_job, 'schedule'):
+            with self.captureOnCommitCallbacks(execute=True):
+                for project in self.projects[:3]:
+                    project.delete()
+        with mock.patch.object(related, 'update_related_content') as update:
+            related._apply_pending()
+        update.assert_called_once_with(keys)
+
+    def test_large_batches_and_bulk_writes_rebuild(self):
+        with mock.patch.object(related._update_job, 'schedule'):
+            for i in range(related.INCREMENTAL_LIMIT + 1):
+                related.schedule_update('portfolio.project', 10_000 + i)
+        with mock.patch.object(related, 'rebuild_related_content') as rebuild:
+            related._apply_pending()
+            self.assertEqual(rebuild.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk_content_changed.send(sender=Project)
+            self.assertEqual(rebuild.call_count, 2)
+
+    def test_chunked_rebuild_matches_and_drops_stale_rows(self):
+        before = stored_lists()
+        stale = make_project("cassava mosaic virus resistance screening for smallholder farms")
+        related.rebuild_related_content()
+        stale.delete()  # its on_commit update never runs in this test
+
+        with mock.patch.object(related, 'REBUILD_CHUNK', 2):
+            related.rebuild_related_content()
+
+        self.assertEqual(stored_lists(), before)
+        self.assertFalse(ContentPosting.objects.filter(object_id=stale.pk).exists())
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from portfolio import singleflight
+
+
+@override_settings(SINGLE_FLIGHT_TIMEOUT=5)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return 'computed'
+
+    def test_waiting_threads_share_the_leaders_result(self):
+        release = threading.Event()
+        results = []
+
+        def slow():
+            release.wait(5)
+            return self.compute()
+
+        leader = threading.Thread(target=lambda: results.append(singleflight.do('k', slow)))
+        leader.start()
+        while 'k' not in singleflight._calls:
+            time.sleep(0.001)
+        follower = threading.Thread(target=lambda: results.append(singleflight.do('k', self.compute)))
+        follower.start()
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(results, ['computed', 'computed'])
+        self.assertEqual(self.computed, 1)
+
+    def test_a_worker_holding_the_lock_fills_the_cache_for_the_others(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            with singleflight.advisory_lock('page') as acquired:
+                self.assertTrue(acquired)
+                locked.set()
+                release.wait(5)
+                cache.set('page', 'from the other worker')
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        locked.wait(5)
+        threading.Timer(0.05, release.set).start()
+
+        value = singleflight.do('page', self.compute, recheck=lambda: cache.get('page'))
+        thread.join()
+
+        self.assertEqual(value, 'from the other worker')
+        self.assertEqual(self.computed, 0)
@@ -1,31 +1,43 @@
 from django.urls import path
-from . import views
+from . import offline, views
+from .page_cache import stale_while_revalidate as swr
 
 app_name = 'portfolio'
 
 urlpatterns = [
-    # Main pages
-    path('', views.home, name='home'),
-    path('about/', views.about, name='about'),
+    # Main pages (public pages use the stale-while-revalidate page cache)
+    path('', swr(views.home), name='home'),
+    path('about/', swr(views.about), name='about'),
     path('contact/', views.contact, name='contact'),
-    path('search/', views.search, name='search'),
+    path('search/', swr(views.search), name='search'),
     
     # Projects
-    path('projects/', views.ProjectListView.as_view(), name='projects'),
-    path('projects/<int:pk>/', views.ProjectDetailView.as_view(), name='project_detail'),
+    path('projects/', swr(views.ProjectListView.as_view()), name='projects'),
+    path('projects/<int:pk>/', swr(views.ProjectDetailView.as_view()), name='project_detail'),
     
     # Awards
-    path('awards/', views.AwardListView.as_view(), name='awards'),
+    path('awards/', swr(views.AwardListView.as_view()), name='awards'),
     
     # Gallery
-    path('gallery/', views.gallery, name='gallery'),
+    path('gallery/', swr(views.gallery), name='gallery'),
+    path('gallery/feed/', views.gallery_feed, name='gallery_feed'),
     
     # Blog
     #path('blog/', views.BlogListView.as_view(), name='blog'),
     #path('blog/<slug:slug>/', views.BlogDetailView.as_view(), name='blog_detail'),
     
     # Testimonials
-    path('testimonials/', views.testimonials, name='testimonials'),
+    path('testimonials/', swr(views.testimonials), name='testimonials'),
+    
+    # Sitemaps (pre-rendered, see portfolio/sitemaps.py)
+    path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>-<int:page>.xml', views.sitemap_section, name='sitemap_section'),
+    
+    # Offline support: service worker, web app manifest, fallback page
+    # (generated, see portfolio/offline.py)
+    path('sw.js', offline.service_worker, name='service_worker'),
+    path('manifest.webmanifest', offline.web_manifest, name='web_manifest'),
+    path('offline/', offline.offline_page, name='offline'),
     
     # AJAX endpoints
     path('api/contact/', views.contact_ajax, name='contact_ajax'),
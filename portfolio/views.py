@@ -1,9 +1,9 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.utils.cache import patch_cache_control
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView, TemplateView
 from django.core.mail import send_mail
@@ -12,9 +12,21 @@ from django.db import models
 from blogcms.models import BlogPage          # <-- Wagtail page model
 from .models import (
     Bio, Project, Award, GalleryImage, BlogPost, 
-    Testimonial, Message, SiteSettings
+    Testimonial, Message, SiteSettings, SitemapFile
 )
+from .gallery import CATEGORIES as GALLERY_CATEGORIES, feed_page as gallery_page
+from .invalidation import ProcessCache
+from .related import related_for
+from .sitemaps import INDEX_SECTION, get_sitemap_file
 import json
+from urllib.parse import urlencode
+
+site_settings_cache = ProcessCache(SiteSettings)
+
+
+def get_site_settings():
+    """The site settings row, cached per worker until it is edited"""
+    return site_settings_cache.get_or_set('current', SiteSettings.objects.first)
 
 
 def home(request):
@@ -26,7 +38,7 @@ def home(request):
         'featured_gallery': GalleryImage.objects.filter(featured=True)[:6],
         'featured_blog_posts': BlogPost.objects.filter(featured=True, published=True)[:3],
         'featured_testimonials': Testimonial.objects.filter(featured=True)[:3],
-        'site_settings': SiteSettings.objects.first(),
+        'site_settings': get_site_settings(),
     }
     return render(request, 'portfolio/home.html', context)
 
@@ -36,7 +48,7 @@ def about(request):
     bio = get_object_or_404(Bio)
     context = {
         'bio': bio,
-        'site_settings': SiteSettings.objects.first(),
+        'site_settings': get_site_settings(),
     }
     return render(request, 'portfolio/about.html', context)
 
@@ -53,7 +65,7 @@ class ProjectListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['site_settings'] = SiteSettings.objects.first()
+        context['site_settings'] = get_site_settings()
         return context
 
 
@@ -65,7 +77,8 @@ class ProjectDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['site_settings'] = SiteSettings.objects.first()
+        context['site_settings'] = get_site_settings()
+        context['related'] = related_for(self.object)
         return context
 
 
@@ -81,46 +94,75 @@ class AwardListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['site_settings'] = SiteSettings.objects.first()
+        context['site_settings'] = get_site_settings()
         return context
 
 
+def _gallery_query(category, cursor):
+    return urlencode({key: value for key, value in (('category', category), ('cursor', cursor)) if value})
+
+
 def gallery(request):
-    """Gallery page view with category filtering"""
+    """Gallery page view with category filtering; later pages load from gallery_feed"""
     category = request.GET.get('category', '')
-    images = GalleryImage.objects.all()
-    
-    if category:
-        images = images.filter(category=category)
-    
-    images = images.order_by('-date')
-    
-    # Pagination
-    paginator = Paginator(images, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
+    if category and category not in GALLERY_CATEGORIES:
+        page = {'images': [], 'next': None}
+    else:
+        try:
+            page = gallery_page(category, request.GET.get('cursor'))
+        except ValueError:
+            raise Http404("Invalid gallery cursor")
+
     context = {
-        'page_obj': page_obj,
-        'categories': GalleryImage.CATEGORY_CHOICES if hasattr(GalleryImage, 'CATEGORY_CHOICES') else [],
+        'images': page['images'],
+        # Without JavaScript, "Load more" is a link to the next page
+        'next_query': _gallery_query(category, page['next']) if page['next'] else '',
+        'categories': list(GALLERY_CATEGORIES.items()),
         'current_category': category,
-        'site_settings': SiteSettings.objects.first(),
+        'site_settings': get_site_settings(),
     }
     return render(request, 'portfolio/gallery.html', context)
 
 
+def gallery_feed(request):
+    """JSON pages of the gallery for infinite scroll
+
+    ``?category=`` filters, ``?cursor=`` continues from the previous page's
+    ``next``. Each image has its thumbnail and original URL with dimensions.
+    """
+    category = request.GET.get('category', '')
+    if category and category not in GALLERY_CATEGORIES:
+        return JsonResponse({'error': 'Unknown category'}, status=400)
+    try:
+        page = gallery_page(category, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    next_url = None
+    if page['next']:
+        next_url = f"{request.path}?{_gallery_query(category, page['next'])}"
+    response = JsonResponse({'images': page['images'], 'next': next_url})
+    patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+    return response
+
+
 class BlogListView(ListView):
     template_name = 'portfolio/blog.html'
     context_object_name = 'posts'
     paginate_by = 6
 
     def get_queryset(self):
-        # Only live (published) Wagtail pages, newest first
-        return BlogPage.objects.live().public().order_by('-first_published_at')
+        # Only live (published) Wagtail pages, newest first, with header
+        # image, renditions and tags loaded up front (no per-card queries)
+        return (
+            BlogPage.objects.live().public()
+            .with_listing_data()
+            .order_by('-first_published_at')
+        )
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx['site_settings'] = SiteSettings.objects.first()
+        ctx['site_settings'] = get_site_settings()
         return ctx
 
 
@@ -130,11 +172,12 @@ class BlogDetailView(TemplateView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         post = get_object_or_404(
-            BlogPage.objects.live().public(),
+            BlogPage.objects.live().public().with_listing_data(),
             slug=kwargs['slug']
         )
         ctx['post'] = post
-        ctx['site_settings'] = SiteSettings.objects.first()
+        ctx['tags'] = post.tags.all()
+        ctx['site_settings'] = get_site_settings()
         return ctx
 
 
@@ -143,7 +186,7 @@ def testimonials(request):
     testimonials = Testimonial.objects.all().order_by('-created_at')
     context = {
         'testimonials': testimonials,
-        'site_settings': SiteSettings.objects.first(),
+        'site_settings': get_site_settings(),
     }
     return render(request, 'portfolio/testimonials.html', context)
 
@@ -180,7 +223,7 @@ def contact(request):
         return redirect('portfolio:contact')
     
     context = {
-        'site_settings': SiteSettings.objects.first(),
+        'site_settings': get_site_settings(),
     }
     return render(request, 'portfolio/contact.html', context)
 
@@ -241,6 +284,26 @@ def search(request):
     context = {
         'query': query,
         'results': results,
-        'site_settings': SiteSettings.objects.first(),
+        'site_settings': get_site_settings(),
     }
     return render(request, 'portfolio/search.html', context)
+
+
+def _sitemap_response(section, page):
+    try:
+        sitemap = get_sitemap_file(section, page)
+    except SitemapFile.DoesNotExist:
+        raise Http404("No such sitemap")
+    response = HttpResponse(sitemap.content, content_type='application/xml')
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    return response
+
+
+def sitemap_index(request):
+    """Pre-rendered sitemap index"""
+    return _sitemap_response(INDEX_SECTION, 1)
+
+
+def sitemap_section(request, section, page):
+    """Pre-rendered sitemap chunk"""
+    return _sitemap_response(section, page)
@@ -37,6 +37,12 @@ print("Superuser ready:", username, "| created:", created)
 PY
 fi
 
+# Pre-render sitemaps so crawlers never hit a cold build
+python manage.py build_sitemaps
+
+# Self-host fonts and lightbox; pages fall back to the CDNs if this fails
+python manage.py vendor_assets || echo "vendor_assets failed; third-party assets will load from their CDNs"
+
 # Collect static files
 python manage.py collectstatic --noinput
 
@@ -91,18 +91,160 @@ function initContactForm() {
 
 // Gallery functionality with lightbox
 function initGallery() {
-    const galleryItems = document.querySelectorAll('.gallery-item');
-    
-    galleryItems.forEach(item => {
-        item.addEventListener('click', function() {
-            const img = this.querySelector('img');
-            const caption = this.querySelector('.gallery-caption');
-            
-            if (img) {
-                openLightbox(img.src, caption ? caption.textContent : '');
+    // Delegated, so items added by infinite scroll open too
+    document.addEventListener('click', function(e) {
+        const item = e.target.closest('.gallery-item');
+        if (!item) {
+            return;
+        }
+        const img = item.querySelector('img');
+        const imageSrc = item.dataset.full || (img && img.src);
+        if (imageSrc) {
+            openLightbox(imageSrc, item.dataset.title || '');
+        }
+    });
+
+    initGalleryFeed();
+}
+
+// Gallery infinite scroll: later pages come from the JSON feed, and the
+// page after the one on screen is fetched while the browser is idle
+function initGalleryFeed() {
+    const grid = document.getElementById('gallery-grid');
+    const more = document.getElementById('gallery-more');
+    const template = document.getElementById('gallery-item-template');
+    if (!grid || !more || !template || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    const preloadMargin = 800;  // px below the viewport to start loading at
+    let nextUrl = more.dataset.feed;
+    let prefetched = null;
+    let loading = false;
+
+    function fetchPage(url) {
+        return fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Gallery feed returned ${response.status}`);
+                }
+                return response.json();
+            });
+    }
+
+    function whenIdle(callback) {
+        if ('requestIdleCallback' in window) {
+            requestIdleCallback(callback, { timeout: 2000 });
+        } else {
+            setTimeout(callback, 200);
+        }
+    }
+
+    function prefetchNext() {
+        if (!nextUrl || (prefetched && prefetched.url === nextUrl)) {
+            return;
+        }
+        const url = nextUrl;
+        prefetched = { url: url, page: fetchPage(url) };
+        prefetched.page.catch(() => {
+            if (prefetched && prefetched.url === url) {
+                prefetched = null;  // try again when it is needed
             }
         });
+    }
+
+    function formatDate(isoDate) {
+        const [year, month, day] = isoDate.split('-').map(Number);
+        return new Date(year, month - 1, day).toLocaleDateString('en-US', {
+            month: 'short', day: '2-digit', year: 'numeric'
+        });
+    }
+
+    function summarize(text) {
+        const words = text.split(/\s+/).filter(Boolean);
+        return words.length > 10 ? words.slice(0, 10).join(' ') + ' …' : words.join(' ');
+    }
+
+    function renderItem(image) {
+        const item = template.content.firstElementChild.cloneNode(true);
+        const img = item.querySelector('img');
+        img.src = image.thumbnail.url;
+        img.alt = image.caption;
+        if (image.thumbnail.width) {
+            // Reserve the space before the image arrives
+            img.width = image.thumbnail.width;
+            img.height = image.thumbnail.height;
+        }
+        item.dataset.full = image.image.url;
+        item.dataset.title = image.caption;
+        item.dataset.caption = image.description;
+        item.querySelectorAll('[data-field="caption"]').forEach(el => { el.textContent = image.caption; });
+        item.querySelector('[data-field="category_label"]').textContent = image.category_label;
+        item.querySelector('[data-field="date"]').textContent = formatDate(image.date);
+        const summary = item.querySelector('[data-field="summary"]');
+        if (image.description) {
+            summary.textContent = summarize(image.description);
+        } else {
+            summary.remove();
+        }
+        if (!image.featured) {
+            item.querySelector('[data-field="featured"]').remove();
+        }
+        return item;
+    }
+
+    function nearViewport() {
+        return more.getBoundingClientRect().top < window.innerHeight + preloadMargin;
+    }
+
+    function loadNext() {
+        if (loading || !nextUrl) {
+            return;
+        }
+        loading = true;
+        const url = nextUrl;
+        const page = prefetched && prefetched.url === url ? prefetched.page : fetchPage(url);
+        prefetched = null;
+
+        page.then(data => {
+            const items = data.images.map(renderItem);
+            const fragment = document.createDocumentFragment();
+            items.forEach(item => fragment.appendChild(item));
+            grid.appendChild(fragment);
+            items.forEach(observeScrollAnimation);
+
+            nextUrl = data.next;
+            if (!nextUrl) {
+                observer.disconnect();
+                more.parentElement.remove();
+                return;
+            }
+            more.href = more.dataset.page + new URL(nextUrl, window.location.href).search;
+            whenIdle(prefetchNext);
+        }).catch(error => {
+            console.error('Gallery error:', error);  // the link still works
+        }).finally(() => {
+            loading = false;
+            // The observer only fires on changes; keep going if still in range
+            if (nextUrl && nearViewport()) {
+                loadNext();
+            }
+        });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNext();
+        }
+    }, { rootMargin: `0px 0px ${preloadMargin}px 0px` });
+    observer.observe(more);
+
+    more.addEventListener('click', function(e) {
+        e.preventDefault();
+        loadNext();
     });
+
+    whenIdle(prefetchNext);
 }
 
 // Lightbox functionality
@@ -111,21 +253,26 @@ function openLightbox(imageSrc, caption) {
     lightbox.className = 'fixed inset-0 bg-black bg-opacity-90 z-50 flex items-center justify-center p-4';
     lightbox.innerHTML = `
         <div class="relative max-w-4xl max-h-full">
-            <img src="${imageSrc}" alt="${caption}" class="max-w-full max-h-full object-contain">
-            ${caption ? `<p class="text-white text-center mt-4">${caption}</p>` : ''}
+            <img class="max-w-full max-h-full object-contain">
             <button class="absolute top-4 right-4 text-white text-2xl hover:text-gray-300" onclick="closeLightbox()">&times;</button>
         </div>
     `;
+    // Captions are set as text, never parsed as HTML
+    const img = lightbox.querySelector('img');
+    img.src = imageSrc;
+    img.alt = caption;
+    if (caption) {
+        const text = document.createElement('p');
+        text.className = 'text-white text-center mt-4';
+        text.textContent = caption;
+        img.after(text);
+    }
     
     document.body.appendChild(lightbox);
     document.body.style.overflow = 'hidden';
     
     // Close on escape key
-    document.addEventListener('keydown', function(e) {
-        if (e.key === 'Escape') {
-            closeLightbox();
-        }
-    });
+    document.addEventListener('keydown', closeLightboxOnEscape);
     
     // Close on background click
     lightbox.addEventListener('click', function(e) {
@@ -135,22 +282,31 @@ function openLightbox(imageSrc, caption) {
     });
 }
 
+function closeLightboxOnEscape(e) {
+    if (e.key === 'Escape') {
+        closeLightbox();
+    }
+}
+
 function closeLightbox() {
     const lightbox = document.querySelector('.fixed.inset-0.bg-black');
     if (lightbox) {
         lightbox.remove();
         document.body.style.overflow = 'auto';
     }
+    document.removeEventListener('keydown', closeLightboxOnEscape);
 }
 
 // Scroll animations
+let scrollAnimationObserver = null;
+
 function initScrollAnimations() {
     const observerOptions = {
         threshold: 0.1,
         rootMargin: '0px 0px -50px 0px'
     };
     
-    const observer = new IntersectionObserver(function(entries) {
+    scrollAnimationObserver = new IntersectionObserver(function(entries) {
         entries.forEach(entry => {
             if (entry.isIntersecting) {
                 entry.target.classList.add('fade-in');
@@ -160,7 +316,16 @@ function initScrollAnimations() {
     
     // Observe elements with animation classes
     const animatedElements = document.querySelectorAll('.animate-on-scroll');
-    animatedElements.forEach(el => observer.observe(el));
+    animatedElements.forEach(observeScrollAnimation);
+}
+
+// Also used for elements added after the page loaded
+function observeScrollAnimation(el) {
+    if (scrollAnimationObserver) {
+        scrollAnimationObserver.observe(el);
+    } else {
+        el.classList.add('fade-in');
+    }
 }
 
 // Search functionality
@@ -271,5 +436,21 @@ function initLazyLoading() {
     images.forEach(img => imageObserver.observe(img));
 }
 
+// Offline support: register the generated service worker (portfolio/offline.py)
+function initServiceWorker() {
+    const meta = document.querySelector('meta[name="service-worker"]');
+    if (!meta || !('serviceWorker' in navigator)) {
+        return;
+    }
+    // After load, so precaching never competes with the page's own requests
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register(meta.content, { scope: '/' }).catch(error => {
+            console.error('Service worker registration failed:', error);
+        });
+    });
+}
+
+initServiceWorker();
+
 // Initialize lazy loading when DOM is ready
 document.addEventListener('DOMContentLoaded', initLazyLoading);
@@ -0,0 +1,109 @@
+// Service worker generated by portfolio.offline; its version changes with every collectstatic
+'use strict';
+
+const CONFIG = {{ config|safe }};
+const STATIC_CACHE = `static-${CONFIG.version}`;
+const PAGE_CACHE = `pages-${CONFIG.version}`;
+const MEDIA_CACHE = `media-${CONFIG.version}`;
+const CURRENT_CACHES = [STATIC_CACHE, PAGE_CACHE, MEDIA_CACHE];
+const PRECACHED_STATIC = new Set(CONFIG.static);
+
+// Only pages the server marked shareable are kept (anonymous, page-cached ones)
+function isCacheable(response) {
+    const cacheControl = response.headers.get('Cache-Control') || '';
+    return response.ok && response.type === 'basic'
+        && /\bpublic\b/.test(cacheControl) && !/\bno-store\b/.test(cacheControl);
+}
+
+async function trim(cache, maxEntries) {
+    const keys = await cache.keys();
+    // Oldest first: entries are kept in insertion order
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - maxEntries)).map(key => cache.delete(key)));
+}
+
+async function precachePages() {
+    const cache = await caches.open(PAGE_CACHE);
+    // The anonymous copies; one unreachable page must not fail the install
+    await Promise.all(CONFIG.pages.concat([CONFIG.offline]).map(async url => {
+        try {
+            const response = await fetch(url, { credentials: 'omit' });
+            if (response.ok && (url === CONFIG.offline || isCacheable(response))) {
+                await cache.put(url, response);
+            }
+        } catch (error) {
+            // Cached on the first visit instead
+        }
+    }));
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(STATIC_CACHE);
+        await cache.addAll(CONFIG.static);
+        await precachePages();
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => /^(static|pages|media)-/.test(name) && !CURRENT_CACHES.includes(name))
+            .map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+// Hashed static files never change: the cache, then the network
+async function cacheFirst(request) {
+    const cached = await caches.match(request, { cacheName: STATIC_CACHE });
+    return cached || fetch(request);
+}
+
+// The cached copy at once, refreshed in the background for next time
+async function staleWhileRevalidate(event, cacheName, maxEntries, fallback) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request, { ignoreVary: true });
+    const network = fetch(event.request).then(async response => {
+        if (isCacheable(response) || (cacheName === MEDIA_CACHE && response.ok)) {
+            await cache.put(event.request, response.clone());
+            await trim(cache, maxEntries);
+        }
+        return response;
+    });
+
+    if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (error) {
+        const offline = fallback && await cache.match(fallback);
+        if (offline) {
+            return offline;
+        }
+        throw error;
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+    if (CONFIG.bypass.some(prefix => url.pathname.startsWith(prefix)) || url.searchParams.has('_profile')) {
+        return;
+    }
+
+    if (PRECACHED_STATIC.has(url.pathname)) {
+        event.respondWith(cacheFirst(request));
+    } else if (request.mode === 'navigate') {
+        event.respondWith(staleWhileRevalidate(event, PAGE_CACHE, CONFIG.maxPages, CONFIG.offline));
+    } else if (url.pathname.startsWith(CONFIG.mediaUrl) && request.destination === 'image') {
+        event.respondWith(staleWhileRevalidate(event, MEDIA_CACHE, CONFIG.maxMedia, null));
+    }
+    // Anything else (unhashed static files, feeds, JSON) goes to the network as usual
+});
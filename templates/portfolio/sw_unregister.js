@@ -0,0 +1,14 @@
+// Offline support is turned off (OFFLINE_ENABLED=False): remove this worker and its caches
+'use strict';
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => /^(static|pages|media)-/.test(name))
+            .map(name => caches.delete(name)));
+        await self.registration.unregister();
+    })());
+});